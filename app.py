@@ -13,9 +13,12 @@ from modules.map_utils import (
 from modules.translations import t
 from modules.ai_assistant import get_ai_response
 from modules.price_analysis import analyse_prices
+from modules.data_loader import get_busiest_mandi
 from modules.scoring import generate_score
 from modules.weather import get_weather_score
 from modules.explanation import generate_explanation
+from modules import warmup
+from modules.model_cache import MODEL_CACHE
 
 load_dotenv()
 
@@ -28,6 +31,20 @@ st.set_page_config(
 
 lang = render_page("Home", lang="English", show_inputs=False)
 
+# ── Forecast model warm-up (opt-in background pre-training, see modules/warmup) ──
+_warmup = warmup.ensure_started()
+if _warmup.pairs:
+    with st.sidebar.expander("🧠 Forecast models", expanded=False):
+        _counts = _warmup.counts()
+        st.caption(" · ".join(f"{k}: {v}" for k, v in _counts.items() if v))
+        st.dataframe(_warmup.status(), hide_index=True, use_container_width=True)
+        _cache = MODEL_CACHE.stats()
+        st.caption(
+            f"Model cache: {_cache['entries']} models · {_cache['bytes'] / 2**20:.1f}"
+            f" / {_cache['max_bytes'] / 2**20:.0f} MB ({_cache['policy']}) · "
+            f"hits {_cache['hits']} · misses {_cache['misses']} · evictions {_cache['evictions']}"
+        )
+
 # ── Title banner ──────────────────────────────────────────────────────────────
 st.markdown("""
 <div style="background:linear-gradient(90deg,#112011,#1e3a1e);border-radius:12px;
@@ -99,14 +116,10 @@ with col_left:
         with st.spinner("Analysing..."):
             try:
                 # Pick mandi with most data for the selected crop
-                import pandas as _pd
-                _tmpdf = _pd.read_csv("data/mandi_prices.csv")
-                _tmpdf.columns = [c.strip() for c in _tmpdf.columns]
-                _crop_df = _tmpdf[_tmpdf["Crop"].str.strip().str.lower() == selected_crop.lower()]
-                if _crop_df.empty:
+                mandi = get_busiest_mandi(selected_crop)
+                if mandi is None:
                     st.warning(f"No price data for {selected_crop} in dataset.")
                     st.stop()
-                mandi = _crop_df["Mandi"].value_counts().index[0]
                 from modules.map_utils import DISTRICT_CENTERS
                 dist = st.session_state.get("district", "Sangli")
                 coords = DISTRICT_CENTERS.get(dist, [16.8524, 74.5815])
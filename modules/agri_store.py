@@ -0,0 +1,324 @@
+"""
+AgriChain – modules/agri_store.py
+Streaming, partitioned loader for the all-India Agriculture_price_dataset.csv.
+
+The 737k-row CSV is read in chunks with only the columns price_predictor needs
+(Commodity, Market Name, Modal/Min/Max price, Price Date — plus STATE when
+filtering by state).  Rows are filtered as each chunk arrives and written as
+one compact partition per commodity under data/.cache/agri_partitions/
+(int16 market codes, int32 day numbers, float32 prices).  Peak memory is one
+chunk plus the compact arrays; a forecast afterwards only reads the partition
+for its own commodity.
+
+Ingested daily deltas (modules/ingest) live in an append-only segment log
+under data/segments/agri_prices/ and are appended to a commodity's rows when
+its partition is read, later rows replacing earlier ones on
+(market, date).  data_signature() includes the log's version.
+
+Optional filters (comma-separated, case-insensitive) via environment:
+    AGRICHAIN_AGRI_STATES=Maharashtra
+    AGRICHAIN_AGRI_COMMODITIES=Onion,Wheat,Tomato
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.price_store import (
+    CACHE_DIR, DATA_DIR, SegmentLog,
+    content_hash, last_wins, source_signature, write_json_atomic,
+    to_day_numbers, from_day_numbers, widen_prices,
+)
+
+AGRI_CSV      = DATA_DIR / "Agriculture_price_dataset.csv"
+PARTITION_DIR = CACHE_DIR / "agri_partitions"
+MANIFEST      = PARTITION_DIR / "manifest.json"
+
+PARTITION_FORMAT = 1
+CHUNK_ROWS       = 100_000
+
+PRICE_COLS = ["Modal_Price", "Min_Price", "Max_Price"]
+USECOLS    = ["STATE", "Market Name", "Commodity", *PRICE_COLS, "Price Date"]
+
+SEGMENTS = SegmentLog("agri_prices")
+
+
+def _filter_key(filters: dict) -> str:
+    return "|".join(",".join(filters[k]) for k in ("states", "commodities"))
+
+
+def _env_filter(name: str) -> tuple[str, ...]:
+    raw = os.environ.get(name, "")
+    return tuple(sorted({v.strip().lower() for v in raw.split(",") if v.strip()}))
+
+
+def default_filters() -> dict[str, tuple[str, ...]]:
+    """State / commodity filters from the environment (empty = keep all)."""
+    return {
+        "states":      _env_filter("AGRICHAIN_AGRI_STATES"),
+        "commodities": _env_filter("AGRICHAIN_AGRI_COMMODITIES"),
+    }
+
+
+# ── Streaming build ───────────────────────────────────────────────────────────
+
+class _Partition:
+    """Accumulates one commodity's rows as compact arrays, chunk by chunk."""
+
+    def __init__(self, name: str):
+        self.name    = name
+        self.markets: dict[str, int] = {}
+        self.parts: dict[str, list[np.ndarray]] = {k: [] for k in ("market", "day", *PRICE_COLS)}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        uniq, inv = np.unique(chunk["Market Name"].to_numpy(dtype=object), return_inverse=True)
+        codes = np.array([self.markets.setdefault(u, len(self.markets)) for u in uniq], dtype=np.int32)
+        self.parts["market"].append(codes[inv])
+        self.parts["day"].append(to_day_numbers(chunk["Date"]))
+        for col in PRICE_COLS:
+            self.parts[col].append(chunk[col].to_numpy(dtype=np.float32))
+
+    def write(self, out_dir: Path) -> dict:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        code_dtype = np.int16 if len(self.markets) < np.iinfo(np.int16).max else np.int32
+        np.save(out_dir / "market.npy", np.concatenate(self.parts["market"]).astype(code_dtype))
+        np.save(out_dir / "day.npy",    np.concatenate(self.parts["day"]))
+        for col in PRICE_COLS:
+            np.save(out_dir / f"{col}.npy", np.concatenate(self.parts[col]))
+        return {
+            "name":    self.name,
+            "dir":     out_dir.name,
+            "rows":    int(sum(len(p) for p in self.parts["day"])),
+            "markets": list(self.markets),   # insertion order == code order
+        }
+
+
+def _clean_chunk(chunk: pd.DataFrame, filters: dict) -> pd.DataFrame:
+    chunk.columns = [c.strip() for c in chunk.columns]
+    for col in ("STATE", "Market Name", "Commodity"):
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype(str).str.strip()
+    if filters["states"] and "STATE" in chunk.columns:
+        chunk = chunk[chunk["STATE"].str.lower().isin(filters["states"])]
+    if filters["commodities"]:
+        chunk = chunk[chunk["Commodity"].str.lower().isin(filters["commodities"])]
+    if chunk.empty:
+        return chunk
+    chunk = chunk.copy()
+    for col in PRICE_COLS:
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+    chunk["Date"] = pd.to_datetime(chunk["Price Date"], dayfirst=True, errors="coerce")
+    return chunk.dropna(subset=["Modal_Price", "Date"])
+
+
+def build_partitions(path: Path = AGRI_CSV, filters: dict | None = None) -> dict:
+    """
+    Stream the CSV once and write one partition per commodity.
+    Returns the new manifest.
+    """
+    filters = filters or default_filters()
+    mtime_ns, size = source_signature(path)
+    digest = content_hash(path)
+    filter_key = _filter_key(filters)
+
+    wanted = set(USECOLS)
+    partitions: dict[str, _Partition] = {}
+    reader = pd.read_csv(
+        path,
+        usecols=lambda c: c.strip() in wanted,
+        dtype={"STATE": str, "Market Name": str, "Commodity": str, "Price Date": str},
+        chunksize=CHUNK_ROWS,
+    )
+    for chunk in reader:
+        chunk = _clean_chunk(chunk, filters)
+        for commodity, grp in chunk.groupby("Commodity", sort=False):
+            key = commodity.lower()
+            partitions.setdefault(key, _Partition(commodity)).add(grp)
+
+    filter_tag = hashlib.sha1(filter_key.encode("utf-8")).hexdigest()[:8]
+    build_dir  = PARTITION_DIR / f"{digest[:16]}-{filter_tag}-v{PARTITION_FORMAT}"
+    tmp_dir    = build_dir.with_name(f"{build_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    commodities = {
+        key: part.write(tmp_dir / f"p{i:04d}")
+        for i, (key, part) in enumerate(sorted(partitions.items()))
+    }
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(tmp_dir, build_dir)
+
+    manifest = {
+        "format":      PARTITION_FORMAT,
+        "mtime_ns":    mtime_ns,
+        "size":        size,
+        "sha1":        digest,
+        "filters":     filter_key,
+        "dir":         build_dir.name,
+        "commodities": commodities,
+    }
+    write_json_atomic(MANIFEST, manifest)
+    for child in PARTITION_DIR.iterdir():
+        if child.is_dir() and child.name != build_dir.name and not child.name.endswith(".tmp"):
+            shutil.rmtree(child, ignore_errors=True)
+    return manifest
+
+
+def ensure_partitions(path: Path = AGRI_CSV, filters: dict | None = None) -> dict | None:
+    """
+    Manifest matching the current CSV and filters, rebuilding if needed.
+    Returns None when the dataset is not present.
+    """
+    if not path.exists():
+        return None
+    filters = filters or default_filters()
+    filter_key = _filter_key(filters)
+    mtime_ns, size = source_signature(path)
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if (manifest and manifest.get("format") == PARTITION_FORMAT
+            and manifest.get("filters") == filter_key
+            and (PARTITION_DIR / manifest["dir"]).is_dir()):
+        if manifest["mtime_ns"] == mtime_ns and manifest["size"] == size:
+            return manifest
+        if manifest["size"] == size and manifest["sha1"] == content_hash(path):
+            manifest["mtime_ns"] = mtime_ns
+            write_json_atomic(MANIFEST, manifest)
+            return manifest
+    return build_partitions(path, filters)
+
+
+# ── Deltas ────────────────────────────────────────────────────────────────────
+
+def ingest_delta(path: Path) -> int:
+    """
+    Append a delta file in the dataset's own layout as a new segment.
+    Returns the rows written (0 when this exact file was ingested before).
+    """
+    digest = content_hash(path)
+    if digest in SEGMENTS.sources():
+        return 0
+    wanted = set(USECOLS)
+    df = pd.read_csv(
+        path, usecols=lambda c: c.strip() in wanted,
+        dtype={"STATE": str, "Market Name": str, "Commodity": str, "Price Date": str},
+    )
+    df = _clean_chunk(df, {"states": (), "commodities": ()})
+    if "STATE" not in df.columns:
+        df["STATE"] = ""
+    df = df[["STATE", "Market Name", "Commodity", *PRICE_COLS, "Date"]]
+    df = df.drop_duplicates(subset=["Commodity", "Market Name", "Date"], keep="last")
+    SEGMENTS.append(df, digest)
+    return len(df)
+
+
+# ── Readers ───────────────────────────────────────────────────────────────────
+
+def data_signature(path: Path = AGRI_CSV) -> tuple[int, ...] | None:
+    """
+    (mtime_ns, size) of the dataset plus the segment log's version, or None
+    when the dataset is missing.
+    """
+    try:
+        return (*source_signature(path), *SEGMENTS.version())
+    except FileNotFoundError:
+        return None
+
+
+def dataset_tag(manifest: dict) -> str:
+    """Content version of the partitions plus ingested segments."""
+    return "+".join(filter(None, (manifest["sha1"], SEGMENTS.tag())))
+
+
+def _segment_rows(commodity: str) -> pd.DataFrame | None:
+    """Ingested rows for one commodity, with the current state filter applied."""
+    seg = SEGMENTS.frame()
+    if seg is None:
+        return None
+    filters = default_filters()
+    if filters["commodities"] and commodity not in filters["commodities"]:
+        return None
+    keep = seg["Commodity"].str.lower() == commodity
+    if filters["states"]:   # deltas without a STATE column are kept
+        keep &= seg["STATE"].str.lower().isin(filters["states"]) | (seg["STATE"] == "")
+    return seg[keep] if keep.any() else None
+
+
+def _append_segments(entry: dict | None, cols: dict[str, np.ndarray], delta: pd.DataFrame):
+    """Partition columns with ingested rows appended; later rows win on (market, day)."""
+    entry = dict(entry or {"name": delta["Commodity"].iloc[0], "dir": None, "rows": 0, "markets": []})
+    lookup = {m: i for i, m in enumerate(entry["markets"])}
+    codes = np.array([lookup.setdefault(m, len(lookup)) for m in delta["Market Name"]], dtype=np.int32)
+    entry["markets"] = list(lookup)
+
+    first_new = len(cols["day"]) if cols else 0
+    merged = {
+        "market": np.concatenate([np.asarray(cols.get("market", []), dtype=np.int32), codes]),
+        "day":    np.concatenate([np.asarray(cols.get("day", []), dtype=np.int32), to_day_numbers(delta["Date"])]),
+    }
+    for col in PRICE_COLS:
+        merged[col] = np.concatenate([
+            np.asarray(cols.get(col, []), dtype=np.float32), delta[col].to_numpy(dtype=np.float32),
+        ])
+    keep = last_wins([merged["market"], merged["day"]], first_new)
+    merged = {k: v[keep] for k, v in merged.items()}
+    entry["rows"] = int(keep.sum())
+    return entry, merged
+
+
+def load_partition_columns(commodity: str) -> tuple[dict, dict[str, np.ndarray]] | None:
+    """
+    (partition entry, {column: array}) or None if absent.  Columns are
+    memory-mapped unless ingested segments had to be appended.
+    """
+    manifest = ensure_partitions()
+    if manifest is None:
+        return None
+    commodity = commodity.strip().lower()
+    entry = manifest["commodities"].get(commodity)
+    cols: dict[str, np.ndarray] = {}
+    if entry is not None:
+        part_dir = PARTITION_DIR / manifest["dir"] / entry["dir"]
+        cols = {
+            name: np.load(part_dir / f"{name}.npy", mmap_mode="r")
+            for name in ("market", "day", *PRICE_COLS)
+        }
+    delta = _segment_rows(commodity)
+    if delta is not None:
+        return _append_segments(entry, cols, delta)
+    return None if entry is None else (entry, cols)
+
+
+@st.cache_data(show_spinner=False)
+def _load_partition(commodity: str, signature: tuple[int, ...]) -> pd.DataFrame | None:
+    loaded = load_partition_columns(commodity)
+    if loaded is None:
+        return None
+    entry, cols = loaded
+    df = pd.DataFrame({
+        "Market Name": pd.Categorical.from_codes(np.asarray(cols["market"]), entry["markets"]),
+        "Date":        pd.to_datetime(from_day_numbers(cols["day"])),
+    })
+    for col in PRICE_COLS:
+        df[col] = widen_prices(cols[col])
+    return df
+
+
+def load_partition(commodity: str) -> pd.DataFrame | None:
+    """
+    Rows for one commodity: Market Name (categorical), Date, Modal/Min/Max price.
+    Returns None when the dataset or the commodity is missing.
+    """
+    signature = data_signature()
+    if signature is None:
+        return None
+    return _load_partition(commodity.strip().lower(), signature)
@@ -0,0 +1,134 @@
+"""
+AgriChain – modules/autotune.py
+Time-budgeted search for each crop's RandomForest settings.
+
+Candidates over tree count, depth and leaf size are scored with the backtest
+harness (modules/backtest) on a sample of the crop's largest pairs.  The
+current defaults go first, then the rest cheapest first, until the training
+budget is used up.  Among candidates whose 30-day iterative forecast fits
+the latency budget, the lowest backtest MAPE wins; near-ties (within
+MAPE_TOLERANCE points) go to the cheaper forest.
+
+The choice is written to data/.cache/models/<crop>/tuning.json beside the
+crop's models.  price_predictor reads it when fitting and includes it in the
+model version, so tuned crops are retrained on next use.
+
+    python -m modules.autotune Onion --latency-ms 10 --train-budget 120
+"""
+
+from __future__ import annotations
+import argparse
+import itertools
+import time
+from datetime import datetime
+
+from modules import model_registry
+from modules.backtest import backtest_pair, eligible_pairs, summarise
+from modules.price_predictor import DEFAULT_FOREST_PARAMS
+
+GRID = {
+    "n_estimators":     (20, 50, 100),
+    "max_depth":        (6, 9, 12),
+    "min_samples_leaf": (1, 3, 5),
+}
+LATENCY_MS     = 20.0      # per 30-day iterative forecast
+TRAIN_BUDGET_S = 120.0     # total fitting time for the search
+SAMPLE_PAIRS   = 3
+ORIGINS        = 1
+MAPE_TOLERANCE = 0.1       # percentage points
+
+
+def candidates() -> list[dict]:
+    """Current defaults first, then the grid cheapest first (trees × 2^depth)."""
+    grid = [dict(zip(GRID, values)) for values in itertools.product(*GRID.values())]
+    grid.sort(key=lambda p: (p["n_estimators"] * 2 ** p["max_depth"], -p["min_samples_leaf"]))
+    return [dict(DEFAULT_FOREST_PARAMS)] + [p for p in grid if p != DEFAULT_FOREST_PARAMS]
+
+
+def _cost(params: dict) -> int:
+    return params["n_estimators"] * 2 ** params["max_depth"]
+
+
+def autotune(
+    crop: str,
+    latency_ms: float = LATENCY_MS,
+    train_budget_s: float = TRAIN_BUDGET_S,
+    sample_pairs: int = SAMPLE_PAIRS,
+    origins: int = ORIGINS,
+    save: bool = True,
+) -> dict | None:
+    """
+    Search the crop's forest settings and (with ``save``) persist the winner.
+    Returns the tuning record, or None if the crop has no pair long enough.
+    """
+    pairs = eligible_pairs([crop], origins=origins, max_pairs=sample_pairs)
+    if not pairs:
+        return None
+
+    evaluated, spent = [], 0.0
+    for params in candidates():
+        if spent >= train_budget_s:
+            break
+        results = [
+            backtest_pair(c, m, origins=origins, backends=("iterative",), params=params)
+            for c, m in pairs
+        ]
+        stats = summarise(results, ("iterative",)).get("iterative")
+        if stats is None:
+            continue
+        spent += stats["train_s_total"]
+        evaluated.append({
+            "params":     params,
+            "mape":       stats["mape_all"],
+            "predict_ms": stats["predict_ms_mean"],
+            "train_s":    stats["train_s_mean"],
+            "model_kb":   stats["model_kb_mean"],
+        })
+
+    if not evaluated:
+        return None
+    within = [e for e in evaluated if e["predict_ms"] <= latency_ms] or \
+             [min(evaluated, key=lambda e: e["predict_ms"])]
+    best_mape = min(e["mape"] for e in within)
+    chosen = min(
+        (e for e in within if e["mape"] <= best_mape + MAPE_TOLERANCE),
+        key=lambda e: (_cost(e["params"]), e["mape"]),
+    )
+
+    record = {
+        "crop":       crop,
+        "params":     chosen["params"],
+        "mape":       chosen["mape"],
+        "predict_ms": chosen["predict_ms"],
+        "train_s":    chosen["train_s"],
+        "model_kb":   chosen["model_kb"],
+        "budgets":    {"latency_ms": latency_ms, "train_budget_s": train_budget_s},
+        "sample":     [list(p) for p in pairs],
+        "evaluated":  evaluated,
+        "tuned_at":   datetime.now().isoformat(timespec="seconds"),
+    }
+    if save:
+        model_registry.save_config(crop, "tuning", record)
+    return record
+
+
+# ── CLI  (python -m modules.autotune <crop>) ─────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune a crop's forest settings under time budgets")
+    parser.add_argument("crop")
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--train-budget", type=float, default=TRAIN_BUDGET_S)
+    parser.add_argument("--pairs", type=int, default=SAMPLE_PAIRS)
+    parser.add_argument("--dry-run", action="store_true", help="do not persist the choice")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rec = autotune(args.crop, args.latency_ms, args.train_budget, args.pairs, save=not args.dry_run)
+    if rec is None:
+        print(f"No pair of {args.crop} is long enough to tune on.")
+    else:
+        for e in rec["evaluated"]:
+            print(f"{e['params']}  MAPE {e['mape']:.2f}%  predict {e['predict_ms']:.1f}ms  "
+                  f"fit {e['train_s']:.2f}s  {e['model_kb']:.0f}KB")
+        print(f"chosen {rec['params']} in {time.perf_counter() - t0:.0f}s")
@@ -0,0 +1,263 @@
+"""
+AgriChain – modules/backtest.py
+Rolling-origin backtest of the price forecasting backends.
+
+For every eligible (crop, mandi) pair the series is cut at several forecast
+origins (the last one HORIZON observations before the end, earlier ones
+STEP observations apart).  At each origin every backend is trained on the
+data before it and asked for the next HORIZON prices, which are scored
+against what actually happened:
+
+    iterative    per-pair RandomForest, autoregressive (production default)
+    direct       per-pair multi-output RandomForest
+    statistical  seasonal-naive / Holt-Winters / damped-trend ensemble
+
+Pairs run in parallel worker processes (one sklearn core each).  The report
+gives MAPE / RMSE per horizon, train and predict wall time and peak traced
+memory per backend, plus each worker's peak RSS, as JSON:
+
+    python -m modules.backtest --crops Onion,Wheat --origins 3 --workers 4
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from modules.features import HISTORY
+from modules.price_store import CACHE_DIR
+from modules.stat_forecast import forecast_series
+
+BACKENDS  = ("iterative", "direct", "statistical")
+HORIZON   = 30
+HORIZONS  = (1, 7, 14, 30)          # reported horizons (steps ahead)
+ORIGINS   = 3
+STEP      = 30
+REPORT_DIR = CACHE_DIR / "backtest"
+
+
+def eligible_pairs(crops: list[str] | None = None, origins: int = ORIGINS,
+                   step: int = STEP, max_pairs: int | None = None) -> list[tuple[str, str]]:
+    """Pairs long enough to train at the earliest origin, largest first."""
+    from modules.price_predictor import MIN_TRAIN_ROWS
+    from modules.warmup import pair_row_counts
+
+    wanted = {c.strip().lower() for c in crops} if crops else None
+    need = max(MIN_TRAIN_ROWS, HISTORY + 20) + HORIZON + (origins - 1) * step
+    pairs = [
+        (pair, n) for pair, n in pair_row_counts().items()
+        if n >= need and (wanted is None or pair[0].lower() in wanted)
+    ]
+    pairs.sort(key=lambda p: p[1], reverse=True)
+    return [p for p, _ in pairs[:max_pairs]]
+
+
+# ── One pair (runs in a worker process) ───────────────────────────────────────
+
+def _measure(fn, separate_memory_pass: bool = False):
+    """
+    (result, seconds, peak traced MB) of fn().  Tracing slows allocation-heavy
+    Python code, so cheap calls (forecasting) are timed untraced and run a
+    second time for memory; expensive ones (fitting) are traced in one pass.
+    """
+    if separate_memory_pass:
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        out, _, peak = _measure(fn)
+        return out, elapsed, peak
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        out = fn()
+    finally:
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def backtest_pair(
+    crop: str, mandi: str, origins: int = ORIGINS, step: int = STEP,
+    backends: tuple[str, ...] = BACKENDS, params: dict | None = None,
+) -> dict:
+    """
+    Every backend at every origin for one pair.  ``params`` overrides the
+    forest settings (default: the crop's current ones, see forest_params).
+    """
+    from modules.agri_store import data_signature
+    from modules.price_predictor import (
+        HAS_SKLEARN, _fit_model, _pair_rows, _predict_direct, _predict_iterative, forest_params,
+    )
+
+    if HAS_SKLEARN:
+        import sklearn.ensemble  # noqa: F401  (keep import cost out of the measurements)
+
+    params = params or forest_params(crop)
+    sub = _pair_rows(crop, mandi, data_signature())
+    sub = sub.sort_values("Date", kind="stable").reset_index(drop=True)
+    prices = sub["Price"].to_numpy(dtype=np.float64)
+    n = len(sub)
+
+    records = []
+    for k in range(origins):
+        origin = n - HORIZON - k * step
+        train, actual = sub.iloc[:origin], prices[origin:origin + HORIZON]
+        for backend in backends:
+            if backend != "statistical" and not HAS_SKLEARN:
+                continue
+            if backend == "statistical":
+                fit, train_s, train_mb, model_kb = None, 0.0, 0.0, 0.0
+                predict = lambda: forecast_series([train["Price"].to_numpy()], HORIZON).mean[0]
+            else:
+                # each backend fits (and is timed on) only its own forest
+                fit, train_s, train_mb = _measure(lambda: _fit_model(
+                    train, n_jobs=1, params=params,
+                    direct=(backend == "direct"), iterative=(backend == "iterative"),
+                ))
+                if fit is None or (backend == "direct" and fit.direct is None):
+                    continue
+                model_kb = (fit.direct if backend == "direct" else fit.forest).nbytes / 1024
+                if backend == "direct":
+                    predict = lambda: _predict_direct(fit.direct, fit.last_data, HORIZON)[1]
+                else:
+                    predict = lambda: _predict_iterative(fit.forest, fit.last_data, HORIZON)[1]
+            preds, predict_s, predict_mb = _measure(predict, separate_memory_pass=True)
+            preds = np.asarray(preds, dtype=np.float64)
+            records.append({
+                "backend":   backend,
+                "origin":    sub["Date"].iloc[origin].strftime("%Y-%m-%d"),
+                "abs_pct":   (np.abs(preds - actual) / np.where(actual > 0, actual, np.nan) * 100).tolist(),
+                "sq_err":    ((preds - actual) ** 2).tolist(),
+                "train_s":   train_s,
+                "predict_s": predict_s,
+                "peak_mb":   max(train_mb, predict_mb),
+                "model_kb":  model_kb,
+            })
+    return {
+        "crop": crop, "mandi": mandi, "rows": n, "records": records,
+        "worker_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+# ── Aggregation ──────────────────────────────────────────────────────────────
+
+def summarise(pairs: list[dict], backends: tuple[str, ...]) -> dict:
+    summary = {}
+    for backend in backends:
+        recs = [r for p in pairs for r in p["records"] if r["backend"] == backend]
+        if not recs:
+            continue
+        ape = np.array([r["abs_pct"] for r in recs], dtype=np.float64)
+        se  = np.array([r["sq_err"] for r in recs], dtype=np.float64)
+        horizons = {}
+        for h in HORIZONS:
+            col = ape[:, h - 1]
+            horizons[str(h)] = {
+                "mape": round(float(np.nanmean(col)), 3),
+                "rmse": round(float(np.sqrt(np.mean(se[:, h - 1]))), 2),
+                "n":    int(np.isfinite(col).sum()),
+            }
+        summary[backend] = {
+            "forecasts":       len(recs),
+            "horizons":        horizons,
+            "mape_all":        round(float(np.nanmean(ape)), 3),
+            "train_s_total":   round(sum(r["train_s"] for r in recs), 3),
+            "train_s_mean":    round(float(np.mean([r["train_s"] for r in recs])), 4),
+            "predict_ms_mean": round(float(np.mean([r["predict_s"] for r in recs])) * 1000, 3),
+            "peak_traced_mb":  round(max(r["peak_mb"] for r in recs), 2),
+            "model_kb_mean":   round(float(np.mean([r["model_kb"] for r in recs])), 1),
+        }
+    return summary
+
+
+def run_backtest(
+    crops: list[str] | None = None,
+    origins: int = ORIGINS,
+    step: int = STEP,
+    workers: int | None = None,
+    max_pairs: int | None = None,
+    backends: tuple[str, ...] = BACKENDS,
+) -> dict:
+    """Backtest every eligible pair in parallel and return the report dict."""
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise ValueError(f"unknown backends {sorted(unknown)}; choose from {BACKENDS}")
+    pairs = eligible_pairs(crops, origins, step, max_pairs)
+    workers = workers or max((os.cpu_count() or 2) - 1, 1)
+
+    started = time.perf_counter()
+    results = []
+    if pairs:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(backtest_pair, c, m, origins, step, backends) for c, m in pairs]
+            results = [f.result() for f in futures]
+    wall_s = time.perf_counter() - started
+
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "crops": crops, "origins": origins, "step": step, "horizon": HORIZON,
+            "horizons": list(HORIZONS), "workers": workers, "backends": list(backends),
+        },
+        "pairs":   len(results),
+        "wall_s":  round(wall_s, 2),
+        "peak_worker_rss_mb": round(max((r["worker_rss_mb"] for r in results), default=0.0), 1),
+        "backends": summarise(results, backends),
+        "per_pair": [
+            {
+                "crop": r["crop"], "mandi": r["mandi"], "rows": r["rows"],
+                "mape": {
+                    b: round(float(np.nanmean([x["abs_pct"] for x in r["records"] if x["backend"] == b])), 3)
+                    for b in backends if any(x["backend"] == b for x in r["records"])
+                },
+            }
+            for r in results
+        ],
+    }
+
+
+def write_report(report: dict, path: Path | None = None) -> Path:
+    if path is None:
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        path = REPORT_DIR / f"backtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+# ── CLI  (python -m modules.backtest) ─────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the price forecasters")
+    parser.add_argument("--crops", help="comma-separated crops (default: all)")
+    parser.add_argument("--origins", type=int, default=ORIGINS)
+    parser.add_argument("--step", type=int, default=STEP)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--max-pairs", type=int)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--out", type=Path, help="report path (default: data/.cache/backtest/)")
+    args = parser.parse_args()
+
+    report = run_backtest(
+        crops=args.crops.split(",") if args.crops else None,
+        origins=args.origins, step=args.step, workers=args.workers,
+        max_pairs=args.max_pairs, backends=tuple(args.backends.split(",")),
+    )
+    out = write_report(report, args.out)
+    print(f"{report['pairs']} pairs in {report['wall_s']}s → {out}")
+    for backend, s in report["backends"].items():
+        per_h = "  ".join(f"h{h}: {v['mape']:.1f}%" for h, v in s["horizons"].items())
+        print(f"{backend:<12} MAPE {per_h}  train {s['train_s_mean']:.2f}s  "
+              f"predict {s['predict_ms_mean']:.1f}ms  peak {s['peak_traced_mb']:.0f}MB")
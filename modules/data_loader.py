@@ -7,10 +7,17 @@ Streamlit is launched from or which page is currently active.
 """
 
 from __future__ import annotations
+import functools
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from modules import price_db
+from modules.rollup import RECORD_WINDOWS, Rollup, load_rollup
+from modules.price_store import data_version, from_day_numbers, load_prices, load_table, widen_prices
+from modules.timeseries import recent_daily, resample_daily
+
 # ── Absolute path to the data directory ──────────────────────────────────────
 # __file__ = e:/rippl_effect/modules/data_loader.py
 # .parent   = e:/rippl_effect/modules/
@@ -20,22 +27,16 @@ DATA_DIR     = PROJECT_ROOT / "data"
 CSV_PATH     = DATA_DIR / "mandi_prices.csv"
 
 
-# ── Cached dataframe loader ───────────────────────────────────────────────────
-@st.cache_data(show_spinner=False, ttl=3600)
+# ── Dataframe loader ──────────────────────────────────────────────────────────
 def load_price_df() -> pd.DataFrame:
     """
-    Load the full mandi_prices.csv into a DataFrame.
-    Cached for 1 hour so repeated page loads don't re-read the 21k-row file.
+    Full mandi price table from the shared columnar store (modules/price_store).
+    The CSV is parsed once and cached per file version, so repeated page loads
+    don't re-read the 21k-row file.
     Returns an empty DataFrame on error.
     """
     try:
-        df = pd.read_csv(CSV_PATH)
-        df.columns = [c.strip() for c in df.columns]
-        df["Crop"]  = df["Crop"].str.strip()
-        df["Mandi"] = df["Mandi"].str.strip()
-        df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-        df.dropna(subset=["Price"], inplace=True)
-        return df
+        return load_prices()
     except FileNotFoundError:
         st.error(f"Data file not found: {CSV_PATH}")
         return pd.DataFrame(columns=["Crop", "Mandi", "Price", "Date"])
@@ -44,80 +45,330 @@ def load_price_df() -> pd.DataFrame:
         return pd.DataFrame(columns=["Crop", "Mandi", "Price", "Date"])
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+# ── (Crop, Mandi) series index ────────────────────────────────────────────────
+def _norm(name: str) -> str:
+    return str(name).strip().lower()
+
+
+class SeriesIndex:
+    """
+    Price rows sorted by (crop, mandi, date), partitioned once.
+
+    Every normalised (crop, mandi) key maps to a contiguous [start, stop) slice
+    of the sorted ``price`` (float32) / ``day`` (int32 day number) arrays, and every crop to the slice that
+    spans all of its mandis, so lookups are a dict hit plus the slice length
+    instead of a boolean scan of the whole table.  Rows with equal dates keep
+    their file order (the sort is stable).
+    """
+
+    def __init__(
+        self,
+        crop_codes: np.ndarray,
+        mandi_codes: np.ndarray,
+        prices: np.ndarray,
+        days: np.ndarray,
+        crop_names: list[str],
+        mandi_names: list[str],
+    ):
+        # Collapse case/whitespace variants onto one normalised code each
+        crop_keys, crop_map   = np.unique([_norm(c) for c in crop_names],  return_inverse=True)
+        mandi_keys, mandi_map = np.unique([_norm(m) for m in mandi_names], return_inverse=True)
+        crop_disp  = {k: None for k in crop_keys}
+        mandi_disp = {k: None for k in mandi_keys}
+        for name, k in zip(crop_names, crop_map):
+            crop_disp[crop_keys[k]] = crop_disp[crop_keys[k]] or name
+        for name, k in zip(mandi_names, mandi_map):
+            mandi_disp[mandi_keys[k]] = mandi_disp[mandi_keys[k]] or name
+
+        c = crop_map[np.asarray(crop_codes, dtype=np.int64)]
+        m = mandi_map[np.asarray(mandi_codes, dtype=np.int64)]
+        d = np.asarray(days)
+        order = np.lexsort((d, m, c))
+
+        self.price = np.asarray(prices)[order]
+        self.day   = d[order]
+        c, m = c[order], m[order]
+
+        # Boundaries where (crop, mandi) changes
+        n = len(order)
+        if n:
+            brk = np.flatnonzero((c[1:] != c[:-1]) | (m[1:] != m[:-1])) + 1
+            starts = np.concatenate(([0], brk))
+            stops  = np.concatenate((brk, [n]))
+        else:
+            starts = stops = np.array([], dtype=np.int64)
+
+        self._pairs: dict[tuple[str, str], tuple[int, int]] = {}
+        self._crop_mandis: dict[str, list[tuple[str, int, int]]] = {}
+        self.pair_names: list[tuple[str, str]] = []   # (crop, mandi) per span, in order
+        for a, b in zip(starts.tolist(), stops.tolist()):
+            ck, mk = crop_keys[c[a]], mandi_keys[m[a]]
+            self._pairs[(ck, mk)] = (a, b)
+            self._crop_mandis.setdefault(ck, []).append((mandi_disp[mk], a, b))
+            self.pair_names.append((crop_disp[ck], mandi_disp[mk]))
+        self.starts = starts.astype(np.int64)
+        self.stops  = stops.astype(np.int64)
+        self._crops = {
+            ck: (groups[0][1], groups[-1][2]) for ck, groups in self._crop_mandis.items()
+        }
+        self.crop_names = sorted(crop_disp[ck] for ck in self._crop_mandis)
+
+    @classmethod
+    def empty(cls) -> "SeriesIndex":
+        return cls(np.array([], dtype=np.int16), np.array([], dtype=np.int16),
+                   np.array([], dtype=np.float32), np.array([], dtype=np.int32),
+                   [], [])
+
+    def span(self, crop: str, mandi: str) -> tuple[int, int]:
+        """[start, stop) of the date-sorted series; (0, 0) if unknown."""
+        return self._pairs.get((_norm(crop), _norm(mandi)), (0, 0))
+
+    def prices(self, crop: str, mandi: str) -> np.ndarray:
+        """Date-sorted float64 prices for one series."""
+        a, b = self.span(crop, mandi)
+        return widen_prices(self.price[a:b])
+
+    def days(self, crop: str, mandi: str) -> np.ndarray:
+        a, b = self.span(crop, mandi)
+        return self.day[a:b]
+
+    def crop_span(self, crop: str) -> tuple[int, int]:
+        return self._crops.get(_norm(crop), (0, 0))
+
+    def mandis(self, crop: str) -> list[tuple[str, int, int]]:
+        """[(mandi, start, stop), …] for a crop, ordered by mandi name."""
+        return self._crop_mandis.get(_norm(crop), [])
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_series_index(version: tuple[int, ...]) -> SeriesIndex:
+    table = load_table()
+    return SeriesIndex(
+        table.crop, table.mandi, table.price, table.day,
+        table.crops, table.mandis,
+    )
+
+
+def load_series_index() -> SeriesIndex:
+    """
+    Built-once (Crop, Mandi) index over the price store, rebuilt automatically
+    when the CSV changes or a delta is ingested.
+    Raises FileNotFoundError if the CSV is missing.
+    """
+    return _build_series_index(data_version())
+
+
+def get_series_index() -> SeriesIndex:
+    """Same as load_series_index(), but reports errors and returns an empty index."""
+    try:
+        return load_series_index()
+    except FileNotFoundError:
+        st.error(f"Data file not found: {CSV_PATH}")
+    except Exception as e:
+        st.error(f"Failed to load price data: {e}")
+    return SeriesIndex.empty()
+
+
+def get_rollup() -> Rollup:
+    """The per-(crop, mandi) rollup (modules/rollup); reports errors and returns an empty one."""
+    try:
+        return load_rollup()
+    except FileNotFoundError:
+        st.error(f"Data file not found: {CSV_PATH}")
+    except Exception as e:
+        st.error(f"Failed to load price data: {e}")
+    return Rollup.empty()
+
+
+# ── Lookup helpers ────────────────────────────────────────────────────────────
+# Latest / average prices and the per-mandi stats are rows of the materialised
+# rollup.  Everything else — and averages over windows the rollup doesn't keep
+# — runs against the in-process series index.  With
+# AGRICHAIN_PRICE_BACKEND=sqlite all of them are indexed queries against the
+# shared database (modules/price_db), so workers hold no copy of the prices.
+
+def _from_db(query, *args, empty):
+    """price_db query with get_series_index()'s error reporting."""
+    try:
+        return query(*args)
+    except FileNotFoundError:
+        st.error(f"Data file not found: {CSV_PATH}")
+    except Exception as e:
+        st.error(f"Failed to load price data: {e}")
+    return empty
+
+
+def _current_version() -> tuple[int, ...]:
+    try:
+        return data_version()
+    except FileNotFoundError:
+        return ()
+
+
+def cached_per_version(fn):
+    """
+    st.cache_data(ttl=3600) that also keys on data_version(), so an ingested
+    delta is visible on the next call instead of after the TTL.
+    """
+    def keyed(version, *args, **kwargs):
+        return fn(*args, **kwargs)
+    keyed.__module__   = fn.__module__
+    keyed.__qualname__ = f"{fn.__qualname__}@version"   # one cache per wrapped function
+    cached = st.cache_data(show_spinner=False, ttl=3600)(keyed)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return cached(_current_version(), *args, **kwargs)
+    wrapper.clear = cached.clear
+    return wrapper
+
+
+@cached_per_version
 def get_all_crops() -> list[str]:
     """Sorted list of all crops in the CSV."""
-    df = load_price_df()
-    return sorted(df["Crop"].dropna().unique().tolist())
+    if price_db.enabled():
+        return _from_db(price_db.crops, empty=[])
+    return list(get_series_index().crop_names)
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+@cached_per_version
 def get_mandis_for_crop(crop: str) -> list[str]:
     """Sorted list of mandis that have data for the given crop."""
-    df = load_price_df()
-    return sorted(df[df["Crop"] == crop]["Mandi"].dropna().unique().tolist())
+    if price_db.enabled():
+        return _from_db(price_db.mandis, crop, empty=[])
+    return sorted(name for name, _, _ in get_series_index().mandis(crop))
+
+
+@cached_per_version
+def get_busiest_mandi(crop: str) -> str | None:
+    """The mandi with the most price rows for a crop (ties: first by name); None if none."""
+    if price_db.enabled():
+        counts = _from_db(price_db.mandi_counts, crop, empty=[])
+    else:
+        counts = [(name, stop - start) for name, start, stop in get_series_index().mandis(crop)]
+    if not counts:
+        return None
+    return min(counts, key=lambda c: (-c[1], c[0]))[0]
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+@cached_per_version
 def get_avg_price(crop: str, mandi: str, days: int = 30) -> float:
     """Average price for a crop at a mandi over the most recent N rows."""
-    df = load_price_df()
-    sub = df[(df["Crop"] == crop) & (df["Mandi"] == mandi)]["Price"]
-    if sub.empty:
+    if price_db.enabled():
+        prices = _from_db(price_db.recent_prices, crop, mandi, days, empty=np.empty(0))
+        # summed oldest to newest, like the rollup's record-window means
+        return round(sum(prices.tolist()) / len(prices), 2) if prices.size else 0.0
+    if days in RECORD_WINDOWS:
+        row = get_rollup().row(crop, mandi)
+        return 0.0 if row is None else round(row[f"mean_{days}"], 2)
+    prices = get_series_index().prices(crop, mandi)[-days:]
+    if prices.size == 0:
         return 0.0
-    return round(float(sub.tail(days).mean()), 2)
+    return round(float(prices.mean()), 2)
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+@cached_per_version
 def get_latest_price(crop: str, mandi: str) -> float:
     """Most recent price for a crop at a mandi."""
-    df = load_price_df()
-    sub = df[(df["Crop"] == crop) & (df["Mandi"] == mandi)]["Price"]
-    if sub.empty:
-        return 0.0
-    return round(float(sub.iloc[-1]), 2)
+    if price_db.enabled():
+        prices = _from_db(price_db.recent_prices, crop, mandi, 1, empty=np.empty(0))
+        return round(float(prices[-1]), 2) if prices.size else 0.0
+    row = get_rollup().row(crop, mandi)
+    return 0.0 if row is None else round(row["latest_price"], 2)
+
+
+@cached_per_version
+def get_daily_series(crop: str, mandi: str) -> pd.DataFrame:
+    """
+    A crop's price at a mandi on every calendar day from its first to its
+    last observation (modules/timeseries).
+    Columns: Date, Price, Filled (True where the previous price was carried forward;
+    Price is NaN once that price is more than timeseries.MAX_FILL_DAYS old)
+    """
+    if price_db.enabled():
+        days, prices = _from_db(price_db.series, crop, mandi,
+                                empty=(np.empty(0, dtype=np.int32), np.empty(0)))
+    else:
+        idx = get_series_index()
+        days, prices = idx.days(crop, mandi), idx.prices(crop, mandi)
+    calendar, daily, filled = resample_daily(days, prices)
+    return pd.DataFrame({
+        "Date":   pd.to_datetime(from_day_numbers(calendar)),
+        "Price":  daily,
+        "Filled": filled,
+    })
+
 
+def _crop_mandi_stats(crop: str) -> pd.DataFrame:
+    """Per-mandi mean and latest price for a crop, from the rollup (or one grouped query)."""
+    if price_db.enabled():
+        rows = _from_db(price_db.crop_stats, crop, empty=[])
+        return pd.DataFrame(rows, columns=["Mandi", "AvgPrice", "LatestPrice"]).astype(
+            {"AvgPrice": np.float64, "LatestPrice": np.float64})
+    rows = get_rollup().for_crop(crop)
+    return pd.DataFrame({
+        "Mandi":       rows["Mandi"],
+        "AvgPrice":    rows["mean_all"].astype(np.float64),
+        "LatestPrice": rows["latest_price"].astype(np.float64),
+    })
 
-@st.cache_data(show_spinner=False, ttl=3600)
+
+@cached_per_version
 def get_top_mandis_for_crop(crop: str, n: int = 10) -> pd.DataFrame:
     """
     Returns a DataFrame of the top N mandis by average price for a given crop.
     Columns: Mandi, AvgPrice, LatestPrice
     """
-    df = load_price_df()
-    sub = df[df["Crop"] == crop]
-    if sub.empty:
-        return pd.DataFrame(columns=["Mandi", "AvgPrice", "LatestPrice"])
-
-    agg = (
-        sub.groupby("Mandi")["Price"]
-        .agg(AvgPrice="mean", LatestPrice="last")
-        .reset_index()
-        .sort_values("LatestPrice", ascending=False)
-        .head(n)
-    )
+    agg = _crop_mandi_stats(crop)
+    if agg.empty:
+        return agg
+
+    agg = agg.sort_values("LatestPrice", ascending=False).head(n)
     agg["AvgPrice"]    = agg["AvgPrice"].round(0).astype(int)
     agg["LatestPrice"] = agg["LatestPrice"].round(0).astype(int)
     return agg.reset_index(drop=True)
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+@cached_per_version
 def build_mandi_price_dict(crop: str) -> dict[str, int]:
     """
     Build {mandi_name: avg_price} for all mandis that have `crop` data.
     Used by map + spoilage pages as a live replacement for hardcoded prices.
     """
-    df = load_price_df()
-    sub = df[df["Crop"] == crop]
-    if sub.empty:
+    agg = _crop_mandi_stats(crop)
+    if agg.empty:
         return {}
-    return (
-        sub.groupby("Mandi")["Price"]
-           .mean()
-           .round(0)
-           .astype(int)
-           .to_dict()
-    )
+    return dict(zip(agg["Mandi"], agg["AvgPrice"].round(0).astype(int).tolist()))
+
+
+@cached_per_version
+def forecast_mandis_for_crop(crop: str, days_ahead: int = 7) -> pd.DataFrame:
+    """
+    Statistical forecast for every mandi that has `crop` data, in one
+    vectorised pass (modules/stat_forecast).  Each series is first put on
+    the daily calendar (modules/timeseries.recent_daily), so the forecast is
+    `days_ahead` calendar days after the mandi's last report.
+    Columns: Mandi, LatestPrice, LastDate, ForecastPrice, Change (%)
+    """
+    from modules.stat_forecast import forecast_series
+
+    if price_db.enabled():
+        named = _from_db(price_db.crop_series, crop, empty=[])
+    else:
+        idx = get_series_index()
+        named = [(name, idx.day[a:b], widen_prices(idx.price[a:b])) for name, a, b in idx.mandis(crop)]
+    if not named:
+        return pd.DataFrame(columns=["Mandi", "LatestPrice", "LastDate", "ForecastPrice", "Change"])
+    series = [recent_daily(days, prices) for _, days, prices in named]
+    latest = np.array([s[-1] for s in series])
+    fc = forecast_series(series, days_ahead).mean[:, -1]
+    return pd.DataFrame({
+        "Mandi":         [name for name, _, _ in named],
+        "LatestPrice":   latest.round(0).astype(int),
+        "LastDate":      pd.to_datetime(from_day_numbers(np.array([d[-1] for _, d, _ in named]))),
+        "ForecastPrice": fc.round(0).astype(int),
+        "Change":        np.round((fc - latest) / np.where(latest > 0, latest, 1) * 100, 1),
+    })
 
 
 # ── Mandi → (lat, lon) geocoding ─────────────────────────────────────────────
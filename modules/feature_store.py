@@ -0,0 +1,194 @@
+"""
+AgriChain – modules/feature_store.py
+Persistent, incrementally extended store of engineered price features.
+
+Every series that goes through price_predictor._build_features (per-pair
+training, the pooled model, backtests) has its FEATURE_COLS matrix kept on
+disk as NumPy ``.npy`` columns under data/.cache/features/, next to the
+series it was computed from (int32 day numbers, prices, spreads) and the
+FeatureEngine state after its last observation.
+
+An entry is addressed by the series' first HISTORY + 1 observations, which
+stay the same as a series grows, and is checked against the full series on
+every lookup:
+
+    request is a prefix of the stored series   stored rows are sliced (a
+                                               backtest cut, an older copy)
+    stored series is a prefix of the request   the engine resumes from its
+                                               saved state and only the new
+                                               dates are computed
+    anything else (a corrected price, a        rebuilt from scratch
+    back-filled date)
+
+Features only look backwards, so resumed and sliced rows are bit-identical
+to a full rebuild.  Each version is written to its own directory and renamed
+into place, so readers never see a half-written entry.
+
+AGRICHAIN_FEATURE_STORE=0 turns the store off (features computed in memory).
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from modules.features import HISTORY, N_FEATURES, FeatureEngine, build_feature_matrix
+from modules.price_store import CACHE_DIR
+
+FEATURE_DIR = CACHE_DIR / "features"
+MAX_SERIES  = 4096
+
+# Bump when FEATURE_COLS or FeatureEngine change meaning.
+STORE_VERSION = 1
+
+_SERIES = ("day", "price", "spread")
+
+
+# ── Computing rows ───────────────────────────────────────────────────────────
+
+def _extend(engine: FeatureEngine, days: np.ndarray, prices: np.ndarray,
+            spreads: np.ndarray, start: int) -> np.ndarray:
+    """Rows for targets start..n-1, advancing ``engine`` (which has seen start observations)."""
+    n = len(prices)
+    X = np.empty((n - start, N_FEATURES), dtype=np.float64)
+    dates = days.astype("datetime64[D]").astype(object)
+    for t in range(start, n):
+        if t >= HISTORY:
+            engine.write_row(X[t - start], dates[t], t)
+        engine.push(prices[t], spreads[t])
+    return X[max(HISTORY - start, 0):]
+
+
+# ── Storage ──────────────────────────────────────────────────────────────────
+
+def _series_key(days: np.ndarray, prices: np.ndarray) -> str:
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(days[:HISTORY + 1], dtype=np.int32).tobytes())
+    h.update(np.ascontiguousarray(prices[:HISTORY + 1], dtype=np.float64).tobytes())
+    return f"v{STORE_VERSION}-{h.hexdigest()[:20]}"
+
+
+def _versions(series_dir: Path) -> list[Path]:
+    """Stored versions of one series, longest first."""
+    try:
+        found = [p for p in series_dir.iterdir() if p.is_dir() and p.name.isdigit()]
+    except OSError:
+        return []
+    return sorted(found, key=lambda p: int(p.name), reverse=True)
+
+
+def _read(version: Path) -> dict[str, np.ndarray] | None:
+    try:
+        arrays = {name: np.load(version / f"{name}.npy", mmap_mode="r")
+                  for name in (*_SERIES, "features", "state")}
+    except (OSError, ValueError):
+        return None
+    if arrays["features"].shape != (N_FEATURES, max(len(arrays["price"]) - HISTORY, 0)):
+        return None
+    return arrays
+
+
+def _write(series_dir: Path, arrays: dict[str, np.ndarray]) -> None:
+    """Publish a new version and drop the shorter ones; best-effort."""
+    final = series_dir / str(len(arrays["price"]))
+    tmp   = series_dir / f".{final.name}.{os.getpid()}.tmp"
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(tmp / f"{name}.npy", arr)
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)   # another worker published it
+        for old in _versions(series_dir):
+            if int(old.name) < int(final.name):
+                shutil.rmtree(old, ignore_errors=True)
+        _prune()
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _prune() -> None:
+    series = [p for p in FEATURE_DIR.iterdir() if p.is_dir()]
+    if len(series) > MAX_SERIES:
+        series.sort(key=lambda p: p.stat().st_mtime_ns)
+        for old in series[: len(series) - MAX_SERIES]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+# ── Lookup ────────────────────────────────────────────────────────────────────
+
+def _enabled() -> bool:
+    return os.environ.get("AGRICHAIN_FEATURE_STORE", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _is_prefix(stored: dict[str, np.ndarray], days, prices, spreads, n: int) -> bool:
+    return (
+        np.array_equal(stored["day"][:n], days[:n])
+        and np.array_equal(stored["price"][:n], prices[:n])
+        and np.array_equal(stored["spread"][:n], spreads[:n])
+    )
+
+
+def feature_matrix(days: np.ndarray, prices: np.ndarray, spreads: np.ndarray) -> np.ndarray:
+    """
+    build_feature_matrix() of a date-sorted series (``days`` since
+    1970-01-01), served from and saved to the store.
+    """
+    days    = np.asarray(days, dtype=np.int32)
+    prices  = np.asarray(prices, dtype=np.float64)
+    spreads = np.asarray(spreads, dtype=np.float64)
+    n = len(prices)
+    if n <= HISTORY or not _enabled():
+        return build_feature_matrix(days.astype("datetime64[D]").astype(object), prices, spreads)
+
+    series_dir = FEATURE_DIR / _series_key(days, prices)
+    for version in _versions(series_dir):
+        stored = _read(version)
+        if stored is None:
+            continue
+        m = len(stored["price"])
+        if not _is_prefix(stored, days, prices, spreads, min(m, n)):
+            continue
+        if n <= m:
+            return np.array(stored["features"][:, : n - HISTORY].T)
+        engine = FeatureEngine.from_state(stored["state"])
+        X = np.concatenate([np.asarray(stored["features"]).T, _extend(engine, days, prices, spreads, m)])
+        break
+    else:
+        engine = FeatureEngine()
+        X = _extend(engine, days, prices, spreads, 0)
+
+    _write(series_dir, {
+        "day": days, "price": prices, "spread": spreads,
+        "features": np.ascontiguousarray(X.T), "state": engine.state(),
+    })
+    return X
+
+
+def clear() -> None:
+    shutil.rmtree(FEATURE_DIR, ignore_errors=True)
+
+
+# ── Quick check  (python -m modules.feature_store) ───────────────────────────
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    FEATURE_DIR = Path(tempfile.mkdtemp()) / "features"   # leave the real store alone
+    rng = np.random.default_rng(0)
+    days = np.arange(19000, 19000 + 2000, dtype=np.int32)
+    prices = 2000 + np.cumsum(rng.normal(0, 20, len(days)))
+    spreads = np.abs(rng.normal(200, 50, len(days)))
+
+    full = build_feature_matrix(days.astype("datetime64[D]").astype(object), prices, spreads)
+    for label, n in (("cold", 1990), ("append 10", 2000), ("prefix", 1500), ("warm", 2000)):
+        t0 = time.perf_counter()
+        X = feature_matrix(days[:n], prices[:n], spreads[:n])
+        dt = (time.perf_counter() - t0) * 1000
+        print(f"{label:<10} {n} rows  {dt:7.1f} ms  identical={np.array_equal(X, full[: n - HISTORY])}")
+    shutil.rmtree(FEATURE_DIR.parent)
@@ -0,0 +1,151 @@
+"""
+AgriChain – modules/features.py
+The one definition of the price-forecasting features, used for training,
+autoregressive inference and anything else that needs feature rows.
+
+A feature row describes the price on a target date using only the prices
+observed *before* it: lags, rolling means / std and momentum over the
+previous 7/14/30 observations, calendar fields of the target date, a trend
+counter and the previous observation's min–max spread.  FeatureEngine keeps
+that history in a 30-slot ring buffer with running sums and sums of squares,
+so pushing a price and emitting the next row are both O(1), and rows are
+written straight into a preallocated array.
+"""
+
+from __future__ import annotations
+import datetime
+import math
+from typing import Iterable
+
+import numpy as np
+
+LAGS         = (7, 14, 30)
+MEAN_WINDOWS = (7, 14, 30)
+STD_WINDOW   = 7
+HISTORY      = max(LAGS + MEAN_WINDOWS)   # observations needed for a full row
+
+FEATURE_COLS = [
+    "day_of_year", "month", "day_of_week", "week_of_year", "trend",
+    "lag_7", "lag_14", "lag_30",
+    "roll_mean_7", "roll_std_7", "roll_mean_14", "roll_mean_30",
+    "momentum_7", "momentum_14", "price_spread",
+]
+N_FEATURES = len(FEATURE_COLS)
+
+
+def calendar_features(d: datetime.date) -> tuple[int, int, int, int]:
+    """(day_of_year, month, day_of_week, iso week) of a target date."""
+    return d.timetuple().tm_yday, d.month, d.weekday(), d.isocalendar()[1]
+
+
+class FeatureEngine:
+    """Rolling price history with O(1) updates and feature-row emission."""
+
+    def __init__(self, prices: Iterable[float] = (), spread: float = 0.0):
+        self._buf   = [0.0] * HISTORY
+        self._pos   = 0            # next write slot
+        self._count = 0
+        self._sums  = {w: 0.0 for w in MEAN_WINDOWS}
+        self._sumsq = 0.0          # over STD_WINDOW
+        self.spread = float(spread)
+        for p in prices:
+            self.push(p)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def last(self) -> float:
+        return self._buf[(self._pos - 1) % HISTORY]
+
+    def state(self) -> np.ndarray:
+        """Everything push()/write_row() depend on, as one float64 vector."""
+        return np.array(
+            [*self._buf, self._pos, self._count, *self._sums.values(), self._sumsq, self.spread],
+            dtype=np.float64,
+        )
+
+    @classmethod
+    def from_state(cls, state: np.ndarray) -> "FeatureEngine":
+        """Rebuild an engine saved with state(); continues bit-identically."""
+        state = np.asarray(state, dtype=np.float64)
+        engine = cls()
+        k = HISTORY + 2
+        engine._buf   = state[:HISTORY].tolist()
+        engine._pos   = int(state[HISTORY])
+        engine._count = int(state[HISTORY + 1])
+        engine._sums  = dict(zip(MEAN_WINDOWS, state[k:k + len(MEAN_WINDOWS)].tolist()))
+        engine._sumsq = float(state[-2])
+        engine.spread = float(state[-1])
+        return engine
+
+    def _back(self, k: int) -> float:
+        """Price observed k steps ago (1 = latest)."""
+        return self._buf[(self._pos - k) % HISTORY]
+
+    def push(self, price: float, spread: float | None = None) -> None:
+        """Append one observation; ``spread`` stays unchanged when None/NaN."""
+        price = float(price)
+        for w in MEAN_WINDOWS:
+            if self._count >= w:
+                self._sums[w] -= self._back(w)
+            self._sums[w] += price
+        if self._count >= STD_WINDOW:
+            old = self._back(STD_WINDOW)
+            self._sumsq -= old * old
+        self._sumsq += price * price
+
+        self._buf[self._pos] = price
+        self._pos = (self._pos + 1) % HISTORY
+        self._count += 1
+        if spread is not None and not math.isnan(spread):
+            self.spread = float(spread)
+
+    def _mean(self, w: int) -> float:
+        return self._sums[w] / min(self._count, w)
+
+    def _std(self) -> float:
+        n = min(self._count, STD_WINDOW)
+        if n < 2:
+            return 0.0
+        s = self._sums[STD_WINDOW]
+        var = (self._sumsq - s * s / n) / (n - 1)   # sample std, like pandas rolling
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def write_row(self, out: np.ndarray, target_date: datetime.date, trend: int) -> np.ndarray:
+        """
+        Write the feature row for the next (unobserved) price into ``out``,
+        in FEATURE_COLS order.  Needs at least one pushed price; with fewer
+        than 30, missing lags fall back to the latest price.
+        """
+        last = self.last
+        lag = [self._back(k) if self._count >= k else last for k in LAGS]
+        m7, m14, m30 = (self._mean(w) for w in MEAN_WINDOWS)
+        out[:] = (
+            *calendar_features(target_date), trend,
+            *lag,
+            m7, self._std(), m14, m30,
+            last - m7, last - m14, self.spread,
+        )
+        return out
+
+
+def build_feature_matrix(
+    dates: Iterable[datetime.date],
+    prices: np.ndarray,
+    spreads: np.ndarray,
+) -> np.ndarray:
+    """
+    Feature rows for every observation that has HISTORY prior observations,
+    i.e. rows for targets HISTORY..n-1 of a date-sorted series.
+    ``trend`` is the target's position in the series.
+    """
+    n = len(prices)
+    X = np.empty((max(n - HISTORY, 0), N_FEATURES), dtype=np.float64)
+    engine = FeatureEngine()
+    for t, (d, p, s) in enumerate(zip(dates, prices, spreads)):
+        if t >= HISTORY:
+            engine.write_row(X[t - HISTORY], d, t)
+        engine.push(p, s)
+    return X
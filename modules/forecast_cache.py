@@ -0,0 +1,131 @@
+"""
+AgriChain – modules/forecast_cache.py
+Cache of finished forecast results.
+
+predict_future_prices() results are keyed by crop, mandi, horizon, mode and
+pooled flag plus price_predictor._forecast_version(), which holds only
+cheap file signatures:
+
+    dataset signature      Agriculture_price_dataset.csv (mtime, size) and
+                           its ingested segments
+    default filters        AGRICHAIN_AGRI_STATES / AGRICHAIN_AGRI_COMMODITIES
+    FEATURE_SCHEMA_VERSION, FORECAST_VERSION, sklearn available
+    tuning mtime           the crop's autotune config (per-pair models)
+    latest model name      the pair's newest registry artifact, or None
+
+So the key changes when the CSV is replaced or a delta is ingested, when
+the crop is re-tuned and when a model is saved.  In particular the first
+call for a pair with no registered model (latest None, answered by fitting
+one) and the next call after that model is saved have different keys; the
+second computes once more and is then served from the cache.  A Streamlit
+rerun caused by an unrelated widget hits the in-memory LRU and skips the
+forecast loop, the R² pass and the history formatting entirely.
+
+With AGRICHAIN_FORECAST_DISK_CACHE=1 results are also written as JSON under
+data/.cache/forecasts/, so they survive restarts and are shared between
+worker processes.
+"""
+
+from __future__ import annotations
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+from modules.price_store import CACHE_DIR, write_json_atomic
+
+FORECAST_DIR      = CACHE_DIR / "forecasts"
+MAX_ENTRIES       = 512     # in memory
+MAX_DISK_ENTRIES  = 4096
+
+
+def _digest(key: Hashable) -> str:
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class ForecastCache:
+    """In-memory LRU of result dicts, optionally backed by JSON files."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, disk_dir: Path | None = None):
+        self.max_entries = max_entries
+        self.disk_dir    = disk_dir
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+
+    # ── Disk layer ────────────────────────────────────────────────────────────
+
+    def _read_disk(self, digest: str) -> tuple[bool, Any]:
+        if self.disk_dir is None:
+            return False, None
+        try:
+            with open(self.disk_dir / f"{digest}.json", encoding="utf-8") as f:
+                return True, json.load(f)["result"]
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def _write_disk(self, digest: str, value: Any) -> None:
+        if self.disk_dir is None:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.disk_dir / f"{digest}.json", {"result": value})
+            files = list(self.disk_dir.glob("*.json"))
+            if len(files) > MAX_DISK_ENTRIES:
+                files.sort(key=lambda p: p.stat().st_mtime_ns)
+                for old in files[: len(files) - MAX_DISK_ENTRIES]:
+                    old.unlink(missing_ok=True)
+        except OSError:
+            pass   # the disk layer is best-effort
+
+    # ── Lookup ────────────────────────────────────────────────────────────────
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached result for ``key`` (a private copy), else ``compute()``."""
+        digest = _digest(key)
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return copy.deepcopy(self._entries[digest])
+
+        found, value = self._read_disk(digest)
+        if found:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            value = compute()
+            with self._lock:
+                self.misses += 1
+            self._write_disk(digest, value)
+
+        with self._lock:
+            self._entries[digest] = value
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries":   len(self._entries),
+                "hits":      self.hits,
+                "disk_hits": self.disk_hits,
+                "misses":    self.misses,
+            }
+
+
+def _disk_enabled() -> bool:
+    return os.environ.get("AGRICHAIN_FORECAST_DISK_CACHE", "").strip().lower() in {"1", "true", "yes"}
+
+
+FORECAST_CACHE = ForecastCache(disk_dir=FORECAST_DIR if _disk_enabled() else None)
@@ -0,0 +1,160 @@
+"""
+AgriChain – modules/forest.py
+Compiled, array-backed tree ensembles for fast per-tree inference.
+
+A fitted sklearn forest is flattened into one set of node tables (feature,
+threshold, left, right, value) covering every tree, with each tree's root
+offset into them.  All trees are then walked together, one vectorised step
+per depth level, so a forecast needs ``max_depth`` NumPy operations per
+row instead of one Python-level ``tree.predict`` call per estimator.
+Leaves point to themselves, which lets shallow trees idle while deeper
+ones finish.
+
+The tables (plus the fitted StandardScaler's mean/scale) are saved as plain
+``.npy`` files and loaded memory-mapped, so a compiled forest is a fraction
+of the size of the pickled estimator, is shared through the page cache
+between workers, and needs only NumPy — not sklearn — at request time.
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Bump when the on-disk layout below changes.
+FOREST_FORMAT = 1
+
+_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class FlatForest:
+    """Node tables for every tree of a forest, concatenated."""
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        depth: int,
+        x_mean: np.ndarray | None = None,
+        x_scale: np.ndarray | None = None,
+    ):
+        self.feature   = feature      # int16   (n_nodes,)
+        self.threshold = threshold    # float64 (n_nodes,)
+        self.left      = left         # int32   (n_nodes,)  leaves point to themselves
+        self.right     = right        # int32   (n_nodes,)
+        self.value     = value        # float64 (n_nodes, n_outputs)
+        self.roots     = roots        # int32   (n_trees,)
+        self.depth     = depth
+        self.x_mean    = x_mean       # float64 (n_features,) scaler folded in, or None
+        self.x_scale   = x_scale
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_outputs(self) -> int:
+        return self.value.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [getattr(self, a) for a in _ARRAYS] + [self.x_mean, self.x_scale]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> "FlatForest":
+        """
+        Flatten a fitted RandomForestRegressor (or any list of estimators_).
+        If the forest was trained on StandardScaler output, pass the scaler
+        so raw feature rows can be fed to predict().
+        """
+        feats, thr, lefts, rights, vals, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for est in model.estimators_:
+            t = est.tree_
+            n = t.node_count
+            idx = np.arange(n, dtype=np.int32) + offset
+            leaf = t.children_left < 0
+            feats.append(np.where(leaf, 0, t.feature).astype(np.int16))
+            thr.append(np.where(leaf, np.inf, t.threshold))
+            lefts.append(np.where(leaf, idx, t.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, idx, t.children_right + offset).astype(np.int32))
+            vals.append(t.value[:, :, 0])
+            roots.append(offset)
+            depth = max(depth, t.max_depth)
+            offset += n
+        return cls(
+            np.concatenate(feats), np.concatenate(thr),
+            np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(vals).astype(np.float64),
+            np.array(roots, dtype=np.int32), int(depth),
+            None if scaler is None else np.asarray(scaler.mean_, dtype=np.float64),
+            None if scaler is None else np.asarray(scaler.scale_, dtype=np.float64),
+        )
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        if self.x_mean is not None:
+            np.save(path / "x_mean.npy",  self.x_mean)
+            np.save(path / "x_scale.npy", self.x_scale)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"format": FOREST_FORMAT, "depth": self.depth}, f)
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: str | None = "r") -> "FlatForest":
+        """Load a saved forest; node tables are memory-mapped by default."""
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FOREST_FORMAT:
+            raise ValueError(f"Unsupported forest format {meta.get('format')} in {path}")
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS}
+        scaled = (path / "x_mean.npy").exists()
+        return cls(
+            **arrays, depth=int(meta["depth"]),
+            x_mean=np.load(path / "x_mean.npy") if scaled else None,
+            x_scale=np.load(path / "x_scale.npy") if scaled else None,
+        )
+
+    # ── Inference ────────────────────────────────────────────────────────────
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Apply the folded-in StandardScaler (identity if none)."""
+        X = np.asarray(X, dtype=np.float64)
+        if self.x_mean is None:
+            return X
+        return (X - self.x_mean) / self.x_scale
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree for raw rows: (n_samples, n_trees)."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = self.transform(np.atleast_2d(X)).astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_trees(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per-tree predictions.  Shape (n_samples, n_trees) for single-output
+        forests, (n_samples, n_trees, n_outputs) otherwise.
+        """
+        out = self.value[self.leaves(X)]
+        return out[..., 0] if self.n_outputs == 1 else out
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Forest mean (RandomForestRegressor.predict, up to summation order)."""
+        return self.predict_trees(X).mean(axis=1)
+
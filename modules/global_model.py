@@ -0,0 +1,274 @@
+"""
+AgriChain – modules/global_model.py
+One pooled price model per crop, shared by every market.
+
+Instead of one RandomForest per (crop, mandi), the feature rows of every
+market of a crop are stacked and fitted once, with a target-encoded market
+ID as an extra feature: the market's mean price shrunk towards the crop
+mean by its row count.  Like every other feature, a row's encoding only
+uses the prices observed before its target (an expanding mean), so the
+target never leaks into its own features; at forecast time that is the
+whole series.  Markets too short for a per-pair model (fewer than 30 rows)
+still get a forecast from the shared forest.  One compiled artifact in the
+model registry serves the whole crop.
+
+predict_future_prices(..., pooled=True) in modules/price_predictor routes
+here.  benchmark() compares accuracy and latency against per-pair models
+on a hold-out of each market's latest observations:
+
+    python -m modules.global_model Onion
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules import model_registry
+from modules.model_cache import MODEL_CACHE
+from modules.agri_store import data_signature, dataset_tag, ensure_partitions, load_partition
+from modules.features import FEATURE_COLS, HISTORY
+from modules.forest import FlatForest
+from modules.price_predictor import (
+    FEATURE_SCHEMA_VERSION, HAS_SKLEARN, MIN_TRAIN_ROWS,
+    _build_features, _fit_model, _new_forest, _pair_rows,
+    _predict_iterative, _r2_score, _result,
+)
+
+GLOBAL_KEY       = "__global__"   # registry "mandi" slot for a crop's pooled model
+TE_SMOOTHING     = 20             # rows of prior weight in the target encoding
+MAX_MARKET_ROWS  = 365            # most recent feature rows per market in training
+GLOBAL_FEATURES  = FEATURE_COLS + ["market_te"]
+TE_FORMAT        = 2              # bump when the encoding's definition changes
+
+
+def target_encode(prices: np.ndarray, prior: float, k: int = TE_SMOOTHING) -> float:
+    """Market mean shrunk towards the crop mean: (n·mean + k·prior) / (n + k)."""
+    n = len(prices)
+    return float((np.sum(prices) + k * prior) / (n + k))
+
+
+def expanding_encode(prices: np.ndarray, prior: float, k: int = TE_SMOOTHING) -> np.ndarray:
+    """
+    target_encode() of the prices before each position of a date-sorted
+    series: element t only sees prices[:t], so it never includes its own.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    before = np.concatenate([[0.0], np.cumsum(prices)[:-1]])
+    return (before + k * prior) / (np.arange(len(prices)) + k)
+
+
+# ── Artifact ──────────────────────────────────────────────────────────────────
+
+@dataclass
+class GlobalModel:
+    forest: FlatForest     # over GLOBAL_FEATURES, StandardScaler folded in
+    prior:  float          # crop mean price, the encoding's shrinkage target
+
+    def save(self, path: Path) -> None:
+        self.forest.save(path / "forest")
+        with open(path / "encoding.json", "w", encoding="utf-8") as f:
+            json.dump({"prior": self.prior, "smoothing": TE_SMOOTHING, "format": TE_FORMAT}, f)
+
+    @classmethod
+    def load(cls, path: Path) -> "GlobalModel":
+        with open(path / "encoding.json", encoding="utf-8") as f:
+            enc = json.load(f)
+        if enc.get("smoothing") != TE_SMOOTHING or enc.get("format") != TE_FORMAT:
+            raise ValueError("target encoding changed")
+        return cls(FlatForest.load(path / "forest"), float(enc["prior"]))
+
+    @property
+    def nbytes(self) -> int:
+        return self.forest.nbytes
+
+    def encode(self, prices: np.ndarray) -> float:
+        return target_encode(prices, self.prior)
+
+
+# ── Training ──────────────────────────────────────────────────────────────────
+
+def market_frames(crop: str) -> dict[str, pd.DataFrame]:
+    """{market: Date/Price/Min_Price/Max_Price rows} for every market of a crop."""
+    crop_df = load_partition(crop)
+    if crop_df is None:
+        return {}
+    crop_df = crop_df.rename(columns={"Modal_Price": "Price"})
+    return {
+        str(market): grp[["Date", "Price", "Min_Price", "Max_Price"]].reset_index(drop=True)
+        for market, grp in crop_df.groupby("Market Name", observed=True, sort=False)
+    }
+
+
+def fit_global(frames: dict[str, pd.DataFrame], n_jobs: int = -1) -> GlobalModel | None:
+    """Fit the pooled forest over every market with a full feature row."""
+    from sklearn.preprocessing import StandardScaler
+
+    if not frames:
+        return None
+    prior = float(np.mean(np.concatenate([f["Price"].to_numpy() for f in frames.values()])))
+
+    parts = []
+    for frame in frames.values():
+        if len(frame) <= HISTORY:
+            continue
+        prices = frame.sort_values("Date", kind="stable")["Price"].to_numpy()
+        featured = _build_features(frame)   # row j targets prices[HISTORY + j]
+        featured["market_te"] = expanding_encode(prices, prior)[HISTORY:]
+        parts.append(featured.tail(MAX_MARKET_ROWS))
+    if not parts:
+        return None
+    train = pd.concat(parts, ignore_index=True)
+    if len(train) < 20:
+        return None
+
+    scaler = StandardScaler()
+    model = _new_forest(n_jobs)
+    model.fit(scaler.fit_transform(train[GLOBAL_FEATURES].values), train["Price"].values)
+    return GlobalModel(FlatForest.from_sklearn(model, scaler), prior)
+
+
+def _crop_data_hash(crop: str) -> str | None:
+    manifest = ensure_partitions()
+    if manifest is None:
+        return None
+    key = f"{dataset_tag(manifest)}|{manifest['filters']}|{crop.strip().lower()}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _global_for_version(crop: str, data_hash: str) -> GlobalModel | None:
+    artifact = model_registry.load(crop, GLOBAL_KEY, FEATURE_SCHEMA_VERSION, data_hash, GlobalModel.load)
+    if artifact is not None or not HAS_SKLEARN:
+        return artifact
+    artifact = fit_global(market_frames(crop))
+    if artifact is not None:
+        model_registry.save(crop, GLOBAL_KEY, FEATURE_SCHEMA_VERSION, data_hash, artifact)
+    return artifact
+
+
+def load_global_model(crop: str) -> GlobalModel | None:
+    """The crop's pooled model: from the registry, else trained now (sklearn)."""
+    data_hash = _crop_data_hash(crop)
+    if data_hash is None:
+        return None
+    crop = crop.strip().lower()
+    return MODEL_CACHE.get_or_load(
+        ("global", crop, FEATURE_SCHEMA_VERSION, data_hash),
+        lambda: _global_for_version(crop, data_hash),
+    )
+
+
+# ── Prediction ────────────────────────────────────────────────────────────────
+
+def _history_frame(sub: pd.DataFrame) -> pd.DataFrame:
+    """Date/Price/Spread/trend of a pair's rows, in the shape _predict_iterative reads."""
+    sub = sub.sort_values("Date", kind="stable").reset_index(drop=True)
+    spread = (sub["Max_Price"] - sub["Min_Price"]).ffill().fillna(0.0)
+    return pd.DataFrame({
+        "Date": sub["Date"], "Price": sub["Price"], "Spread": spread, "trend": np.arange(len(sub)),
+    })
+
+
+def _forecast_pair(model: GlobalModel, sub: pd.DataFrame, days_ahead: int):
+    history = _history_frame(sub)
+    te = np.array([model.encode(history["Price"].to_numpy())])
+    return history, _predict_iterative(model.forest, history, days_ahead, extra=te)
+
+
+def predict_pooled(crop: str, mandi: str, days_ahead: int = 30) -> dict | None:
+    """predict_future_prices() result from the crop's pooled model; None if unavailable."""
+    model = load_global_model(crop)
+    signature = data_signature()
+    sub = None if model is None or signature is None else _pair_rows(crop, mandi, signature)
+    if sub is None:
+        return None
+
+    history, (future_dates, mean_preds, std_preds) = _forecast_pair(model, sub, days_ahead)
+
+    r2 = 0.0
+    if len(sub) > HISTORY:
+        prices = sub.sort_values("Date", kind="stable")["Price"].to_numpy()
+        featured = _build_features(sub)
+        featured["market_te"] = expanding_encode(prices, model.prior)[HISTORY:]
+        featured = featured.tail(60)
+        r2 = _r2_score(featured["Price"].values, model.forest.predict(featured[GLOBAL_FEATURES].values))
+    return _result(
+        future_dates, mean_preds, std_preds,
+        history=history.tail(30), r2=r2, mode="global", data_points=len(sub),
+    )
+
+
+# ── Benchmark: pooled vs per-pair ─────────────────────────────────────────────
+
+def _mape(actual: np.ndarray, pred: np.ndarray) -> float:
+    actual, pred = np.asarray(actual), np.asarray(pred)
+    ok = actual > 0
+    return float(np.mean(np.abs(pred[ok] - actual[ok]) / actual[ok]) * 100) if ok.any() else float("nan")
+
+
+def benchmark(crop: str, holdout: int = 14, max_markets: int = 10) -> pd.DataFrame:
+    """
+    Hold out each market's last ``holdout`` observations, fit both approaches
+    on the rest, forecast ``holdout`` steps and score against the held-out
+    prices.  Uses the up-to ``max_markets`` largest markets that per-pair
+    models can handle.  Returns one row per approach: MAPE, total fit time,
+    mean forecast latency and artifact bytes.
+    """
+    frames = {
+        m: f.sort_values("Date", kind="stable").reset_index(drop=True)
+        for m, f in market_frames(crop).items()
+    }
+    train = {m: f.iloc[:-holdout] for m, f in frames.items() if len(f) > holdout}
+    markets = sorted(
+        (m for m, f in train.items() if len(f) >= MIN_TRAIN_ROWS + HISTORY),
+        key=lambda m: len(train[m]), reverse=True,
+    )[:max_markets]
+
+    rows = []
+
+    # Per-pair: one forest per market
+    fit_s, pred_s, nbytes, errors = 0.0, 0.0, 0, []
+    for m in markets:
+        t0 = time.perf_counter()
+        model = _fit_model(train[m], direct=False)
+        fit_s += time.perf_counter() - t0
+        if model is None:
+            continue
+        nbytes += model.forest.nbytes
+        t0 = time.perf_counter()
+        _, preds, _ = _predict_iterative(model.forest, model.last_data, holdout)
+        pred_s += time.perf_counter() - t0
+        errors.append(_mape(frames[m]["Price"].iloc[-holdout:], preds))
+    rows.append({
+        "approach": "per-pair", "markets": len(errors), "mape_%": np.mean(errors),
+        "fit_s": fit_s, "forecast_ms": pred_s / max(len(errors), 1) * 1000, "artifact_kb": nbytes / 1024,
+    })
+
+    # Pooled: one forest for every market of the crop
+    t0 = time.perf_counter()
+    pooled = fit_global(train)
+    fit_s = time.perf_counter() - t0
+    pred_s, errors = 0.0, []
+    if pooled is not None:
+        for m in markets:
+            t0 = time.perf_counter()
+            _, (_, preds, _) = _forecast_pair(pooled, train[m], holdout)
+            pred_s += time.perf_counter() - t0
+            errors.append(_mape(frames[m]["Price"].iloc[-holdout:], preds))
+    rows.append({
+        "approach": "pooled", "markets": len(errors), "mape_%": np.mean(errors) if errors else np.nan,
+        "fit_s": fit_s, "forecast_ms": pred_s / max(len(errors), 1) * 1000,
+        "artifact_kb": (pooled.forest.nbytes / 1024) if pooled is not None else 0.0,
+    })
+    return pd.DataFrame(rows).round(2)
+
+
+if __name__ == "__main__":
+    crop = sys.argv[1] if len(sys.argv) > 1 else "Onion"
+    print(benchmark(crop).to_string(index=False))
@@ -6,13 +6,16 @@ from __future__ import annotations
 import datetime
 import requests
 from utils.geo import DISTRICT_COORDS
+from modules.seasonality import seasonal_indices
 
 CROP_MATURITY_DAYS = {
     "Wheat": 120, "Tomato": 75, "Onion": 90,
     "Potato": 90, "Corn": 100, "Soybean": 100, "Cotton": 180,
 }
 
-# Seasonal price index per month (1=Jan..12=Dec) — rough multiplier
+# Seasonal price index per month (1=Jan..12=Dec) — rough multiplier.
+# Fallback only: crops whose price history covers all 12 months use
+# modules/seasonality instead.
 _SEASONAL = {
     "Wheat":   {1: 1.0, 2: 1.05, 3: 1.10, 4: 1.15, 5: 1.02, 6: 0.95, 7: 0.90, 8: 0.88, 9: 0.92, 10: 0.95, 11: 0.98, 12: 1.0},
     "Tomato":  {1: 1.15, 2: 1.20, 3: 1.10, 4: 0.90, 5: 0.80, 6: 0.75, 7: 0.85, 8: 0.90, 9: 1.0, 10: 1.05, 11: 1.10, 12: 1.12},
@@ -74,13 +77,32 @@ def _weather_score(wx: dict) -> float:
     return max(0.1, min(1.0, score))
 
 
+# Range of the multipliers _price_seasonality_score maps onto 0..1
+_MULT_LOW, _MULT_HIGH = 0.75, 1.20
+
+
+def _seasonal(crop: str) -> dict[int, float]:
+    """
+    Month → price multiplier.  The data-derived index when it covers the whole
+    year — its swings scaled down, if needed, to fit _MULT_LOW.._MULT_HIGH —
+    else the hand-set _SEASONAL for every month.
+    """
+    data = seasonal_indices(crop)
+    if len(data) < 12:
+        return _SEASONAL.get(crop, {})
+    up   = max(max(data.values()) - 1, 1e-9)
+    down = max(1 - min(data.values()), 1e-9)
+    scale = min(1.0, (_MULT_HIGH - 1) / up, (1 - _MULT_LOW) / down)
+    return {m: round(1 + (v - 1) * scale, 4) for m, v in data.items()}
+
+
 def _price_seasonality_score(crop: str, harvest_date: datetime.date) -> float:
     """0..1 based on seasonal price multiplier for the harvest month."""
     month_idx = harvest_date.month
-    seasonal = _SEASONAL.get(crop, {})
+    seasonal = _seasonal(crop)
     mult = seasonal.get(month_idx, 1.0)
     # Normalize: 0.75 -> 0, 1.20 -> 1
-    return max(0.0, min(1.0, (mult - 0.75) / 0.45))
+    return max(0.0, min(1.0, (mult - _MULT_LOW) / (_MULT_HIGH - _MULT_LOW)))
 
 
 def _soil_readiness_score(
@@ -134,7 +156,7 @@ def get_harvest_recommendation(
         confidence = "Low"
 
     # Expected price premium
-    seasonal = _SEASONAL.get(crop, {})
+    seasonal = _seasonal(crop)
     mult = seasonal.get(window_start.month, 1.0)
     premium = f"{int((mult - 1) * 100):+d}%" if mult != 1.0 else "+0%"
 
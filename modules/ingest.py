@@ -0,0 +1,90 @@
+"""
+AgriChain – modules/ingest.py
+Incremental price ingestion: daily delta files become append-only segments.
+
+A delta is a CSV in the layout of one of the two datasets — mandi_prices.csv
+(Crop, Mandi, Price, Date) or Agriculture_price_dataset.csv (Commodity,
+Market Name, Modal/Min/Max_Price, Price Date) — and is written as a new
+immutable segment of that dataset's log (see price_store.SegmentLog).  Only
+the delta is parsed; readers append the segments to the compact columns they
+already have, later rows winning on (crop, mandi, date).  Each segment moves
+the dataset's version (price_store.data_version / agri_store.data_signature),
+which every cache in data_loader, price_analysis and price_predictor keys on,
+so the next page render sees the new prices.  A mandi_prices delta also
+refreshes the materialised rollup (modules/rollup) for the pairs it touches.
+
+Re-ingesting a file that was already ingested is a no-op.
+
+    python -m modules.ingest delta.csv            # one file
+    python -m modules.ingest data/incoming        # every *.csv in a directory
+    python -m modules.ingest --watch 10           # poll data/incoming/ every 10 s
+"""
+
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from modules import agri_store, price_store, rollup
+from modules.price_store import DATA_DIR
+
+INCOMING_DIR = DATA_DIR / "incoming"
+
+_LAYOUTS = {
+    "mandi_prices": ({"Crop", "Mandi", "Price", "Date"}, price_store.ingest_delta),
+    "agri_prices":  ({"Commodity", "Market Name", "Modal_Price", "Price Date"}, agri_store.ingest_delta),
+}
+
+
+def detect_layout(path: Path) -> str:
+    """Which dataset a delta file belongs to, from its header."""
+    header = {c.strip() for c in pd.read_csv(path, nrows=0).columns}
+    for name, (required, _) in _LAYOUTS.items():
+        if required <= header:
+            return name
+    raise ValueError(f"{path.name}: columns {sorted(header)} match no known price layout")
+
+
+def ingest_file(path: Path) -> tuple[str, int]:
+    """(dataset, rows appended) for one delta file."""
+    layout = detect_layout(path)
+    rows = _LAYOUTS[layout][1](path)
+    if rows and layout == "mandi_prices":
+        rollup.refresh()
+    return layout, rows
+
+
+def ingest(path: Path = INCOMING_DIR) -> dict[str, tuple[str, int]]:
+    """Ingest one delta file, or every *.csv in a directory in name order."""
+    path = Path(path)
+    files = sorted(path.glob("*.csv")) if path.is_dir() else [path]
+    return {f.name: ingest_file(f) for f in files}
+
+
+def watch(directory: Path = INCOMING_DIR, interval: float = 10.0) -> None:
+    """Poll a drop directory and ingest new files as they appear."""
+    directory.mkdir(parents=True, exist_ok=True)
+    while True:
+        for name, (layout, rows) in ingest(directory).items():
+            if rows:
+                print(f"{name}: {rows} rows → {layout}")
+        time.sleep(interval)
+
+
+# ── CLI  (python -m modules.ingest) ───────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append daily price deltas as new segments")
+    parser.add_argument("path", nargs="?", type=Path, default=INCOMING_DIR,
+                        help="delta CSV or drop directory (default: data/incoming/)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="keep polling the directory at this interval")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.path, args.watch)
+    else:
+        for name, (layout, rows) in ingest(args.path).items():
+            print(f"{name}: {rows} rows → {layout}" if rows else f"{name}: already ingested")
@@ -1,21 +1,61 @@
 """
 modules/mandi_ranker.py — Rank mandis by net profit after transport cost.
+
+Every mandi with data for the crop is scored at once: latest prices (from
+the rollup) and mandi coordinates are held as NumPy arrays per crop and data
+version, distances and net profits are computed in one vectorised pass, and
+np.argpartition picks the top_n without sorting the whole list.
+
+Mandis missing from MANDI_COORDINATES stay candidates, but their distance,
+transport cost and net profit are unknown (None) — get_mandi_coords would
+place them at the Maharashtra centre, making those numbers fictitious.  They
+rank after every mapped mandi, by price, and fill the list only when fewer
+than top_n mandis are mapped.
 """
 from __future__ import annotations
 import math
+import numpy as np
 from utils.geo import DISTRICT_COORDS
-from modules.data_loader import get_top_mandis_for_crop, get_mandi_coords
+from modules.data_loader import MANDI_COORDINATES, cached_per_version, get_rollup
+from modules.price_analysis import _round2
 
 
 TRANSPORT_RATE_PER_KM_QTL = 1.8  # ₹ per km per quintal
+EARTH_RADIUS_KM = 6371
+
+
+def _haversine_many(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance (km) from one origin to arrays of points."""
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = np.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon/2)**2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+
 
+@cached_per_version
+def _crop_mandis(crop: str) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray]:
+    """(mandi names, latest prices, latitudes, longitudes) of the crop's mandis; NaN where unmapped."""
+    rows = get_rollup().for_crop(crop)
+    names = rows["Mandi"].tolist()
+    coords = np.array(
+        [MANDI_COORDINATES.get(m, (np.nan, np.nan)) for m in names], dtype=np.float64,
+    ).reshape(-1, 2)
+    # whole rupees, as get_top_mandis_for_crop reports them
+    prices = rows["latest_price"].to_numpy(dtype=np.float64).round(0)
+    return names, prices, coords[:, 0], coords[:, 1]
 
-def _haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+def _reason(price: float, dist_km: float | None, net_profit: float | None) -> str:
+    if dist_km is None:
+        return f"Location not mapped — ₹{price:,.0f}/qtl before transport"
+    elif dist_km < 30:
+        return f"Very close ({dist_km:.0f} km) — minimal transport cost"
+    elif net_profit > price * 0.9:
+        return f"High price ₹{price:,.0f} more than offsets {dist_km:.0f} km distance"
+    elif dist_km > 150:
+        return f"Far ({dist_km:.0f} km) but strong price ₹{price:,.0f}/qtl"
+    else:
+        return f"Balanced: ₹{price:,.0f}/qtl with {dist_km:.0f} km transport"
 
 
 def rank_mandis(
@@ -25,49 +65,60 @@ def rank_mandis(
     top_n: int = 3,
 ) -> list[dict]:
     """
-    Return top_n mandis ranked by net profit per quintal after transport.
-    
+    Return top_n mandis ranked by net profit per quintal after transport,
+    out of every mandi that has data for the crop.  Ties go to the higher
+    price, then the mandi name.  Unmapped mandis follow the mapped ones,
+    by price then name.
+
     Each dict contains:
         mandi, expected_price, distance_km, transport_cost_qtl,
         net_profit_per_qtl, total_transport, reason
+    distance_km, transport_cost_qtl, net_profit_per_qtl and total_transport
+    are None for a mandi without coordinates.
     """
     origin = DISTRICT_COORDS.get(district, (19.75, 75.71))
-    top_mandis = get_top_mandis_for_crop(crop, n=20)
-
-    if top_mandis.empty:
+    names, prices, lat, lon = _crop_mandis(crop)
+    if not names or top_n <= 0:
         return []
 
-    results = []
-    for _, row in top_mandis.iterrows():
-        mandi_name = row["Mandi"]
-        price = float(row["LatestPrice"])
-        coords = get_mandi_coords(mandi_name)
-        dist_km = _haversine(origin[0], origin[1], coords[0], coords[1])
-
-        transport_per_qtl = round(dist_km * TRANSPORT_RATE_PER_KM_QTL, 2)
-        net_profit = round(price - transport_per_qtl, 2)
-        total_transport = round(transport_per_qtl * quantity, 2)
-
-        # Generate reason
-        if dist_km < 30:
-            reason = f"Very close ({dist_km:.0f} km) — minimal transport cost"
-        elif net_profit > price * 0.9:
-            reason = f"High price ₹{price:,.0f} more than offsets {dist_km:.0f} km distance"
-        elif dist_km > 150:
-            reason = f"Far ({dist_km:.0f} km) but strong price ₹{price:,.0f}/qtl"
-        else:
-            reason = f"Balanced: ₹{price:,.0f}/qtl with {dist_km:.0f} km transport"
-
-        results.append({
-            "mandi": mandi_name,
-            "expected_price": price,
-            "distance_km": dist_km,
-            "transport_cost_qtl": transport_per_qtl,
-            "net_profit_per_qtl": net_profit,
-            "total_transport": total_transport,
-            "reason": reason,
-        })
-
-    # Sort by net profit descending
-    results.sort(key=lambda x: x["net_profit_per_qtl"], reverse=True)
-    return results[:top_n]
+    mapped = np.flatnonzero(~np.isnan(lat))
+    dist_km = _haversine_many(origin[0], origin[1], lat[mapped], lon[mapped])
+    transport_per_qtl = _round2(dist_km * TRANSPORT_RATE_PER_KM_QTL)
+    net_profit = _round2(prices[mapped] - transport_per_qtl)
+
+    # Top-k by net profit: partition, keep everything tied with the k-th value,
+    # then order just those exactly.
+    k = min(top_n, len(mapped))
+    order = []
+    if k:
+        kth = net_profit[np.argpartition(-net_profit, k - 1)[:k]].min()
+        candidates = np.flatnonzero(net_profit >= kth)
+        order = sorted(candidates.tolist(), key=lambda j: (-net_profit[j], -prices[mapped[j]], names[mapped[j]]))[:k]
+
+    results = [
+        {
+            "mandi": names[i],
+            "expected_price": float(prices[i]),
+            "distance_km": float(dist_km[j]),
+            "transport_cost_qtl": float(transport_per_qtl[j]),
+            "net_profit_per_qtl": float(net_profit[j]),
+            "total_transport": round(float(transport_per_qtl[j]) * quantity, 2),
+            "reason": _reason(float(prices[i]), float(dist_km[j]), float(net_profit[j])),
+        }
+        for j, i in ((j, mapped[j]) for j in order)
+    ]
+    if len(results) < top_n:
+        unmapped = sorted(np.flatnonzero(np.isnan(lat)).tolist(), key=lambda i: (-prices[i], names[i]))
+        results += [
+            {
+                "mandi": names[i],
+                "expected_price": float(prices[i]),
+                "distance_km": None,
+                "transport_cost_qtl": None,
+                "net_profit_per_qtl": None,
+                "total_transport": None,
+                "reason": _reason(float(prices[i]), None, None),
+            }
+            for i in unmapped[:top_n - len(results)]
+        ]
+    return results
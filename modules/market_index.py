@@ -0,0 +1,216 @@
+"""
+AgriChain – modules/market_index.py
+Normalised market-name index for resolving UI mandi names to dataset rows.
+
+Built once per commodity partition over its distinct market names (a few
+hundred at most), not over the rows: each name is normalised ("Lasalgaon
+(Niphad)" → "lasalgaon niphad"), split into tokens and character trigrams,
+and given aliases (its base name before any parenthesised sub-yard, plus
+the hand-kept ALIASES spellings).  The partition's rows are grouped by
+market once (a stable argsort), so a match maps straight to row ranges.
+
+resolve() tries, in order, and reports which rule matched with a confidence:
+
+    exact        case-insensitive name                       1.0
+    normalised   same name up to punctuation / spacing        0.95
+    alias        base name or ALIASES spelling                0.9
+    tokens       every base-name token present (all markets   0.8
+                 of a town, e.g. each Lasalgaon sub-yard)
+    trigram      closest spelling by trigram Jaccard          ≤ 0.7
+
+Callers that train on the matched rows pass ``min_confidence`` so a loose
+trigram guess ("Punee" → Pune at 0.4) is treated as no match.
+"""
+
+from __future__ import annotations
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from modules.agri_store import data_signature, load_partition_columns
+
+# Known alternative spellings, as normalised query → normalised dataset name.
+ALIASES: dict[str, str] = {
+    "ahmadnagar":  "ahmednagar",
+    "pimpalgaon":  "pimpalgaon baswant",
+    "pimpalgaon basvant": "pimpalgaon baswant",
+    "navi mumbai": "mumbai",
+    "vashi":       "mumbai",
+    "sholapur":    "solapur",
+    "poona":       "pune",
+}
+
+# Words that do not identify a market
+STOPWORDS = {"apmc", "mandi", "market", "yard", "f&v", "fv"}
+
+TRIGRAM_MIN = 0.5
+
+
+def normalize(name: str) -> str:
+    """Lower-case, punctuation to spaces, stopwords dropped, spaces collapsed."""
+    words = re.sub(r"[^a-z0-9&]+", " ", name.lower()).split()
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+def base_name(name: str) -> str:
+    """Normalised name without the parenthesised part: 'Lasalgaon(Niphad)' → 'lasalgaon'."""
+    return normalize(name.split("(")[0])
+
+
+def trigrams(norm: str) -> set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class MarketMatch:
+    query:      str
+    markets:    list[str]                 # dataset market names matched
+    ranges:     list[tuple[int, int]]     # [start, stop) into MarketIndex.order, one per market
+    rows:       np.ndarray                # partition row numbers, ascending
+    confidence: float
+    method:     str
+
+
+class MarketIndex:
+    """Distinct market names of one partition, with row ranges per market."""
+
+    def __init__(self, names: list[str], codes: np.ndarray):
+        self.names  = list(names)
+        codes       = np.asarray(codes)
+        self.order  = np.argsort(codes, kind="stable").astype(np.int32)
+        counts      = np.bincount(codes, minlength=len(self.names))
+        self.bounds = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        self._exact:    dict[str, int] = {}
+        self._norm:     dict[str, list[int]] = defaultdict(list)
+        self._alias:    dict[str, list[int]] = defaultdict(list)
+        self._tokens:   dict[str, set[int]]  = defaultdict(set)
+        self._trigrams: dict[str, set[int]]  = defaultdict(set)
+        self._grams:    list[set[str]] = []
+        for i, name in enumerate(self.names):
+            norm = normalize(name)
+            self._exact.setdefault(name.strip().lower(), i)
+            self._norm[norm].append(i)
+            self._alias[base_name(name)].append(i)
+            for tok in norm.split():
+                self._tokens[tok].add(i)
+            grams = trigrams(norm)
+            self._grams.append(grams)
+            for g in grams:
+                self._trigrams[g].add(i)
+
+    def n_rows(self, i: int) -> int:
+        return int(self.bounds[i + 1] - self.bounds[i])
+
+    def _match(self, query: str, ids: list[int], confidence: float, method: str) -> MarketMatch:
+        ids = sorted(set(ids))
+        ranges = [(int(self.bounds[i]), int(self.bounds[i + 1])) for i in ids]
+        rows = np.sort(np.concatenate([self.order[a:b] for a, b in ranges])) if ranges \
+            else np.empty(0, dtype=np.int32)
+        return MarketMatch(query, [self.names[i] for i in ids], ranges, rows, confidence, method)
+
+    def _rows(self, ids) -> int:
+        return sum(self.n_rows(i) for i in set(ids))
+
+    def _trigram(self, norm: str) -> tuple[int, float] | None:
+        grams = trigrams(norm)
+        candidates = set().union(*(self._trigrams.get(g, ()) for g in grams)) if grams else set()
+        best, best_score = None, 0.0
+        for i in candidates:
+            other = self._grams[i]
+            score = len(grams & other) / len(grams | other)
+            if score > best_score or (score == best_score and best is not None
+                                      and self.n_rows(i) > self.n_rows(best)):
+                best, best_score = i, score
+        return (best, best_score) if best is not None and best_score >= TRIGRAM_MIN else None
+
+    def resolve(self, name: str, min_rows: int = 0) -> MarketMatch | None:
+        """
+        Markets for a UI mandi name.  A single-market match with fewer than
+        ``min_rows`` rows is widened to every market sharing its base name
+        (e.g. all Lasalgaon sub-yards).  None if nothing matches.
+        """
+        norm = normalize(name)
+        base = base_name(name)
+        base = ALIASES.get(base, base)
+
+        ids, confidence, method = None, 0.0, ""
+        if name.strip().lower() in self._exact:
+            ids, confidence, method = [self._exact[name.strip().lower()]], 1.0, "exact"
+        elif norm in self._norm:
+            ids, confidence, method = self._norm[norm], 0.95, "normalised"
+        elif ALIASES.get(norm, norm) in self._norm:
+            ids, confidence, method = self._norm[ALIASES.get(norm, norm)], 0.9, "alias"
+        elif base in self._alias:
+            ids, confidence, method = self._alias[base], 0.9, "alias"
+
+        if ids is None or self._rows(ids) < min_rows:
+            tokens = base.split()
+            if tokens and all(t in self._tokens for t in tokens):
+                widened = set.intersection(*(self._tokens[t] for t in tokens))
+                if widened and (ids is None or self._rows(widened) > self._rows(ids)):
+                    ids, confidence, method = list(widened), 0.8, "tokens"
+
+        if ids is None:
+            hit = self._trigram(norm)
+            if hit is None:
+                return None
+            ids, confidence, method = [hit[0]], round(0.7 * hit[1], 3), "trigram"
+        return self._match(name, ids, confidence, method)
+
+
+def _build_index(commodity: str) -> MarketIndex | None:
+    loaded = load_partition_columns(commodity)
+    if loaded is None:
+        return None
+    entry, cols = loaded
+    return MarketIndex(entry["markets"], cols["market"])
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _indices_for(signature: tuple[int, ...]) -> dict[str, MarketIndex | None]:
+    """Per-commodity indices of one dataset version, filled in on first use."""
+    return {}
+
+
+def load_market_index(commodity: str) -> MarketIndex | None:
+    """Index over one commodity's markets; None when the dataset or commodity is missing."""
+    signature = data_signature()
+    if signature is None:
+        return None
+    indices = _indices_for(signature)
+    key = commodity.strip().lower()
+    if key not in indices:
+        indices[key] = _build_index(key)
+    return indices[key]
+
+
+def resolve_market(
+    commodity: str, mandi: str, min_rows: int = 0, min_confidence: float = 0.0,
+) -> MarketMatch | None:
+    """index.resolve(), treating matches below ``min_confidence`` as no match."""
+    index = load_market_index(commodity)
+    match = None if index is None else index.resolve(mandi, min_rows)
+    return match if match is not None and match.confidence >= min_confidence else None
+
+
+# ── Quick check  (python -m modules.market_index Onion "Lasalgaon(Niphad)") ──
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    crop, mandi = (sys.argv[1:3] + ["Onion", "Lasalgaon(Niphad)"][len(sys.argv[1:3]):])[:2]
+    load_market_index(crop)
+    t0 = time.perf_counter()
+    match = resolve_market(crop, mandi, min_rows=30)
+    dt = (time.perf_counter() - t0) * 1e6
+    if match is None:
+        print(f"no match for {mandi!r} in {crop}")
+    else:
+        print(f"{mandi!r} → {match.markets} ({len(match.rows)} rows) "
+              f"method={match.method} confidence={match.confidence} in {dt:.0f} µs")
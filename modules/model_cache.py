@@ -0,0 +1,170 @@
+"""
+AgriChain – modules/model_cache.py
+Bounded in-process cache for trained price models.
+
+Sits in front of the on-disk model registry (and of training itself): a
+lookup that misses runs the caller's loader — load from the registry, else
+fit — and the result is kept under a byte budget.  Each entry is charged its
+``nbytes`` (compiled forest tables plus the cached feature rows); when the
+total passes the budget the least-recently-used entry (or least-frequently
+used, with policy "lfu") is evicted.  Evicted models stay in the registry,
+so bringing one back is a memory-mapped load, not a refit.
+
+Hits, misses and evictions are counted for the status panel.
+
+Configuration via environment:
+    AGRICHAIN_MODEL_CACHE_MB=256       byte budget
+    AGRICHAIN_MODEL_CACHE_POLICY=lru   lru | lfu
+"""
+
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+POLICIES = ("lru", "lfu")
+DEFAULT_BUDGET_MB = 256
+
+
+class ModelCache:
+    """Byte-budgeted LRU / LFU cache with per-key load de-duplication."""
+
+    def __init__(self, max_bytes: int, policy: str = "lru"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.max_bytes = int(max_bytes)
+        self.policy    = policy
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()   # oldest use first
+        self._uses:    dict[Hashable, int] = {}
+        self._bytes    = 0
+        self._lock     = threading.RLock()
+        self._loading: dict[Hashable, threading.Lock] = {}
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def sizeof(value: Any) -> int:
+        return int(getattr(value, "nbytes", 0) or 0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    # ── Lookup / insert ───────────────────────────────────────────────────────
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            self._uses[key] += 1
+            return True, self._entries[key][0]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._uses[key] = self._uses.get(key, 0) + 1
+            self._bytes += size
+            self._evict(keep=key)
+
+    def _victim(self, keep: Hashable) -> Hashable | None:
+        candidates = [k for k in self._entries if k != keep]
+        if not candidates:
+            return None
+        if self.policy == "lfu":
+            # fewest uses; OrderedDict order breaks ties towards the least recent
+            return min(candidates, key=lambda k: self._uses[k])
+        return candidates[0]
+
+    def _evict(self, keep: Hashable) -> None:
+        while self._bytes > self.max_bytes:
+            victim = self._victim(keep)
+            if victim is None:
+                break   # a single entry larger than the budget is still kept
+            self._bytes -= self._entries.pop(victim)[1]
+            del self._uses[victim]
+            self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for ``key``, else ``loader()`` (stored, even if None).
+        Concurrent misses on the same key run the loader once.
+        """
+        found, value = self._lookup(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            found, value = self._lookup(key)
+            with self._lock:
+                if found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if not found:
+                value = loader()
+                self.put(key, value)
+        with self._lock:
+            self._loading.pop(key, None)
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+                del self._uses[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._uses.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int | str]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":   len(self._entries),
+                "bytes":     self._bytes,
+                "max_bytes": self.max_bytes,
+                "policy":    self.policy,
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+                "hit_rate":  f"{self.hits / lookups:.0%}" if lookups else "–",
+            }
+
+
+def _from_env() -> ModelCache:
+    try:
+        budget_mb = float(os.environ.get("AGRICHAIN_MODEL_CACHE_MB", DEFAULT_BUDGET_MB))
+    except ValueError:
+        budget_mb = DEFAULT_BUDGET_MB
+    policy = os.environ.get("AGRICHAIN_MODEL_CACHE_POLICY", "lru").strip().lower()
+    return ModelCache(int(budget_mb * 1024 * 1024), policy if policy in POLICIES else "lru")
+
+
+# Process-wide cache shared by every session (like st.cache_resource, but bounded)
+MODEL_CACHE = _from_env()
@@ -0,0 +1,156 @@
+"""
+AgriChain – modules/model_registry.py
+On-disk registry of trained price models.
+
+Artifacts live under data/.cache/models/, one directory per (crop, mandi)
+pair and one sub-directory per (feature-schema version, data hash), so a
+restarted worker loads the model it trained last time instead of refitting.
+An artifact is anything with ``save(path)``; it is read back by the loader
+the caller passes in (e.g. a compiled forest's memory-mapped .npy tables).
+When a pair's data changes, callers can keep serving the previous artifact
+while retrain_async() fits the new one on a background thread.
+
+Per-crop settings (the autotuner's chosen forest configuration) are kept as
+JSON beside the crop's pair directories.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from modules.price_store import CACHE_DIR, write_json_atomic
+
+MODEL_DIR = CACHE_DIR / "models"
+
+
+# ── Keys & paths ──────────────────────────────────────────────────────────────
+
+def _slug(name: str) -> str:
+    """Filesystem-safe name; a short hash keeps e.g. 'Pune(Pimpri)' / 'Pune Pimpri' apart."""
+    norm = name.strip().lower()
+    tag  = hashlib.sha1(norm.encode("utf-8")).hexdigest()[:6]
+    return f"{re.sub(r'[^a-z0-9]+', '_', norm).strip('_')}-{tag}"
+
+
+def crop_dir(crop: str) -> Path:
+    return MODEL_DIR / _slug(crop)
+
+
+def pair_dir(crop: str, mandi: str) -> Path:
+    return crop_dir(crop) / _slug(mandi)
+
+
+def artifact_path(crop: str, mandi: str, schema: int, data_hash: str) -> Path:
+    return pair_dir(crop, mandi) / f"s{schema}-{data_hash[:16]}"
+
+
+# ── Load / save ───────────────────────────────────────────────────────────────
+
+def load_path(path: Path, loader: Callable[[Path], Any]) -> Any | None:
+    try:
+        return loader(path)
+    except Exception:
+        return None   # missing, truncated or written by an incompatible version
+
+
+def load(crop: str, mandi: str, schema: int, data_hash: str,
+         loader: Callable[[Path], Any]) -> Any | None:
+    """Artifact for exactly this data version, or None."""
+    path = artifact_path(crop, mandi, schema, data_hash)
+    return load_path(path, loader) if path.is_dir() else None
+
+
+def latest_path(crop: str, mandi: str, schema: int) -> Path | None:
+    """Newest artifact for the pair under this schema, whatever its data hash."""
+    folder = pair_dir(crop, mandi)
+    if not folder.is_dir():
+        return None
+    dirs = [p for p in folder.glob(f"s{schema}-*") if p.is_dir() and not p.name.endswith(".tmp")]
+    dirs.sort(key=lambda p: p.stat().st_mtime_ns)
+    return dirs[-1] if dirs else None
+
+
+def save(crop: str, mandi: str, schema: int, data_hash: str, artifact: Any) -> Path:
+    """Write atomically (temp dir + rename) and drop older artifacts for the pair."""
+    path = artifact_path(crop, mandi, schema, data_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    artifact.save(tmp)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    for old in path.parent.iterdir():
+        if old == path or old.name.endswith(".tmp"):
+            continue
+        if old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            old.unlink(missing_ok=True)
+    return path
+
+
+# ── Per-crop configuration ────────────────────────────────────────────────────
+
+def config_path(crop: str, name: str) -> Path:
+    return crop_dir(crop) / f"{name}.json"
+
+
+def save_config(crop: str, name: str, payload: dict) -> Path:
+    path = config_path(crop, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(path, payload)
+    return path
+
+
+def config_mtime(crop: str, name: str) -> int:
+    """mtime_ns of a crop's config file; 0 if it has none."""
+    try:
+        return config_path(crop, name).stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def load_config(crop: str, name: str) -> dict | None:
+    try:
+        with open(config_path(crop, name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ── Background retraining ─────────────────────────────────────────────────────
+
+_inflight: set[tuple] = set()
+_lock = threading.Lock()
+
+
+def is_training(key: tuple) -> bool:
+    with _lock:
+        return key in _inflight
+
+
+def retrain_async(key: tuple, train: Callable[[], None]) -> bool:
+    """
+    Run ``train`` on a daemon thread unless the same key is already training.
+    Returns True if a new job was started.
+    """
+    with _lock:
+        if key in _inflight:
+            return False
+        _inflight.add(key)
+
+    def _run():
+        try:
+            train()
+        finally:
+            with _lock:
+                _inflight.discard(key)
+
+    threading.Thread(target=_run, name=f"retrain-{key}", daemon=True).start()
+    return True
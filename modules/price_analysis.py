@@ -1,11 +1,23 @@
 """
 AgriChain – modules/price_analysis.py
-Loads mandi price CSV data and computes price trend score.
+Reads mandi prices from the shared price store and computes price trend score.
+
+analyse_all_prices() scores every (crop, mandi) pair in one pass from the
+7- and 30-day calendar means of the materialised rollup (modules/rollup) and is
+cached per data version; the ranking pages read that table.  analyse_prices()
+scores one pair from its rollup row, a dictionary lookup — or, with
+AGRICHAIN_PRICE_BACKEND=sqlite, from the pair's last 30 days queried from
+the shared database (modules/price_db).
 """
 
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
-from pathlib import Path
+
+from modules import price_db
+from modules.data_loader import cached_per_version
+from modules.rollup import load_rollup
+from modules.timeseries import window_mean
 
 
 # ---------------------------------------------------------------------------
@@ -14,49 +26,16 @@ from pathlib import Path
 
 @dataclass
 class PriceAnalysisResult:
-    last_7_avg:    float   # Average price over the last 7 days of available data
-    last_30_avg:   float   # Average price over the last 30 days of available data
+    last_7_avg:    float   # Average daily price over the 7 days up to the last observation
+    last_30_avg:   float   # Average daily price over the 30 days up to the last observation
     trend_percent: float   # % change: (last_7_avg - last_30_avg) / last_30_avg * 100
     price_score:   float   # 0–30 score derived from trend
 
 
-# ---------------------------------------------------------------------------
-# CSV path
-# ---------------------------------------------------------------------------
-
-_CSV_PATH = Path(__file__).parent.parent / "data" / "mandi_prices.csv"
-
-
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-def _load_data() -> pd.DataFrame:
-    """Load and parse the mandi prices CSV."""
-    df = pd.read_csv(_CSV_PATH)
-    df["Crop"]  = df["Crop"].str.strip()
-    df["Mandi"] = df["Mandi"].str.strip()
-    df["Date"]  = pd.to_datetime(df["Date"], dayfirst=True)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df = df.dropna(subset=["Price", "Date"])
-    return df
-
-
-def filter_by_crop_mandi(df: pd.DataFrame, crop: str, mandi: str) -> pd.DataFrame:
-    """Filter dataframe by crop and mandi (case-insensitive)."""
-    mask = (
-        df["Crop"].str.strip().str.lower() == crop.strip().lower()
-    ) & (
-        df["Mandi"].str.strip().str.lower() == mandi.strip().lower()
-    )
-    filtered = df[mask].copy()
-    if filtered.empty:
-        raise ValueError(
-            f"No data found for Crop='{crop}' and Mandi='{mandi}'"
-        )
-    return filtered
-
-
 def _compute_price_score(trend_percent: float) -> float:
     """
     Convert a price trend percentage into a score out of 30.
@@ -84,10 +63,46 @@ def _compute_price_score(trend_percent: float) -> float:
         return 5.0
 
 
+def _score_many(trend: np.ndarray) -> np.ndarray:
+    """_compute_price_score over an array of trend percentages."""
+    return np.select(
+        [trend >= 10, trend >= 5, trend >= 0, trend >= -5, trend >= -10],
+        [30.0, 25.0, 20.0, 15.0, 10.0],
+        default=5.0,
+    )
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    # Python's correctly-rounded round(); np.round can differ by 0.01 on halves
+    return np.array([round(float(v), 2) for v in values], dtype=np.float64)
+
+
 # ---------------------------------------------------------------------------
-# Public entry point
+# Public entry points
 # ---------------------------------------------------------------------------
 
+@cached_per_version
+def analyse_all_prices() -> pd.DataFrame:
+    """
+    Price trend analysis for every (crop, mandi) pair, vectorised over the rollup.
+
+    Returns a DataFrame with Crop, Mandi, last_7_avg, last_30_avg,
+    trend_percent and price_score (see analyse_prices), ordered by crop and
+    mandi.  Cached per data version.
+    Raises FileNotFoundError if the CSV file is missing.
+    """
+    rollup = load_rollup().table
+    table = rollup[["Crop", "Mandi"]].copy()
+    table["last_7_avg"]  = _round2(rollup["mean_7d"].to_numpy())
+    table["last_30_avg"] = _round2(rollup["mean_30d"].to_numpy())
+    base = table["last_30_avg"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = np.where(base == 0, 0.0, (table["last_7_avg"].to_numpy() - base) / base * 100)
+    table["trend_percent"] = _round2(trend)
+    table["price_score"]   = _score_many(table["trend_percent"].to_numpy())
+    return table
+
+
 def analyse_prices(crop: str, mandi: str) -> PriceAnalysisResult:
     """
     Analyse price trends for a given crop and mandi.
@@ -100,38 +115,36 @@ def analyse_prices(crop: str, mandi: str) -> PriceAnalysisResult:
     Returns
     -------
     PriceAnalysisResult with last_7_avg, last_30_avg, trend_percent, price_score.
+    Windows are calendar days ending at the pair's last observation, with
+    days a mandi didn't report carrying the previous price forward
+    (modules/timeseries), so sparse mandis average over real time spans.
 
     Raises
     ------
     ValueError – if no data exists for the given crop/mandi combination.
     FileNotFoundError – if the CSV file is missing.
     """
-    df       = _load_data()
-    filtered = filter_by_crop_mandi(df, crop, mandi)
-
-    # Sort chronologically and use all available data
-    filtered  = filtered.sort_values("Date")
-    prices    = filtered["Price"].tolist()
-
-    # Use last 7 records as proxy for "last 7 days" and all as "last 30 days"
-    last_7    = prices[-7:]  if len(prices) >= 7  else prices
-    last_30   = prices[-30:] if len(prices) >= 30 else prices
-
-    last_7_avg  = round(sum(last_7)  / len(last_7),  2)
-    last_30_avg = round(sum(last_30) / len(last_30), 2)
-
-    if last_30_avg == 0:
-        trend_percent = 0.0
+    if price_db.enabled():
+        days, prices = price_db.window_series(crop, mandi, 30)
+        row = None if len(days) == 0 else {
+            "mean_7d": window_mean(days, prices, 7), "mean_30d": window_mean(days, prices, 30),
+        }
     else:
-        trend_percent = round(((last_7_avg - last_30_avg) / last_30_avg) * 100, 2)
-
-    price_score = _compute_price_score(trend_percent)
-
+        row = load_rollup().row(crop, mandi)
+    if row is None:
+        raise ValueError(
+            f"No data found for Crop='{crop}' and Mandi='{mandi}'"
+        )
+    # same arithmetic as analyse_all_prices, one pair at a time
+    last_7_avg  = round(float(row["mean_7d"]), 2)
+    last_30_avg = round(float(row["mean_30d"]), 2)
+    trend = 0.0 if last_30_avg == 0 else (last_7_avg - last_30_avg) / last_30_avg * 100
+    trend_percent = round(trend, 2)
     return PriceAnalysisResult(
         last_7_avg=last_7_avg,
         last_30_avg=last_30_avg,
         trend_percent=trend_percent,
-        price_score=price_score,
+        price_score=_compute_price_score(trend_percent),
     )
 
 
@@ -0,0 +1,301 @@
+"""
+AgriChain – modules/price_db.py
+Optional SQLite query backend for the mandi price lookups.
+
+With AGRICHAIN_PRICE_BACKEND=sqlite the data_loader lookups (crops, mandis,
+latest and average prices, the per-crop mandi stats, the per-mandi series
+for the map forecast), analyse_prices() and the rollup build (modules/rollup)
+run as indexed queries against one database file, data/.cache/prices.sqlite,
+instead of against a NumPy series index or rollup held by every Streamlit
+worker process.
+
+The database mirrors the price store — mandi_prices.csv plus the ingested
+segments — with one row per price:
+
+    prices(crop_key, mandi_key, day, seq, price, crop, mandi)
+    index  (crop_key, mandi_key, day, seq, price)     covers every query
+
+``*_key`` are the normalised (stripped, lower-case) names the lookups match
+on, ``day`` the day number, ``seq`` the row's position in the store (ties on
+a date resolve like the series index: the later row is the latest).  It is
+synced lazily on the first query after data_version() changes: new segments
+are applied in place (their rows replace earlier ones on crop, mandi, date),
+a changed CSV rebuilds the table, all in one write transaction so other
+processes only ever see a complete table.
+"""
+
+from __future__ import annotations
+import contextlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.price_store import (
+    CACHE_DIR, SEGMENTS, PriceTable,
+    data_version, ensure_store, load_columns, widen_prices,
+)
+
+DB_PATH   = CACHE_DIR / "prices.sqlite"
+DB_FORMAT = "1"
+BACKENDS  = ("numpy", "sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    crop_key  TEXT    NOT NULL,
+    mandi_key TEXT    NOT NULL,
+    day       INTEGER NOT NULL,
+    seq       INTEGER NOT NULL,
+    price     REAL    NOT NULL,
+    crop      TEXT    NOT NULL,
+    mandi     TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_series ON prices (crop_key, mandi_key, day, seq, price);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def backend() -> str:
+    """Configured lookup backend: "numpy" (default) or "sqlite"."""
+    name = os.environ.get("AGRICHAIN_PRICE_BACKEND", "numpy").strip().lower()
+    return name if name in BACKENDS else "numpy"
+
+
+def enabled() -> bool:
+    return backend() == "sqlite"
+
+
+def _key(name: str) -> str:
+    return str(name).strip().lower()
+
+
+@contextlib.contextmanager
+def _connect():
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    try:
+        con.executescript(_SCHEMA)
+        yield con
+    finally:
+        con.close()
+
+
+# ── Sync with the price store ────────────────────────────────────────────────
+
+def _rows(table: PriceTable, seq_start: int = 0):
+    crop_keys  = [_key(c) for c in table.crops]
+    mandi_keys = [_key(m) for m in table.mandis]
+    prices = widen_prices(table.price)
+    for i, (c, m, d, p) in enumerate(zip(table.crop.tolist(), table.mandi.tolist(),
+                                         table.day.tolist(), prices.tolist())):
+        yield crop_keys[c], mandi_keys[m], d, seq_start + i, p, table.crops[c], table.mandis[m]
+
+
+def _delta_rows(delta: pd.DataFrame, seq_start: int):
+    days = delta["Date"].to_numpy().astype("datetime64[D]").astype(np.int64).tolist()
+    for i, (c, m, d, p) in enumerate(zip(delta["Crop"], delta["Mandi"], days, delta["Price"].tolist())):
+        yield _key(c), _key(m), d, seq_start + i, round(float(p), 2), str(c).strip(), str(m).strip()
+
+
+_INSERT = "INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+_synced: dict[str, tuple] = {}
+_sync_lock = threading.Lock()
+
+
+def sync() -> None:
+    """Bring the database up to the current data_version()."""
+    version = data_version()
+    if _synced.get(str(DB_PATH)) == version:
+        return
+    with _sync_lock, _connect() as con:
+        base = ensure_store()["sha1"]
+        segs = [p.name for p in SEGMENTS.segments()]
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            meta = dict(con.execute("SELECT key, value FROM meta"))
+            applied = int(meta.get("segments", -1))
+            incremental = (
+                meta.get("format") == DB_FORMAT and meta.get("base") == base
+                and 0 <= applied <= len(segs)
+                and (applied == 0 or meta.get("last_segment") == segs[applied - 1])
+            )
+            if not incremental:
+                con.execute("DELETE FROM prices")
+                table = PriceTable(*load_columns()).extend(SEGMENTS.frame())
+                con.executemany(_INSERT, _rows(table))
+            elif applied < len(segs):
+                # same rule as PriceTable.extend: the last row per (crop, mandi, date) wins
+                delta = SEGMENTS.frame(applied).drop_duplicates(["Crop", "Mandi", "Date"], keep="last")
+                next_seq = con.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM prices").fetchone()[0]
+                rows = list(_delta_rows(delta, next_seq))
+                con.executemany(
+                    "DELETE FROM prices WHERE crop_key = ? AND mandi_key = ? AND day = ? "
+                    "AND crop = ? AND mandi = ?",
+                    [(r[0], r[1], r[2], r[5], r[6]) for r in rows],
+                )
+                con.executemany(_INSERT, rows)
+            con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("format", DB_FORMAT), ("base", base), ("segments", str(len(segs))),
+                ("last_segment", segs[-1] if segs else ""),
+            ])
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+    _synced[str(DB_PATH)] = version
+
+
+# ── Queries ───────────────────────────────────────────────────────────────────
+
+def _query(sql: str, params: tuple = ()) -> list[tuple]:
+    sync()
+    with _connect() as con:
+        return con.execute(sql, params).fetchall()
+
+
+def crops() -> list[str]:
+    """Sorted crop names (one spelling per normalised name)."""
+    return sorted(r[0] for r in _query("SELECT MIN(crop) FROM prices GROUP BY crop_key"))
+
+
+def mandis(crop: str) -> list[str]:
+    rows = _query("SELECT MIN(mandi) FROM prices WHERE crop_key = ? GROUP BY mandi_key", (_key(crop),))
+    return sorted(r[0] for r in rows)
+
+
+def mandi_counts(crop: str) -> list[tuple[str, int]]:
+    """[(mandi, rows), …] for a crop, ordered by mandi name."""
+    rows = _query(
+        "SELECT MIN(mandi), COUNT(*) FROM prices WHERE crop_key = ? GROUP BY mandi_key",
+        (_key(crop),),
+    )
+    return sorted(rows)
+
+
+def recent_prices(crop: str, mandi: str, n: int) -> np.ndarray:
+    """The series' last ``n`` prices, oldest first (empty if unknown)."""
+    rows = _query(
+        "SELECT price FROM prices WHERE crop_key = ? AND mandi_key = ? "
+        "ORDER BY day DESC, seq DESC LIMIT ?",
+        (_key(crop), _key(mandi), n),
+    )
+    return np.array([r[0] for r in reversed(rows)], dtype=np.float64)
+
+
+def series(crop: str, mandi: str) -> tuple[np.ndarray, np.ndarray]:
+    """(int32 day numbers, prices) of one series, oldest first."""
+    rows = _query(
+        "SELECT day, price FROM prices WHERE crop_key = ? AND mandi_key = ? ORDER BY day, seq",
+        (_key(crop), _key(mandi)),
+    )
+    days, prices = zip(*rows) if rows else ((), ())
+    return np.asarray(days, dtype=np.int32), np.asarray(prices, dtype=np.float64)
+
+
+def window_series(crop: str, mandi: str, n_days: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    series() trimmed to what a calendar window of ``n_days`` ending at the
+    last observation reads: the rows from the observation in force on its
+    first day onwards (timeseries.window_mean gives the same result on it).
+    """
+    key = (_key(crop), _key(mandi))
+    rows = _query(
+        """
+        WITH last AS (SELECT MAX(day) - ? + 1 AS lo FROM prices
+                       WHERE crop_key = ? AND mandi_key = ?)
+        SELECT day, price FROM prices
+         WHERE crop_key = ? AND mandi_key = ?
+           AND day >= COALESCE((SELECT MAX(day) FROM prices, last
+                                 WHERE crop_key = ? AND mandi_key = ? AND day <= last.lo),
+                               (SELECT lo FROM last))
+         ORDER BY day, seq
+        """,
+        (n_days, *key, *key, *key),
+    )
+    days, prices = zip(*rows) if rows else ((), ())
+    return np.asarray(days, dtype=np.int32), np.asarray(prices, dtype=np.float64)
+
+
+def crop_stats(crop: str) -> list[tuple[str, float, float]]:
+    """[(mandi, mean price, latest price), …] for every mandi of a crop, by mandi."""
+    return _query(
+        """
+        SELECT MIN(p.mandi), AVG(p.price),
+               (SELECT price FROM prices l
+                 WHERE l.crop_key = p.crop_key AND l.mandi_key = p.mandi_key
+                 ORDER BY l.day DESC, l.seq DESC LIMIT 1)
+          FROM prices p
+         WHERE p.crop_key = ?
+         GROUP BY p.mandi_key
+         ORDER BY p.mandi_key
+        """,
+        (_key(crop),),
+    )
+
+
+def crop_series(crop: str) -> list[tuple[str, np.ndarray, np.ndarray]]:
+    """[(mandi, int32 day numbers, prices), …] for every mandi of a crop, oldest first."""
+    rows = _query(
+        "SELECT mandi_key, mandi, day, price FROM prices WHERE crop_key = ? "
+        "ORDER BY mandi_key, day, seq",
+        (_key(crop),),
+    )
+    out: list[tuple[str, np.ndarray, np.ndarray]] = []
+    if not rows:
+        return out
+    keys, names, days, prices = zip(*rows)
+    keys = np.asarray(keys, dtype=object)
+    days = np.asarray(days, dtype=np.int32)
+    prices = np.asarray(prices, dtype=np.float64)
+    breaks = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    for a, b in zip(np.r_[0, breaks], np.r_[breaks, len(keys)]):
+        out.append((min(names[a:b]), days[a:b], prices[a:b]))
+    return out
+
+
+def pair_series(k: int | None = None):
+    """
+    Every pair's rows in series-index layout: ([(crop, mandi), …], prices,
+    days, starts, stops) with each pair's rows oldest first in [start, stop).
+    With ``k`` only each pair's last k rows are returned.
+    """
+    rows = _query(
+        """
+        SELECT crop_key, mandi_key, MIN(crop) OVER w, MIN(mandi) OVER w, price, day
+          FROM (SELECT crop_key, mandi_key, crop, mandi, price, day, seq,
+                       ROW_NUMBER() OVER (PARTITION BY crop_key, mandi_key
+                                          ORDER BY day DESC, seq DESC) AS rn
+                  FROM prices)
+         WHERE rn <= ?
+        WINDOW w AS (PARTITION BY crop_key, mandi_key)
+         ORDER BY crop_key, mandi_key, day, seq
+        """,
+        (2**62 if k is None else k,),
+    )
+    empty = np.empty(0, dtype=np.int64)
+    if not rows:
+        return [], np.empty(0), empty.astype(np.int32), empty, empty
+    crop_keys, mandi_keys, crops, mandis, prices, days = zip(*rows)
+    pair = np.array([f"{c}\x00{m}" for c, m in zip(crop_keys, mandi_keys)], dtype=object)
+    breaks = np.flatnonzero(pair[1:] != pair[:-1]) + 1
+    starts = np.r_[0, breaks].astype(np.int64)
+    stops  = np.r_[breaks, len(pair)].astype(np.int64)
+    names  = [(crops[a], mandis[a]) for a in starts.tolist()]
+    return (names, np.asarray(prices, dtype=np.float64), np.asarray(days, dtype=np.int32),
+            starts, stops)
+
+
+# ── Quick check  (python -m modules.price_db) ────────────────────────────────
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    sync()
+    print(f"synced in {time.perf_counter() - t0:.2f}s → {DB_PATH}")
+    t0 = time.perf_counter()
+    names, prices, days, starts, stops = pair_series()
+    print(f"{len(names)} pairs, {len(prices)} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -2,119 +2,212 @@
 AgriChain – modules/price_predictor.py
 ML-based price prediction using RandomForest on Agriculture_price_dataset.csv.
 
-Trains a separate model per (Commodity, Market) pair, cached for the session.
+Trains a separate model per (Commodity, Market) pair and persists it in the
+on-disk model registry, keyed by feature schema and training-data hash.
 Uses iterative (autoregressive) prediction so each day's forecast feeds
 into the next day's features, producing realistically evolving prices.
+A direct multi-horizon model, trained alongside, predicts the whole 30-day
+price vector from the current feature row in one shot (mode="direct").
+When sklearn is missing or a pair has fewer than 30 rows, the vectorised
+statistical engine (modules/stat_forecast) answers instead.
 """
 
 from __future__ import annotations
+import hashlib
+import importlib.util
+import json
+from collections import Counter
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime, timedelta
 import streamlit as st
 
-try:
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.preprocessing import StandardScaler
-    HAS_SKLEARN = True
-except ImportError:
-    HAS_SKLEARN = False
+from modules import model_registry
+from modules.forecast_cache import FORECAST_CACHE
+from modules.model_cache import MODEL_CACHE
+from modules.features import FEATURE_COLS, HISTORY, N_FEATURES, FeatureEngine
+from modules.feature_store import feature_matrix
+from modules.forest import FlatForest
+from modules.market_index import resolve_market
+from modules.stat_forecast import forecast_series
+from modules.timeseries import recent_daily
+# Larger agriculture dataset (737k rows, all-India), streamed once into
+# per-commodity partitions by modules/agri_store.
+from modules.agri_store import AGRI_CSV, data_signature, default_filters, load_partition
 
-# Path to the larger agriculture dataset (737k rows, all-India)
-AGRI_CSV = Path(__file__).resolve().parent.parent / "data" / "Agriculture_price_dataset.csv"
+# sklearn is only needed to *train*; registered models are compiled forests
+# served with NumPy alone, so it is imported lazily inside _fit_model.
+HAS_SKLEARN = importlib.util.find_spec("sklearn") is not None
 
 
-# ── Feature engineering ──────────────────────────────────────────────────────
+# ── Feature engineering (definitions live in modules/features) ──────────────
 
 def _build_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.sort_values("Date").copy()
-    df["day_of_year"]  = df["Date"].dt.dayofyear
-    df["month"]        = df["Date"].dt.month
-    df["day_of_week"]  = df["Date"].dt.dayofweek
-    df["week_of_year"] = df["Date"].dt.isocalendar().week.astype(int)
-    df["trend"]        = np.arange(len(df))
+    """
+    Date, Price, Spread and FEATURE_COLS for every row with 30 prior
+    observations.  Features only look at earlier rows, exactly as the
+    autoregressive forecast sees them.  Rows come from the persistent
+    feature store, so a grown series only computes its new dates.
+    """
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    if "Min_Price" in df.columns and "Max_Price" in df.columns:
+        # a missing min/max carries the previous day's spread forward
+        spread = (df["Max_Price"] - df["Min_Price"]).ffill().fillna(0.0).to_numpy(dtype=np.float64)
+    else:
+        spread = np.zeros(len(df))
 
-    df["lag_7"]  = df["Price"].shift(7)
-    df["lag_14"] = df["Price"].shift(14)
-    df["lag_30"] = df["Price"].shift(30)
+    days = df["Date"].to_numpy().astype("datetime64[D]").astype(np.int32)
+    X = feature_matrix(days, df["Price"].to_numpy(dtype=np.float64), spread)
+    out = df.loc[HISTORY:, ["Date", "Price"]].reset_index(drop=True)
+    out["Spread"] = spread[HISTORY:]
+    out[FEATURE_COLS] = X
+    return out
 
-    df["roll_mean_7"]  = df["Price"].rolling(7,  min_periods=1).mean()
-    df["roll_std_7"]   = df["Price"].rolling(7,  min_periods=1).std().fillna(0)
-    df["roll_mean_14"] = df["Price"].rolling(14, min_periods=1).mean()
-    df["roll_mean_30"] = df["Price"].rolling(30, min_periods=1).mean()
 
-    df["momentum_7"]  = df["Price"] - df["roll_mean_7"]
-    df["momentum_14"] = df["Price"] - df["roll_mean_14"]
+# Bump whenever the feature definitions (or the artifact contents) change
+# meaning, so models persisted by the registry under the old ones are not loaded.
+FEATURE_SCHEMA_VERSION = 3
 
-    if "Min_Price" in df.columns and "Max_Price" in df.columns:
-        df["price_spread"] = df["Max_Price"] - df["Min_Price"]
-    else:
-        df["price_spread"] = 0
+# Bump whenever the way a forecast is computed from a model or series changes,
+# so results cached by modules/forecast_cache (possibly on disk) are not served.
+FORECAST_VERSION = 2
+
+# The direct model predicts prices 1..DIRECT_HORIZON steps after the last
+# observation; longer forecasts always use the iterative loop.
+DIRECT_HORIZON = 30
+FORECAST_MODES = ("iterative", "direct")
+
+
+def _direct_targets(featured: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (X, Y) for the direct model: row j's features describe the next price,
+    Y[j, h-1] is the price h steps ahead of the row's last observation.
+    """
+    prices = featured["Price"].to_numpy(dtype=np.float64)
+    n = len(prices) - DIRECT_HORIZON + 1
+    if n <= 0:
+        return np.empty((0, N_FEATURES)), np.empty((0, DIRECT_HORIZON))
+    Y = np.lib.stride_tricks.sliding_window_view(prices, DIRECT_HORIZON)[:n]
+    return featured[FEATURE_COLS].to_numpy()[:n], Y
 
-    df = df.dropna()
-    return df
 
+# ── Training data ────────────────────────────────────────────────────────────
 
-FEATURE_COLS = [
-    "day_of_year", "month", "day_of_week", "week_of_year", "trend",
-    "lag_7", "lag_14", "lag_30",
-    "roll_mean_7", "roll_std_7", "roll_mean_14", "roll_mean_30",
-    "momentum_7", "momentum_14", "price_spread",
-]
+MIN_TRAIN_ROWS = 30
 
+# Market matches below this confidence (loose trigram spellings) are not
+# trained on; the pair falls back to the statistical forecast.
+MIN_MATCH_CONFIDENCE = 0.6
 
-# ── Cached data loader ───────────────────────────────────────────────────────
 
 @st.cache_data(show_spinner=False)
-def _load_agri_data():
-    if not AGRI_CSV.exists():
+def _pair_rows(crop: str, mandi: str, signature: tuple[int, ...]) -> pd.DataFrame | None:
+    """Date/Price/Min_Price/Max_Price rows for one pair, however few; None if none."""
+    crop_df = load_partition(crop)
+    match = None if crop_df is None else resolve_market(
+        crop, mandi, min_rows=MIN_TRAIN_ROWS, min_confidence=MIN_MATCH_CONFIDENCE,
+    )
+    if match is None or len(match.rows) == 0:
         return None
-    df = pd.read_csv(AGRI_CSV)
-    df.columns = [c.strip() for c in df.columns]
-    for col in ["STATE", "District Name", "Market Name", "Commodity"]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-    for col in ["Min_Price", "Max_Price", "Modal_Price"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    if "Price Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Price Date"], dayfirst=True, errors="coerce")
-    df = df.dropna(subset=["Modal_Price", "Date"])
-    return df
-
-
-# ── Model training (cached per session) ──────────────────────────────────────
-
-@st.cache_resource(show_spinner=False)
-def _train_model(crop: str, mandi: str):
-    if not HAS_SKLEARN:
-        return None, None, None
 
-    full_df = _load_agri_data()
-    if full_df is None:
-        return None, None, None
+    # Exact / normalised / alias market; widened to all markets of the town
+    # (e.g. every Lasalgaon sub-yard) when that has too few rows to train on.
+    sub = crop_df.iloc[match.rows].copy()
+
+    sub = sub.rename(columns={"Modal_Price": "Price"})
+    return sub[["Date", "Price", "Min_Price", "Max_Price"]].reset_index(drop=True)
+
+
+def _load_series(crop: str, mandi: str, signature: tuple[int, ...]) -> pd.DataFrame | None:
+    """The pair's rows if there are enough to train on (MIN_TRAIN_ROWS), else None."""
+    sub = _pair_rows(crop, mandi, signature)
+    if sub is None or len(sub) < MIN_TRAIN_ROWS:
+        return None
+    return sub
 
-    sub = full_df[
-        (full_df["Commodity"].str.lower() == crop.lower()) &
-        (full_df["Market Name"].str.lower() == mandi.lower())
-    ].copy()
 
-    if len(sub) < 30:
-        sub = full_df[
-            (full_df["Commodity"].str.lower() == crop.lower()) &
-            (full_df["Market Name"].str.contains(mandi.split("(")[0].strip(), case=False, na=False))
-        ].copy()
+def _series_hash(sub: pd.DataFrame) -> str:
+    """Content hash of a training series; the model registry's data version."""
+    h = hashlib.sha1()
+    for col in ["Date", "Price", "Min_Price", "Max_Price"]:
+        h.update(np.ascontiguousarray(sub[col].to_numpy()).tobytes())
+    return h.hexdigest()
 
-    if len(sub) < 30:
-        return None, None, None
 
-    sub = sub.rename(columns={"Modal_Price": "Price"})
-    sub = sub[["Date", "Price", "Min_Price", "Max_Price"]].copy()
+def _model_hash(crop: str, sub: pd.DataFrame) -> str:
+    """Registry version of a pair's model: its series plus any tuned forest settings."""
+    data_hash = _series_hash(sub)
+    params = forest_params(crop)
+    if params == DEFAULT_FOREST_PARAMS:
+        return data_hash
+    tag = json.dumps(params, sort_keys=True)
+    return hashlib.sha1(f"{data_hash}|{tag}".encode("utf-8")).hexdigest()
+
+
+# ── Model training (persisted in modules/model_registry, cached in
+#    modules/model_cache) ─────────────────────────────────────────────────────
+
+@dataclass
+class PriceModel:
+    forest:    FlatForest | None   # compiled forest, StandardScaler folded in (None: direct-only fit)
+    last_data: pd.DataFrame   # last 60 feature rows (Date, Price, Spread, FEATURE_COLS)
+    direct:    FlatForest | None = None   # DIRECT_HORIZON outputs; None if too little data
+
+    @property
+    def nbytes(self) -> int:
+        """Memory charged to the model cache."""
+        direct = self.direct.nbytes if self.direct is not None else 0
+        forest = self.forest.nbytes if self.forest is not None else 0
+        return forest + direct + int(self.last_data.memory_usage(deep=True).sum())
+
+    def save(self, path: Path) -> None:
+        if self.forest is not None:
+            self.forest.save(path / "forest")
+        if self.direct is not None:
+            self.direct.save(path / "direct")
+        self.last_data.to_pickle(path / "last_data.pkl")
+
+    @classmethod
+    def load(cls, path: Path) -> "PriceModel":
+        forest = FlatForest.load(path / "forest") if (path / "forest").is_dir() else None
+        direct = FlatForest.load(path / "direct") if (path / "direct").is_dir() else None
+        return cls(forest, pd.read_pickle(path / "last_data.pkl"), direct)
+
+
+DEFAULT_FOREST_PARAMS = {"n_estimators": 100, "max_depth": 12, "min_samples_leaf": 3}
+
+
+def forest_params(crop: str) -> dict:
+    """Forest settings for a crop: chosen by modules/autotune if tuned, else the defaults."""
+    tuned = model_registry.load_config(crop, "tuning")
+    if tuned and tuned.get("params"):
+        return {**DEFAULT_FOREST_PARAMS, **tuned["params"]}
+    return dict(DEFAULT_FOREST_PARAMS)
+
+
+def _new_forest(n_jobs: int = -1, params: dict | None = None):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(
+        **(params or DEFAULT_FOREST_PARAMS), random_state=42, n_jobs=n_jobs,
+    )
+
+
+def _fit_model(
+    sub: pd.DataFrame, n_jobs: int = -1, direct: bool = True, params: dict | None = None,
+    iterative: bool = True,
+) -> PriceModel | None:
+    """
+    Fit the one-step forest and (with ``direct``) the multi-horizon one.
+    iterative=False skips the one-step forest, so the backtest can time the
+    direct model on its own; such a model has no ``forest``.
+    """
+    from sklearn.preprocessing import StandardScaler
 
     featured = _build_features(sub)
     if len(featured) < 20:
-        return None, None, None
+        return None
 
     X = featured[FEATURE_COLS].values
     y = featured["Price"].values
@@ -122,74 +215,257 @@ def _train_model(crop: str, mandi: str):
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
-    model = RandomForestRegressor(
-        n_estimators=100, max_depth=12, min_samples_leaf=3,
-        random_state=42, n_jobs=-1,
+    forest = None
+    if iterative:
+        model = _new_forest(n_jobs, params)
+        model.fit(X_scaled, y)
+        forest = FlatForest.from_sklearn(model, scaler)
+
+    # Multi-output forest over the same (scaled) features for the direct mode
+    direct_forest = None
+    X_direct, Y_direct = _direct_targets(featured)
+    if direct and len(X_direct) >= 20:
+        direct_model = _new_forest(n_jobs, params)
+        direct_model.fit(scaler.transform(X_direct), Y_direct)
+        direct_forest = FlatForest.from_sklearn(direct_model, scaler)
+
+    last_data = featured[["Date", "Price", "Spread"] + FEATURE_COLS].tail(60).copy()
+    return PriceModel(forest, last_data, direct_forest)
+
+
+def _fit_and_register(
+    crop: str, mandi: str, data_hash: str, sub: pd.DataFrame, n_jobs: int = -1,
+) -> PriceModel | None:
+    artifact = _fit_model(sub, n_jobs, params=forest_params(crop))
+    if artifact is not None:
+        model_registry.save(crop, mandi, FEATURE_SCHEMA_VERSION, data_hash, artifact)
+    return artifact
+
+
+def _model_for_version(crop: str, mandi: str, data_hash: str, sub: pd.DataFrame) -> PriceModel | None:
+    """Model for one data version: cached, else loaded from disk if registered, else trained now."""
+    def load() -> PriceModel | None:
+        artifact = model_registry.load(crop, mandi, FEATURE_SCHEMA_VERSION, data_hash, PriceModel.load)
+        if artifact is not None or not HAS_SKLEARN:
+            return artifact
+        return _fit_and_register(crop, mandi, data_hash, sub)
+
+    key = ("pair", crop, mandi, FEATURE_SCHEMA_VERSION, data_hash)
+    return MODEL_CACHE.get_or_load(key, load)
+
+
+def _load_artifact(path: str) -> PriceModel | None:
+    return MODEL_CACHE.get_or_load(
+        ("path", path), lambda: model_registry.load_path(Path(path), PriceModel.load),
     )
-    model.fit(X_scaled, y)
 
-    last_data = featured[["Date", "Price"] + FEATURE_COLS].tail(60).copy()
-    return model, scaler, last_data
+
+def _train_model(crop: str, mandi: str) -> PriceModel | None:
+    sub = _load_series(crop, mandi, data_signature())
+    if sub is None:
+        return None
+
+    data_hash = _model_hash(crop, sub)
+    fresh = model_registry.artifact_path(crop, mandi, FEATURE_SCHEMA_VERSION, data_hash)
+    stale = None if fresh.exists() else model_registry.latest_path(crop, mandi, FEATURE_SCHEMA_VERSION)
+    if stale is None:
+        return _model_for_version(crop, mandi, data_hash, sub)
+
+    # The pair's data changed since its stored model was trained: keep serving
+    # the previous model and refit on a background thread.
+    if HAS_SKLEARN:
+        model_registry.retrain_async(
+            (crop, mandi, data_hash),
+            lambda: _fit_and_register(crop, mandi, data_hash, sub),
+        )
+    return _load_artifact(str(stale))
+
+
+def pretrain(crop: str, mandi: str, n_jobs: int = -1) -> str:
+    """
+    Make sure the pair's current model is in the registry, fitting it if
+    needed.  Returns "ready", or "skipped" when there is nothing to train
+    (too few rows, or sklearn missing).  Safe to call from worker processes.
+    """
+    sub = _load_series(crop, mandi, data_signature())
+    if sub is None:
+        return "skipped"
+    data_hash = _model_hash(crop, sub)
+    if model_registry.artifact_path(crop, mandi, FEATURE_SCHEMA_VERSION, data_hash).is_dir():
+        return "ready"
+    if not HAS_SKLEARN:
+        return "skipped"
+    artifact = _fit_and_register(crop, mandi, data_hash, sub, n_jobs)
+    return "skipped" if artifact is None else "ready"
 
 
 # ── Iterative (autoregressive) prediction ────────────────────────────────────
 
-def _predict_iterative(model, scaler, last_data, days_ahead):
-    last_date   = last_data["Date"].iloc[-1]
-    last_trend  = last_data["trend"].iloc[-1]
-    last_spread = float(last_data["price_spread"].iloc[-1]) if "price_spread" in last_data.columns else 0
-    prices      = last_data["Price"].tolist()
-
-    future_dates, mean_preds, std_preds = [], [], []
-
-    for i in range(1, days_ahead + 1):
-        fdate = last_date + timedelta(days=i)
-        future_dates.append(fdate)
-
-        feat = {
-            "day_of_year":  fdate.timetuple().tm_yday,
-            "month":        fdate.month,
-            "day_of_week":  fdate.weekday(),
-            "week_of_year": fdate.isocalendar()[1],
-            "trend":        last_trend + i,
-            "lag_7":        prices[-7]  if len(prices) >= 7  else prices[-1],
-            "lag_14":       prices[-14] if len(prices) >= 14 else prices[-1],
-            "lag_30":       prices[-30] if len(prices) >= 30 else prices[-1],
-            "roll_mean_7":  np.mean(prices[-7:]),
-            "roll_std_7":   float(np.std(prices[-7:])) if len(prices) >= 2 else 0,
-            "roll_mean_14": np.mean(prices[-14:]),
-            "roll_mean_30": np.mean(prices[-30:]),
-            "momentum_7":   prices[-1] - np.mean(prices[-7:]),
-            "momentum_14":  prices[-1] - np.mean(prices[-14:]),
-            "price_spread": last_spread,
-        }
-
-        X_row = np.array([[feat[c] for c in FEATURE_COLS]])
-        X_scaled = scaler.transform(X_row)
-
-        tree_vals = np.array([tree.predict(X_scaled)[0] for tree in model.estimators_])
+def _predict_iterative(
+    forest: FlatForest, last_data: pd.DataFrame, days_ahead: int,
+    extra: np.ndarray | None = None,
+):
+    """``extra``: constant feature columns appended after FEATURE_COLS (global model)."""
+    last_date  = last_data["Date"].iloc[-1]
+    last_trend = int(last_data["trend"].iloc[-1])
+    engine     = FeatureEngine(last_data["Price"].to_numpy(), spread=last_data["Spread"].iloc[-1])
+
+    future_dates = [last_date + timedelta(days=i) for i in range(1, days_ahead + 1)]
+    n_extra = 0 if extra is None else len(extra)
+    X = np.empty((days_ahead, N_FEATURES + n_extra), dtype=np.float64)
+    if n_extra:
+        X[:, N_FEATURES:] = extra
+    mean_preds, std_preds = [], []
+
+    for i, fdate in enumerate(future_dates):
+        engine.write_row(X[i, :N_FEATURES], fdate, last_trend + i + 1)
+
+        # All trees in one vectorised walk over the compiled node tables
+        tree_vals = forest.predict_trees(X[i:i + 1])[0]
         pred_mean = float(tree_vals.mean())
         pred_std  = float(tree_vals.std())
 
         mean_preds.append(pred_mean)
         std_preds.append(pred_std)
-        prices.append(pred_mean)  # feed prediction back for next day
+        engine.push(pred_mean)  # feed prediction back for next day
 
     return future_dates, mean_preds, std_preds
 
 
-# ── Public API ───────────────────────────────────────────────────────────────
+def _predict_direct(direct: FlatForest, last_data: pd.DataFrame, days_ahead: int):
+    """All horizons from the current feature row in one forest pass."""
+    last_date  = last_data["Date"].iloc[-1]
+    last_trend = int(last_data["trend"].iloc[-1])
+    engine     = FeatureEngine(last_data["Price"].to_numpy(), spread=last_data["Spread"].iloc[-1])
 
-def predict_future_prices(crop: str, mandi: str, days_ahead: int = 30) -> dict | None:
-    if not HAS_SKLEARN:
+    x = engine.write_row(np.empty((1, N_FEATURES)), last_date + timedelta(days=1), last_trend + 1)
+    tree_vals = direct.predict_trees(x)[0][:, :days_ahead]   # (n_trees, days_ahead)
+
+    future_dates = [last_date + timedelta(days=i) for i in range(1, days_ahead + 1)]
+    return future_dates, tree_vals.mean(axis=0).tolist(), tree_vals.std(axis=0).tolist()
+
+
+# ── Statistical fallback (no sklearn / short series) ─────────────────────────
+
+def _statistical_forecast(crop: str, mandi: str, days_ahead: int) -> dict | None:
+    signature = data_signature()
+    sub = None if signature is None else _pair_rows(crop, mandi, signature)
+    if sub is None:
         return None
 
-    model, scaler, last_data = _train_model(crop, mandi)
+    sub = sub.sort_values("Date", kind="stable")
+    days = sub["Date"].to_numpy().astype("datetime64[D]").astype(np.int32)
+    fc = forecast_series([recent_daily(days, sub["Price"].to_numpy(dtype=np.float64))], days_ahead)
+    last_date = sub["Date"].iloc[-1]
+    future_dates = [last_date + timedelta(days=i) for i in range(1, days_ahead + 1)]
+    return _result(
+        future_dates, fc.mean[0].tolist(), fc.std[0].tolist(),
+        history=sub.tail(30), r2=float(fc.r2[0]), mode="statistical",
+    )
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+# Forecast requests per (crop, mandi) since the server started; the warm-up
+# scheduler (modules/warmup) pre-trains the busiest pairs first.
+_request_counts: Counter[tuple[str, str]] = Counter()
+
+
+def request_counts() -> dict[tuple[str, str], int]:
+    return dict(_request_counts)
+
+
+def _r2_score(y: np.ndarray, y_pred: np.ndarray) -> float:
+    """Coefficient of determination, as sklearn's r2_score."""
+    ss_res = float(((y - y_pred) ** 2).sum())
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    if ss_tot == 0:
+        return 1.0 if ss_res == 0 else 0.0
+    return 1.0 - ss_res / ss_tot
+
+
+def predict_future_prices(
+    crop: str, mandi: str, days_ahead: int = 30, mode: str = "iterative",
+    pooled: bool = False,
+) -> dict | None:
+    """
+    Forecast ``days_ahead`` daily prices for a pair.
+    mode="iterative" steps the one-day model forward, feeding each prediction
+    back in; mode="direct" reads every horizon off the multi-output model at
+    once (falls back to iterative past DIRECT_HORIZON days or for models
+    trained on too little data).  pooled=True uses the crop's shared model
+    (modules/global_model), which also covers markets with under 30 rows.
+    Without a usable forest (no sklearn, or under 30 rows) the statistical
+    engine is used.  The result carries the mode actually used.
+
+    Results are cached (modules/forecast_cache) under the data and model
+    versions they were computed from, so repeated calls are free until new
+    prices land or the model is retrained.
+    """
+    if mode not in FORECAST_MODES:
+        raise ValueError(f"mode must be one of {FORECAST_MODES}, got {mode!r}")
+    _request_counts[(crop, mandi)] += 1
+    key = (crop, mandi, days_ahead, mode, pooled, *_forecast_version(crop, mandi, pooled))
+    return FORECAST_CACHE.get_or_compute(
+        key, lambda: _forecast(crop, mandi, days_ahead, mode, pooled),
+    )
+
+
+def _forecast_version(crop: str, mandi: str, pooled: bool) -> tuple:
+    """
+    Dataset, tuning and model versions a forecast depends on (cache-key part).
+    Only file signatures are read, so a cache hit costs no hashing; the
+    series content hash stays the model registry's concern.
+    """
+    signature = data_signature()
+    if signature is None:
+        return ("no-data",)
+    dataset = (signature, tuple(default_filters().items()), FEATURE_SCHEMA_VERSION,
+               FORECAST_VERSION, HAS_SKLEARN)
+    if pooled:
+        return dataset   # the pooled model is a function of the dataset alone
+    latest = model_registry.latest_path(crop, mandi, FEATURE_SCHEMA_VERSION)
+    return (*dataset, model_registry.config_mtime(crop, "tuning"), latest.name if latest else None)
+
+
+def _forecast(crop: str, mandi: str, days_ahead: int, mode: str, pooled: bool) -> dict | None:
+    if pooled:
+        # imported here: global_model builds on this module's training helpers
+        from modules.global_model import predict_pooled
+        result = predict_pooled(crop, mandi, days_ahead)
+        return result if result is not None else _statistical_forecast(crop, mandi, days_ahead)
+    model = _train_model(crop, mandi)
     if model is None:
-        return None
+        return _statistical_forecast(crop, mandi, days_ahead)
+
+    forest, last_data = model.forest, model.last_data
+    direct_ok = model.direct is not None and days_ahead <= DIRECT_HORIZON
+    if forest is None and not direct_ok:
+        return _statistical_forecast(crop, mandi, days_ahead)
+    if mode == "direct" and not direct_ok:
+        mode = "iterative"
+    elif forest is None:
+        mode = "direct"   # a direct-only model has no one-step forest to iterate
+    if mode == "direct":
+        future_dates, mean_preds, std_preds = _predict_direct(model.direct, last_data, days_ahead)
+    else:
+        future_dates, mean_preds, std_preds = _predict_iterative(forest, last_data, days_ahead)
+    # One-step in-sample fit: the direct forest's first output predicts the same price
+    X_last = last_data[FEATURE_COLS].values
+    one_step = forest.predict(X_last) if forest is not None else model.direct.predict(X_last)[:, 0]
+    r2 = _r2_score(last_data["Price"].values, one_step)
+    return _result(
+        future_dates, mean_preds, std_preds,
+        history=last_data.tail(30), r2=r2, mode=mode, data_points=len(last_data),
+    )
+
 
-    future_dates, mean_preds, std_preds = _predict_iterative(model, scaler, last_data, days_ahead)
-    current_price = float(last_data["Price"].iloc[-1])
+def _result(
+    future_dates: list, mean_preds: list[float], std_preds: list[float],
+    history: pd.DataFrame, r2: float, mode: str, data_points: int | None = None,
+) -> dict:
+    """The predict_future_prices() dict; ``history`` has Date/Price, newest last."""
+    current_price = float(history["Price"].iloc[-1])
 
     predictions = []
     for i, (dt, pred) in enumerate(zip(future_dates, mean_preds)):
@@ -211,13 +487,11 @@ def predict_future_prices(crop: str, mandi: str, days_ahead: int = 30) -> dict |
     else:
         trend = "stable"
 
-    X_train = scaler.transform(last_data[FEATURE_COLS].values)
-    r2 = model.score(X_train, last_data["Price"].values)
     confidence = round(max(min(r2 * 100, 99), 50), 1)
 
-    history = []
-    for _, row in last_data.tail(30).iterrows():
-        history.append({"date": row["Date"].strftime("%b %d"), "price": round(float(row["Price"]), 0)})
+    history_points = []
+    for _, row in history.iterrows():
+        history_points.append({"date": row["Date"].strftime("%b %d"), "price": round(float(row["Price"]), 0)})
 
     return {
         "predictions": predictions,
@@ -227,6 +501,7 @@ def predict_future_prices(crop: str, mandi: str, days_ahead: int = 30) -> dict |
         "price_30d": round(price_30d, 0),
         "trend_direction": trend,
         "confidence": confidence,
-        "history": history,
-        "data_points": len(last_data),
+        "history": history_points,
+        "data_points": len(history) if data_points is None else data_points,
+        "mode": mode,
     }
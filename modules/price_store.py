@@ -0,0 +1,463 @@
+"""
+AgriChain – modules/price_store.py
+Columnar on-disk price store shared by every page.
+
+data/mandi_prices.csv is parsed once into compact NumPy ``.npy`` columns under
+data/.cache/price_store/: int16 category codes for Crop/Mandi, int32 day
+numbers (days since 1970-01-01) for Date and float32 prices — about 12 bytes
+per row against ~200 for the object-string DataFrame (see memory_report()).
+A manifest records the source file's size, mtime and content hash, and the
+store is rebuilt only when the CSV actually changes.  Each build is written to
+a temporary directory and renamed to its content-addressed name, so a reader
+never sees a half-written store while another worker is rebuilding it.
+
+Daily deltas (modules/ingest) are not merged into the CSV: each one becomes
+an immutable segment under data/segments/mandi_prices/, appended to the
+table when it is loaded, with later rows replacing earlier ones on
+(crop, mandi, date).  data_version() — the CSV's signature plus the segment
+log's — is what every downstream cache keys on.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR     = PROJECT_ROOT / "data"
+CSV_PATH     = DATA_DIR / "mandi_prices.csv"
+CACHE_DIR    = DATA_DIR / ".cache"
+STORE_DIR    = CACHE_DIR / "price_store"
+MANIFEST     = STORE_DIR / "manifest.json"
+SEGMENT_ROOT = DATA_DIR / "segments"
+
+# Bump when the on-disk column layout changes so old stores get rebuilt.
+STORE_FORMAT = 2
+
+COLUMNS = ["Crop", "Mandi", "Price", "Date"]
+
+# Prices are rupees with at most paise precision; float32 keeps ~7 significant
+# digits, so rounding back to 2 decimals restores the source value on widening.
+PRICE_DECIMALS = 2
+
+
+# ── Compact encodings ─────────────────────────────────────────────────────────
+
+def encode_categories(values: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """(int16 codes, sorted categories); int32 codes past 32k categories."""
+    cat = values.astype("category")
+    categories = cat.cat.categories.tolist()
+    dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+    return cat.cat.codes.to_numpy().astype(dtype), categories
+
+
+def to_day_numbers(dates: pd.Series) -> np.ndarray:
+    """datetime Series → int32 days since 1970-01-01."""
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+def from_day_numbers(days: np.ndarray) -> np.ndarray:
+    """int32 day numbers → datetime64[D]."""
+    return np.asarray(days).astype("datetime64[D]")
+
+
+def widen_prices(prices: np.ndarray) -> np.ndarray:
+    """float32 prices → float64, rounded back to the source precision."""
+    return np.round(np.asarray(prices, dtype=np.float64), PRICE_DECIMALS)
+
+
+# ── Source fingerprinting ─────────────────────────────────────────────────────
+
+def source_signature(path: Path = CSV_PATH) -> tuple[int, int]:
+    """(mtime_ns, size) of the source CSV. Raises FileNotFoundError if missing."""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def content_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_manifest() -> dict | None:
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_atomic(path: Path, payload: dict) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ── CSV → columns ─────────────────────────────────────────────────────────────
+
+def _parse_csv(path: Path) -> pd.DataFrame:
+    """The one canonical parse of mandi_prices.csv."""
+    df = pd.read_csv(path)
+    df.columns = [c.strip() for c in df.columns]
+    df["Crop"]  = df["Crop"].astype(str).str.strip()
+    df["Mandi"] = df["Mandi"].astype(str).str.strip()
+    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
+    df["Date"]  = pd.to_datetime(df["Date"], dayfirst=True, errors="coerce")
+    return df.dropna(subset=["Price", "Date"]).reset_index(drop=True)
+
+
+def build_store(path: Path = CSV_PATH) -> dict:
+    """
+    Parse the CSV and write it as columnar .npy files.
+    Returns the new manifest.
+    """
+    mtime_ns, size = source_signature(path)
+    digest = content_hash(path)
+    df = _parse_csv(path)
+
+    crop_codes,  crops  = encode_categories(df["Crop"])
+    mandi_codes, mandis = encode_categories(df["Mandi"])
+
+    # Written to a private directory and renamed into place, so a concurrent
+    # reader never sees a half-written build.
+    build_dir = STORE_DIR / f"{digest[:16]}-v{STORE_FORMAT}"
+    tmp_dir   = build_dir.with_name(f"{build_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    np.save(tmp_dir / "crop.npy",  crop_codes)
+    np.save(tmp_dir / "mandi.npy", mandi_codes)
+    np.save(tmp_dir / "price.npy", df["Price"].to_numpy(dtype=np.float32))
+    np.save(tmp_dir / "day.npy",   to_day_numbers(df["Date"]))
+    try:
+        os.replace(tmp_dir, build_dir)
+    except OSError:
+        if not build_dir.is_dir():
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)   # another worker built the same content
+
+    manifest = {
+        "format":   STORE_FORMAT,
+        "source":   str(path.name),
+        "mtime_ns": mtime_ns,
+        "size":     size,
+        "sha1":     digest,
+        "dir":      build_dir.name,
+        "rows":     int(len(df)),
+        "crops":    crops,
+        "mandis":   mandis,
+    }
+    write_json_atomic(MANIFEST, manifest)
+    _prune_old_builds(keep=build_dir)
+    return manifest
+
+
+def _prune_old_builds(keep: Path) -> None:
+    """Remove builds committed before ``keep``; newer ones and in-progress .tmp dirs stay."""
+    committed = keep.stat().st_mtime_ns
+    for child in STORE_DIR.iterdir():
+        if not child.is_dir() or child.name == keep.name or child.name.endswith(".tmp"):
+            continue
+        try:
+            if child.stat().st_mtime_ns < committed:
+                shutil.rmtree(child, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+
+
+def ensure_store(path: Path = CSV_PATH) -> dict:
+    """
+    Return a manifest that matches the current CSV, rebuilding if needed.
+
+    A cheap (mtime, size) check is tried first; if only the mtime moved
+    (file touched or re-copied) the content hash decides.
+    """
+    mtime_ns, size = source_signature(path)
+    manifest = _read_manifest()
+    if manifest and manifest.get("format") == STORE_FORMAT:
+        build_ok = (STORE_DIR / manifest["dir"]).is_dir()
+        if build_ok and manifest["mtime_ns"] == mtime_ns and manifest["size"] == size:
+            return manifest
+        if build_ok and manifest["size"] == size and manifest["sha1"] == content_hash(path):
+            manifest["mtime_ns"] = mtime_ns
+            write_json_atomic(MANIFEST, manifest)
+            return manifest
+    return build_store(path)
+
+
+# ── Append-only delta segments ───────────────────────────────────────────────
+
+def last_wins(keys: list[np.ndarray], first_new: int) -> np.ndarray:
+    """
+    Keep-mask over rows identified by ``keys`` where rows from ``first_new``
+    on are deltas: a key that appears in a delta keeps only its last row;
+    keys no delta touches keep every row.
+    """
+    frame = pd.DataFrame({i: np.asarray(k) for i, k in enumerate(keys)})
+    if first_new >= len(frame):
+        return np.ones(len(frame), dtype=bool)
+    rows  = pd.MultiIndex.from_frame(frame)
+    in_delta = rows.isin(rows[first_new:])
+    return ~(in_delta & frame.duplicated(keep="last").to_numpy())
+
+
+class SegmentLog:
+    """
+    Append-only log of immutable delta segments for one dataset: directories
+    seg-000001, seg-000002, … of .npy columns (categories as codes, dates as
+    day numbers, numbers as float32) plus a meta.json.
+    """
+
+    def __init__(self, name: str, root: Path = SEGMENT_ROOT):
+        self.dir = root / name
+
+    def segments(self) -> list[Path]:
+        """Segment directories in log order."""
+        try:
+            names = os.listdir(self.dir)
+        except FileNotFoundError:
+            return []
+        return [self.dir / n for n in sorted(names) if n.startswith("seg-")]
+
+    def version(self) -> tuple[int, int]:
+        """(segment count, last sequence number); a listdir, cheap enough per lookup."""
+        segs = self.segments()
+        return len(segs), int(segs[-1].name[4:]) if segs else 0
+
+    def tag(self) -> str:
+        count, last = self.version()
+        return f"s{count}.{last}" if count else ""
+
+    def sources(self) -> set[str]:
+        """Content hashes of the delta files already ingested."""
+        out = set()
+        for seg in self.segments():
+            try:
+                with open(seg / "meta.json", encoding="utf-8") as f:
+                    out.add(json.load(f).get("source_sha1", ""))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def append(self, df: pd.DataFrame, source_sha1: str = "") -> Path | None:
+        """Write ``df`` as the next segment; None when it is empty."""
+        if df.empty:
+            return None
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f".seg.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        columns = {}
+        for col in df.columns:
+            name = f"c{len(columns)}"
+            values = df[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                np.save(tmp / f"{name}.npy", to_day_numbers(values))
+                columns[col] = {"file": name, "kind": "day"}
+            elif pd.api.types.is_numeric_dtype(values):
+                np.save(tmp / f"{name}.npy", values.to_numpy(dtype=np.float32))
+                columns[col] = {"file": name, "kind": "price"}
+            else:
+                codes, categories = encode_categories(values.astype(str))
+                np.save(tmp / f"{name}.npy", codes)
+                columns[col] = {"file": name, "kind": "category", "categories": categories}
+        write_json_atomic(tmp / "meta.json", {
+            "rows": int(len(df)), "columns": columns, "source_sha1": source_sha1,
+        })
+        while True:   # another ingest may take the same number; take the next
+            _, last = self.version()
+            final = self.dir / f"seg-{last + 1:06d}"
+            try:
+                os.rename(tmp, final)
+                return final
+            except OSError:
+                if not final.exists():
+                    raise
+
+    def frame(self, start: int = 0) -> pd.DataFrame | None:
+        """Rows of segments[start:] in log order (cached); None if there are none."""
+        segs = self.segments()[start:]
+        return _read_segments(tuple(str(p) for p in segs)) if segs else None
+
+
+def _read_segment(seg: Path) -> pd.DataFrame:
+    with open(seg / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    out = {}
+    for col, spec in meta["columns"].items():
+        values = np.load(seg / f"{spec['file']}.npy")
+        if spec["kind"] == "day":
+            out[col] = pd.to_datetime(from_day_numbers(values))
+        elif spec["kind"] == "price":
+            out[col] = widen_prices(values)
+        else:
+            out[col] = np.asarray(spec["categories"], dtype=object)[values]
+    return pd.DataFrame(out)
+
+
+@lru_cache(maxsize=8)
+def _read_segments(paths: tuple[str, ...]) -> pd.DataFrame:
+    # segments are immutable, so their paths identify the content
+    return pd.concat([_read_segment(Path(p)) for p in paths], ignore_index=True)
+
+
+SEGMENTS = SegmentLog("mandi_prices")
+
+
+def ingest_delta(path: Path) -> int:
+    """
+    Append a delta file in mandi_prices.csv's layout as a new segment.
+    Returns the rows written (0 when this exact file was ingested before).
+    """
+    digest = content_hash(path)
+    if digest in SEGMENTS.sources():
+        return 0
+    df = _parse_csv(path)[COLUMNS]
+    df = df.drop_duplicates(subset=["Crop", "Mandi", "Date"], keep="last")
+    SEGMENTS.append(df, digest)
+    return len(df)
+
+
+def data_version(path: Path = CSV_PATH) -> tuple[int, ...]:
+    """
+    CSV signature plus segment-log version: changes whenever the CSV is
+    replaced or a delta is ingested.  Raises FileNotFoundError if the CSV is missing.
+    """
+    return (*source_signature(path), *SEGMENTS.version())
+
+
+# ── Readers ───────────────────────────────────────────────────────────────────
+
+def load_columns(path: Path = CSV_PATH) -> tuple[dict, dict[str, np.ndarray]]:
+    """Return (manifest, {column: memory-mapped array}) for the current CSV."""
+    manifest  = ensure_store(path)
+    build_dir = STORE_DIR / manifest["dir"]
+    cols = {
+        name: np.load(build_dir / f"{name}.npy", mmap_mode="r")
+        for name in ("crop", "mandi", "price", "day")
+    }
+    return manifest, cols
+
+
+class PriceTable:
+    """
+    Compact in-memory price table: int16 crop/mandi codes, int32 day numbers
+    and float32 prices, plus the category name lists.  Shared (not copied)
+    across sessions through st.cache_resource.
+    """
+
+    def __init__(self, manifest: dict, cols: dict[str, np.ndarray]):
+        self.crops  = list(manifest["crops"])
+        self.mandis = list(manifest["mandis"])
+        self.crop   = np.array(cols["crop"])
+        self.mandi  = np.array(cols["mandi"])
+        self.day    = np.array(cols["day"])
+        self.price  = np.array(cols["price"])
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def extend(self, delta: pd.DataFrame | None) -> "PriceTable":
+        """Append delta rows (Crop, Mandi, Price, Date); later rows win on (crop, mandi, date)."""
+        if delta is None or delta.empty:
+            return self
+        first_new = len(self)
+        codes = {}
+        for col, names in (("Crop", self.crops), ("Mandi", self.mandis)):
+            lookup = {n: i for i, n in enumerate(names)}
+            new = [lookup.setdefault(n, len(lookup)) for n in delta[col]]
+            names[:] = list(lookup)
+            dtype = np.int16 if len(names) < np.iinfo(np.int16).max else np.int32
+            codes[col] = np.asarray(new, dtype=dtype)
+        self.crop  = np.concatenate([self.crop,  codes["Crop"]]).astype(codes["Crop"].dtype)
+        self.mandi = np.concatenate([self.mandi, codes["Mandi"]]).astype(codes["Mandi"].dtype)
+        self.day   = np.concatenate([self.day,   to_day_numbers(delta["Date"])])
+        self.price = np.concatenate([self.price, delta["Price"].to_numpy(dtype=np.float32)])
+
+        keep = last_wins([self.crop, self.mandi, self.day], first_new)
+        if not keep.all():
+            self.crop, self.mandi = self.crop[keep], self.mandi[keep]
+            self.day,  self.price = self.day[keep],  self.price[keep]
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        """Column bytes plus the category strings."""
+        cols = self.crop.nbytes + self.mandi.nbytes + self.day.nbytes + self.price.nbytes
+        names = sum(len(n.encode("utf-8")) for n in self.crops + self.mandis)
+        return cols + names
+
+    def to_frame(self) -> pd.DataFrame:
+        """Pandas view: categorical Crop/Mandi, float64 Price, datetime Date."""
+        return pd.DataFrame({
+            "Crop":  pd.Categorical.from_codes(self.crop,  self.crops),
+            "Mandi": pd.Categorical.from_codes(self.mandi, self.mandis),
+            "Price": widen_prices(self.price),
+            "Date":  pd.to_datetime(from_day_numbers(self.day)),
+        })
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_table(version: tuple[int, ...]) -> PriceTable:
+    return PriceTable(*load_columns()).extend(SEGMENTS.frame())
+
+
+def load_table() -> PriceTable:
+    """
+    Compact price table (CSV plus ingested segments), cached per data_version().
+    Raises FileNotFoundError if the CSV is missing.
+    """
+    return _load_table(data_version())
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _load_prices(version: tuple[int, ...]) -> pd.DataFrame:
+    return _load_table(version).to_frame()
+
+
+def load_prices() -> pd.DataFrame:
+    """
+    Full price table: Crop/Mandi categorical, Price float, Date datetime.
+    Cached per data_version(), so a changed CSV or a new segment is picked
+    up on the next call.  Raises FileNotFoundError if the CSV is missing.
+    """
+    return _load_prices(data_version())
+
+
+# ── Memory report ─────────────────────────────────────────────────────────────
+
+def memory_report(path: Path = CSV_PATH) -> pd.DataFrame:
+    """
+    Bytes per row for the plain read_csv frame (object strings, float64 price,
+    string dates), the load_prices() DataFrame view and the compact PriceTable.
+    """
+    legacy = pd.read_csv(path, dtype={"Crop": object, "Mandi": object, "Date": object})
+    table  = load_table()
+    frame  = table.to_frame()
+    rows   = max(len(table), 1)
+    sizes  = {
+        "read_csv (object strings)": int(legacy.memory_usage(deep=True).sum()),
+        "load_prices() frame":       int(frame.memory_usage(deep=True).sum()),
+        "PriceTable (compact)":      table.nbytes,
+    }
+    return pd.DataFrame(
+        [{"representation": k, "total_bytes": v, "bytes_per_row": round(v / rows, 1)}
+         for k, v in sizes.items()]
+    )
+
+
+# ── Quick report  (python -m modules.price_store) ────────────────────────────
+
+if __name__ == "__main__":
+    print(memory_report().to_string(index=False))
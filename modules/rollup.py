@@ -0,0 +1,241 @@
+"""
+AgriChain – modules/rollup.py
+Materialised per-(crop, mandi) price rollup, refreshed incrementally on ingest.
+
+One row per pair with everything the lookup helpers and ranking pages ask
+for, so a page render is a dictionary lookup instead of a scan:
+
+    latest_price, last_date        last observation
+    rows                           observations in the series
+    mean_all, min_price, max_price over the whole series
+    mean_7 / mean_30 / mean_90     last 7 / 30 / 90 records
+    mean_7d / mean_30d / mean_90d  daily (forward-filled, at most MAX_FILL_DAYS)
+                                   prices over the 7 / 30 / 90 calendar days
+                                   ending at last_date (modules/timeseries)
+    volatility                     sample std of the last 30 records, % of mean_30
+
+The table is written to data/.cache/rollup/rollup.json together with the
+store version it reflects (CSV hash + ingested segments).  When only new
+segments arrived, just the pairs they touch are recomputed; a changed CSV
+rebuilds it.  modules/ingest refreshes it right after appending a segment,
+so readers normally find it current.
+
+Record-window means are summed oldest to newest, so mean_7 / mean_30 equal
+sum(values) / len(values) over the same records exactly.
+"""
+
+from __future__ import annotations
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules import price_db
+from modules.timeseries import window_means
+from modules.price_store import (
+    CACHE_DIR, SEGMENTS, data_version, ensure_store, from_day_numbers, widen_prices,
+    write_json_atomic,
+)
+
+ROLLUP_DIR    = CACHE_DIR / "rollup"
+ROLLUP_FILE   = ROLLUP_DIR / "rollup.json"
+ROLLUP_FORMAT = 3
+
+RECORD_WINDOWS   = (7, 30, 90)
+CALENDAR_WINDOWS = (7, 30, 90)
+VOLATILITY_WINDOW = 30
+
+COLUMNS = [
+    "Crop", "Mandi", "rows", "latest_price", "last_date",
+    "mean_all", "min_price", "max_price",
+    *(f"mean_{w}" for w in RECORD_WINDOWS),
+    *(f"mean_{w}d" for w in CALENDAR_WINDOWS),
+    "volatility",
+]
+
+
+def _norm(name: str) -> str:
+    return str(name).strip().lower()
+
+
+# ── Computing rows ───────────────────────────────────────────────────────────
+
+def tail_means(prices: np.ndarray, starts: np.ndarray, stops: np.ndarray, k: int) -> np.ndarray:
+    """
+    Mean of the last k values of every [start, stop) slice.  Vectorised over
+    the slices and summed oldest to newest, so each mean is bit-identical to
+    sum(values) / len(values) on that slice.
+    """
+    lo = np.maximum(starts, stops - k)
+    total = np.zeros(len(lo))
+    for back in range(k, 0, -1):
+        pos = stops - back
+        total += np.where(pos >= lo, prices[np.maximum(pos, 0)], 0.0)
+    return total / (stops - lo)
+
+
+def _tail_std(prices: np.ndarray, starts: np.ndarray, stops: np.ndarray, k: int,
+              mean: np.ndarray) -> np.ndarray:
+    lo = np.maximum(starts, stops - k)
+    sq = np.zeros(len(lo))
+    for back in range(k, 0, -1):
+        pos = stops - back
+        sq += np.where(pos >= lo, (prices[np.maximum(pos, 0)] - mean) ** 2, 0.0)
+    n = stops - lo
+    return np.sqrt(np.divide(sq, n - 1, out=np.zeros(len(lo)), where=n > 1))
+
+
+def compute_rows(names: list[tuple[str, str]], prices: np.ndarray, days: np.ndarray,
+                 starts: np.ndarray, stops: np.ndarray) -> pd.DataFrame:
+    """Rollup rows for the given [start, stop) spans of date-sorted prices / day numbers."""
+    out = pd.DataFrame(names, columns=["Crop", "Mandi"])
+    if len(starts) == 0:
+        return out.reindex(columns=COLUMNS)
+    last = stops - 1
+    out["rows"]         = stops - starts
+    out["latest_price"] = prices[last]
+    out["last_date"]    = pd.to_datetime(from_day_numbers(days[last])).strftime("%Y-%m-%d")
+
+    # Whole-series aggregates: one reduceat each, over the spans back to back
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2], bounds[1::2] = starts, stops
+    padded = np.append(prices, 0.0)
+    out["mean_all"]  = np.add.reduceat(padded, bounds)[0::2] / (stops - starts)
+    out["min_price"] = np.minimum.reduceat(padded, bounds)[0::2]
+    out["max_price"] = np.maximum.reduceat(padded, bounds)[0::2]
+
+    for w in RECORD_WINDOWS:
+        out[f"mean_{w}"] = tail_means(prices, starts, stops, w)
+
+    for w in CALENDAR_WINDOWS:
+        out[f"mean_{w}d"] = window_means(days, prices, starts, stops, w)
+
+    mean_v = tail_means(prices, starts, stops, VOLATILITY_WINDOW)
+    std_v  = _tail_std(prices, starts, stops, VOLATILITY_WINDOW, mean_v)
+    out["volatility"] = np.where(mean_v > 0, std_v / np.where(mean_v > 0, mean_v, 1) * 100, 0.0)
+    return out[COLUMNS]
+
+
+def _series():
+    """(names, prices, days, starts, stops) of every pair from the configured backend."""
+    if price_db.enabled():
+        return price_db.pair_series()
+    from modules.data_loader import load_series_index   # data_loader reads the rollup
+
+    idx = load_series_index()
+    return idx.pair_names, widen_prices(idx.price), np.asarray(idx.day), idx.starts, idx.stops
+
+
+# ── Materialised table ───────────────────────────────────────────────────────
+
+@dataclass
+class Rollup:
+    table: pd.DataFrame                       # COLUMNS, one row per pair
+    base: str = ""                            # CSV content hash it reflects
+    segments: tuple[str, ...] = ()            # segment names it reflects
+
+    def __post_init__(self):
+        records = self.table.to_dict("records")
+        self._rows = {(_norm(r["Crop"]), _norm(r["Mandi"])): r for r in records}
+        self._crops: dict[str, list[int]] = {}
+        for i, (ck, _) in enumerate(self._rows):
+            self._crops.setdefault(ck, []).append(i)
+
+    @classmethod
+    def empty(cls) -> "Rollup":
+        return cls(pd.DataFrame(columns=COLUMNS))
+
+    def row(self, crop: str, mandi: str) -> dict | None:
+        """The pair's rollup as a dict, or None if it has no data."""
+        return self._rows.get((_norm(crop), _norm(mandi)))
+
+    def for_crop(self, crop: str) -> pd.DataFrame:
+        """Rollup rows of every mandi of a crop, ordered by mandi."""
+        return self.table.iloc[self._crops.get(_norm(crop), [])].reset_index(drop=True)
+
+    def save(self) -> None:
+        ROLLUP_DIR.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(ROLLUP_FILE, {
+            "format":   ROLLUP_FORMAT,
+            "base":     self.base,
+            "segments": list(self.segments),
+            "columns":  {c: self.table[c].tolist() for c in COLUMNS},
+        })
+
+    @classmethod
+    def load(cls) -> "Rollup | None":
+        try:
+            payload = json.loads(ROLLUP_FILE.read_text())
+        except (OSError, ValueError):
+            return None
+        if payload.get("format") != ROLLUP_FORMAT or set(payload["columns"]) != set(COLUMNS):
+            return None
+        table = pd.DataFrame(payload["columns"])[COLUMNS]
+        return cls(table, payload["base"], tuple(payload["segments"]))
+
+
+def _sort(table: pd.DataFrame) -> pd.DataFrame:
+    keys = pd.DataFrame({"c": table["Crop"].map(_norm), "m": table["Mandi"].map(_norm)})
+    return table.iloc[np.lexsort((keys["m"], keys["c"]))].reset_index(drop=True)
+
+
+def refresh() -> Rollup:
+    """
+    Bring the materialised rollup up to the current store version and
+    return it: unchanged, patched for the pairs new segments touch, or rebuilt.
+    """
+    base = ensure_store()["sha1"]
+    segs = tuple(p.name for p in SEGMENTS.segments())
+    current = Rollup.load()
+    if current is not None and current.base == base and current.segments == segs:
+        return current
+
+    names, prices, days, starts, stops = _series()
+    applied = len(current.segments) if current is not None else 0
+    if current is not None and current.base == base and current.segments == segs[:applied]:
+        delta = SEGMENTS.frame(applied)
+        touched = set(zip(delta["Crop"].map(_norm), delta["Mandi"].map(_norm)))
+        pick = [i for i, (c, m) in enumerate(names) if (_norm(c), _norm(m)) in touched]
+        fresh = compute_rows([names[i] for i in pick], prices, days, starts[pick], stops[pick])
+        kept = current.table[[
+            (_norm(c), _norm(m)) not in touched
+            for c, m in zip(current.table["Crop"], current.table["Mandi"])
+        ]]
+        table = _sort(pd.concat([kept, fresh], ignore_index=True))
+    else:
+        table = compute_rows(names, prices, days, starts, stops)
+
+    rollup = Rollup(table, base, segs)
+    try:
+        rollup.save()
+    except OSError:
+        pass   # still served from memory; the next refresh retries
+    return rollup
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _rollup_for(version: tuple[int, ...]) -> Rollup:
+    return refresh()
+
+
+def load_rollup() -> Rollup:
+    """
+    The rollup for the current data version (shared across sessions).
+    Raises FileNotFoundError if the CSV is missing.
+    """
+    return _rollup_for(data_version())
+
+
+# ── Quick check  (python -m modules.rollup Wheat Sangli) ─────────────────────
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    crop, mandi = (sys.argv[1:3] + ["Wheat", "Sangli"][len(sys.argv[1:3]):])[:2]
+    t0 = time.perf_counter()
+    r = refresh()
+    print(f"{len(r.table)} pairs in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    print(r.row(crop, mandi))
@@ -0,0 +1,172 @@
+"""
+AgriChain – modules/seasonality.py
+Seasonal price indices derived from the mandi price history.
+
+Each (crop, mandi) series is first detrended: a log-linear trend is fitted
+to it and every price divided by the trend's value on its date, so a market
+that simply rose over the sample doesn't read as "dear in the later
+months".  The mean detrended price of each calendar month (and ISO week) is
+then divided by the mean of those monthly (weekly) means: 1.10 means prices
+in that period run 10 % above the series' trend.  A crop's index is the
+average over its mandis, renormalised to mean 1.  Years are pooled.
+
+Only well-covered series contribute: one spanning at least MIN_SPAN_DAYS
+(a full year), with MIN_OBS prices in a period before that period counts,
+and counted periods in MIN_PERIODS of them (every month; 48 of the 52
+weeks), so a few prices from one season can't make up a calendar.
+
+The indices are computed with one groupby per level and written to
+data/.cache/seasonality.json together with the data_version() they reflect;
+the next lookup after the CSV changes or a delta is ingested recomputes them.
+
+    seasonal_indices("Onion")                      {month: index}
+    seasonal_indices("Onion", "Lasalgaon")         the mandi's own, else the crop's
+    seasonal_indices("Onion", freq="week")         {iso week: index}
+
+Crops (or periods) without enough history return no entry, so callers keep
+their own fallback — harvest_engine keeps its hand-set _SEASONAL unless a
+crop's index covers all 12 months.
+
+    python -m modules.seasonality Onion            rebuild and print
+"""
+
+from __future__ import annotations
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.price_store import CACHE_DIR, data_version, load_prices, write_json_atomic
+
+SEASON_FILE   = CACHE_DIR / "seasonality.json"
+SEASON_FORMAT = 2
+
+MIN_SPAN_DAYS = 365                         # first to last price of a series
+MIN_OBS       = {"month": 8, "week": 3}     # prices per (series, period)
+MIN_PERIODS   = {"month": 12, "week": 48}   # periods a series must cover
+
+_FREQS = tuple(MIN_OBS)
+
+
+def _norm(name: str) -> str:
+    return str(name).strip().lower()
+
+
+# ── Computing the indices ────────────────────────────────────────────────────
+
+def _relative(means: pd.Series, levels: list[str]) -> pd.Series:
+    return means / means.groupby(level=levels).transform("mean")
+
+
+def compute_indices(df: pd.DataFrame, freq: str = "month") -> tuple[pd.Series, pd.Series]:
+    """
+    (per-crop, per-(crop, mandi)) seasonal indices of a Crop/Mandi/Price/Date
+    frame, indexed by (crop, period) and (crop, mandi, period) on normalised names.
+    """
+    period = df["Date"].dt.month if freq == "month" else df["Date"].dt.isocalendar().week.astype(int)
+    frame = pd.DataFrame({
+        "crop":   df["Crop"].astype(str).str.strip().str.lower(),
+        "mandi":  df["Mandi"].astype(str).str.strip().str.lower(),
+        "period": period.to_numpy(),
+        "day":    df["Date"].to_numpy().astype("datetime64[D]").astype(np.int64).astype(np.float64),
+        "price":  df["Price"].to_numpy(dtype=np.float64),
+    })
+    frame = frame[frame["price"] > 0]
+    series = frame.groupby(["crop", "mandi"])
+    span = series["day"].transform("max") - series["day"].transform("min")
+    frame = frame[(span >= MIN_SPAN_DAYS).to_numpy()].copy()
+
+    # Log-linear trend per series (least squares, one groupby pass)
+    frame["log"] = np.log(frame["price"])
+    series = frame.groupby(["crop", "mandi"])
+    dt = frame["day"] - series["day"].transform("mean")
+    dy = frame["log"] - series["log"].transform("mean")
+    slope = (dt * dy).groupby([frame["crop"], frame["mandi"]]).transform("sum") \
+        / (dt * dt).groupby([frame["crop"], frame["mandi"]]).transform("sum")
+    frame["ratio"] = np.exp(dy - slope * dt)
+
+    cells = frame.groupby(["crop", "mandi", "period"])["ratio"].agg(["mean", "count"])
+    cells = cells[cells["count"] >= MIN_OBS[freq]]["mean"]
+    covered = cells.groupby(level=["crop", "mandi"]).transform("size")
+    cells = cells[covered >= MIN_PERIODS[freq]]
+
+    pair = _relative(cells, ["crop", "mandi"])
+    crop = _relative(pair.groupby(level=["crop", "period"]).mean(), ["crop"])
+    return crop.round(4), pair.round(4)
+
+
+def _nested(index: pd.Series, key_levels: int) -> dict[str, dict[str, float]]:
+    out: dict[str, dict[str, float]] = {}
+    for key, value in index.items():
+        name = "|".join(key[:key_levels])
+        out.setdefault(name, {})[str(key[key_levels])] = float(value)
+    return out
+
+
+def build() -> dict:
+    """Recompute every index from the price store and persist the artifact."""
+    version = data_version()
+    df = load_prices()
+    payload = {"format": SEASON_FORMAT, "version": list(version)}
+    for freq in _FREQS:
+        crop, pair = compute_indices(df, freq)
+        payload[freq] = {"crop": _nested(crop, 1), "pair": _nested(pair, 2)}
+    try:
+        SEASON_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(SEASON_FILE, payload)
+    except OSError:
+        pass   # still served from memory; the next process rebuilds it
+    return payload
+
+
+def _load(version: tuple[int, ...]) -> dict:
+    try:
+        payload = json.loads(SEASON_FILE.read_text())
+        if payload.get("format") == SEASON_FORMAT and tuple(payload["version"]) == version:
+            return payload
+    except (OSError, ValueError, KeyError):
+        pass
+    return build()
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _indices_for(version: tuple[int, ...]) -> dict:
+    return _load(version)
+
+
+# ── Lookup ────────────────────────────────────────────────────────────────────
+
+def seasonal_indices(crop: str, mandi: str | None = None, freq: str = "month") -> dict[int, float]:
+    """
+    {period: index} for a crop, or for one of its mandis when that series has
+    its own; periods without enough history are absent.  Empty if the crop
+    has no usable history or the price data is unavailable.
+    """
+    try:
+        indices = _indices_for(data_version())[freq]
+    except Exception:
+        return {}
+    found = None
+    if mandi is not None:
+        found = indices["pair"].get(f"{_norm(crop)}|{_norm(mandi)}")
+    if found is None:
+        found = indices["crop"].get(_norm(crop), {})
+    return {int(p): v for p, v in found.items()}
+
+
+# ── CLI  (python -m modules.seasonality [crop] [mandi]) ──────────────────────
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    t0 = time.perf_counter()
+    payload = build()
+    print(f"{len(payload['month']['crop'])} crops, {len(payload['month']['pair'])} series "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms → {SEASON_FILE}")
+    crops = sys.argv[1:2] or sorted(payload["month"]["crop"])
+    mandi = sys.argv[2] if len(sys.argv) > 2 else None
+    for crop in crops:
+        months = seasonal_indices(crop, mandi)
+        print(f"{crop:<10}", "  ".join(f"{m:>2}:{months[m]:.2f}" for m in sorted(months)))
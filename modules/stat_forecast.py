@@ -0,0 +1,170 @@
+"""
+AgriChain – modules/stat_forecast.py
+Vectorised statistical price forecasts over many series at once.
+
+Every (crop, mandi) series is right-aligned into one row of a 2-D NumPy
+matrix (last WINDOW observations, gaps filled), and each method runs over
+all rows together — one NumPy step per time step, never one Python loop per
+series:
+
+    seasonal_naive  – repeat the last weekly cycle
+    holt_winters    – additive level / trend / weekly season
+    damped_trend    – Holt's linear trend with damping
+
+The default "ensemble" averages the three.  Needs only NumPy, so it is the
+instant fallback when sklearn is missing or a pair has too little data for
+the forest, and it forecasts every mandi on the map in one pass.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+# ── Parameters ────────────────────────────────────────────────────────────────
+WINDOW = 120          # observations per series fed to the models
+SEASON = 7            # weekly cycle
+
+ALPHA = 0.3           # level smoothing
+BETA  = 0.05          # trend smoothing
+GAMMA = 0.1           # seasonal smoothing
+PHI   = 0.9           # trend damping
+
+METHODS = ("seasonal_naive", "holt_winters", "damped_trend", "ensemble")
+
+
+@dataclass
+class StatForecast:
+    mean: np.ndarray      # (n_series, horizon)
+    std:  np.ndarray      # (n_series, horizon) – one-step residual std, widened by sqrt(h)
+    r2:   np.ndarray      # (n_series,) in-sample one-step R²
+
+
+# ── Series → matrix ───────────────────────────────────────────────────────────
+
+def to_matrix(series: Sequence[np.ndarray], window: int = WINDOW) -> np.ndarray:
+    """
+    Right-align the last ``window`` values of each series into a float64
+    matrix.  Gaps (NaN) are forward-filled; the left padding of short series
+    takes their first value.  Empty series stay all-NaN.
+    """
+    Y = np.full((len(series), window), np.nan)
+    for i, s in enumerate(series):
+        s = np.asarray(s, dtype=np.float64)[-window:]
+        if len(s):
+            Y[i, window - len(s):] = s
+    return _fill(Y)
+
+
+def _fill(Y: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(Y)
+    cols  = np.arange(Y.shape[1])
+    last  = np.maximum.accumulate(np.where(valid, cols, -1), axis=1)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+    idx   = np.where(last < 0, first[:, None], last)
+    return np.take_along_axis(Y, idx, axis=1)
+
+
+# ── Methods ───────────────────────────────────────────────────────────────────
+# Each returns (forecast (n, horizon), one-step in-sample fit (n, T) with NaN
+# where no fit exists yet).
+
+def seasonal_naive(Y: np.ndarray, horizon: int, season: int = SEASON):
+    n, T = Y.shape
+    fit = np.full_like(Y, np.nan)
+    fit[:, season:] = Y[:, :-season]
+    steps = T - season + (np.arange(horizon) % season)
+    return Y[:, steps], fit
+
+
+def holt_winters(Y: np.ndarray, horizon: int, season: int = SEASON,
+                 alpha: float = ALPHA, beta: float = BETA, gamma: float = GAMMA):
+    n, T = Y.shape
+    fit = np.full_like(Y, np.nan)
+    level  = Y[:, :season].mean(axis=1)
+    trend  = (Y[:, season:2 * season].mean(axis=1) - level) / season
+    seas   = Y[:, :season] - level[:, None]
+    for t in range(season, T):
+        s = seas[:, t % season]
+        fit[:, t] = level + trend + s
+        new_level = alpha * (Y[:, t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seas[:, t % season] = gamma * (Y[:, t] - new_level) + (1 - gamma) * s
+        level = new_level
+    h = np.arange(1, horizon + 1)
+    fc = level[:, None] + h * trend[:, None] + seas[:, (T + h - 1) % season]
+    return fc, fit
+
+
+def damped_trend(Y: np.ndarray, horizon: int,
+                 alpha: float = ALPHA, beta: float = BETA, phi: float = PHI):
+    n, T = Y.shape
+    fit = np.full_like(Y, np.nan)
+    level = Y[:, 0].copy()
+    trend = Y[:, 1] - Y[:, 0] if T > 1 else np.zeros(n)
+    for t in range(1, T):
+        fit[:, t] = level + phi * trend
+        new_level = alpha * Y[:, t] + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+    damp = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return level[:, None] + damp * trend[:, None], fit
+
+
+_METHOD_FUNCS = {
+    "seasonal_naive": seasonal_naive,
+    "holt_winters":   holt_winters,
+    "damped_trend":   damped_trend,
+}
+
+
+# ── Forecast ──────────────────────────────────────────────────────────────────
+
+def forecast(Y: np.ndarray, horizon: int, method: str = "ensemble") -> StatForecast:
+    """Forecast every row of a filled matrix (see to_matrix) ``horizon`` steps ahead."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    if Y.shape[1] < 2 * SEASON:
+        Y = np.concatenate([np.repeat(Y[:, :1], 2 * SEASON - Y.shape[1], axis=1), Y], axis=1)
+
+    names = list(_METHOD_FUNCS) if method == "ensemble" else [method]
+    results = [_METHOD_FUNCS[m](Y, horizon) for m in names]
+    fc  = np.mean([r[0] for r in results], axis=0)
+    fit = np.mean([r[1] for r in results], axis=0)   # NaN until every method has a fit
+
+    with np.errstate(invalid="ignore"):
+        resid = Y - fit
+        valid = ~np.isnan(resid)
+        n_res = valid.sum(axis=1)
+        sse   = np.where(valid, resid, 0.0) ** 2
+        sigma = np.sqrt(sse.sum(axis=1) / np.maximum(n_res - 1, 1))
+        y_obs = np.where(valid, Y, 0.0)
+        y_bar = y_obs.sum(axis=1) / np.maximum(n_res, 1)
+        sst   = (np.where(valid, Y - y_bar[:, None], 0.0) ** 2).sum(axis=1)
+        r2    = np.where(sst > 0, 1.0 - sse.sum(axis=1) / np.where(sst > 0, sst, 1.0), 1.0)
+
+    std = sigma[:, None] * np.sqrt(np.arange(1, horizon + 1))
+    return StatForecast(mean=np.maximum(fc, 0.0), std=std, r2=r2)
+
+
+def forecast_series(series: Sequence[np.ndarray], horizon: int,
+                    method: str = "ensemble") -> StatForecast:
+    """Convenience wrapper: to_matrix() then forecast()."""
+    return forecast(to_matrix(series), horizon, method)
+
+
+# ── Quick demo  (python -m modules.stat_forecast) ────────────────────────────
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    t = np.arange(200)
+    demo = [
+        1500 + 2 * t + 80 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 20, len(t)),
+        np.full(10, 2400.0),
+        2000 + rng.normal(0, 50, 60),
+    ]
+    out = forecast_series(demo, horizon=7)
+    for i, row in enumerate(out.mean):
+        print(i, np.round(row).astype(int).tolist(), f"r2={out.r2[i]:.2f}")
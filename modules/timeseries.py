@@ -0,0 +1,115 @@
+"""
+AgriChain – modules/timeseries.py
+Calendar view of a (crop, mandi) price series.
+
+Series are stored as date-sorted observations (int32 day numbers since
+1970-01-01 plus prices) with gaps wherever a mandi didn't report.  This
+module reads them as a daily calendar: the price on any day is the last
+observation on or before it (forward fill), and a day without its own
+observation is flagged as filled.  When a date has several rows the last
+one is the day's price, like get_latest_price.  A price is carried forward
+for at most MAX_FILL_DAYS days; after a longer gap the days have no price
+(NaN) until the next observation, so a years-old price never stands in for
+a recent window.
+
+Windows are located with binary search on the sorted day numbers, so a
+"last 7 days" mean costs two searchsorted calls plus the observations
+inside the window — the calendar is never materialised or re-sorted:
+
+    window_mean(days, prices, 7)        mean daily price over the 7 calendar
+                                        days ending at the last observation
+    resample_daily(days, prices)        the full daily calendar, with flags
+    recent_daily(days, prices)          daily prices since the last long gap,
+                                        e.g. for a forecast in calendar days
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+MAX_FILL_DAYS = 30   # covers ~95 % of the reporting gaps in mandi_prices.csv
+
+
+def resample_daily(
+    days: np.ndarray, prices: np.ndarray, max_gap_days: int = MAX_FILL_DAYS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (calendar days, daily prices, filled) from the first to the last
+    observation; ``filled`` marks days carried forward from an earlier date.
+    Days more than ``max_gap_days`` after the last observation have price NaN.
+    """
+    days = np.asarray(days)
+    if len(days) == 0:
+        return days.astype(np.int32), np.empty(0), np.empty(0, dtype=bool)
+    calendar = np.arange(days[0], days[-1] + 1, dtype=np.int32)
+    pos = np.searchsorted(days, calendar, side="right") - 1
+    daily = np.asarray(prices, dtype=np.float64)[pos]
+    daily[calendar - days[pos] > max_gap_days] = np.nan
+    return calendar, daily, days[pos] != calendar
+
+
+def recent_daily(days: np.ndarray, prices: np.ndarray, max_gap_days: int = MAX_FILL_DAYS) -> np.ndarray:
+    """
+    Daily prices from the end of the last gap longer than ``max_gap_days`` to
+    the last observation: the stretch a forecaster can treat as one price
+    per calendar day.
+    """
+    _, daily, _ = resample_daily(days, prices, max_gap_days)
+    unfilled = np.flatnonzero(np.isnan(daily))
+    return daily[unfilled[-1] + 1:] if len(unfilled) else daily
+
+
+def window_mean(
+    days: np.ndarray, prices: np.ndarray, n_days: int, as_of: int | None = None,
+    max_gap_days: int = MAX_FILL_DAYS,
+) -> float:
+    """
+    Mean of the forward-filled daily prices over the ``n_days`` calendar days
+    ending at ``as_of`` (default: the last observation).  Days before the
+    first observation, or more than ``max_gap_days`` after the latest one,
+    are not counted; NaN if no day in the window has a price.
+    """
+    days = np.asarray(days)
+    if len(days) == 0:
+        return float("nan")
+    hi = int(days[-1]) if as_of is None else int(as_of)
+    lo = max(hi - n_days + 1, int(days[0]))
+    first = np.searchsorted(days, lo, side="right") - 1     # observation in force on day lo
+    last  = np.searchsorted(days, hi, side="right") - 1     # … and on day hi
+    if last < 0 or lo > hi:
+        return float("nan")
+    first = max(first, 0)
+    # each observation holds until the next one, the window end or its
+    # max_gap_days run out, whichever comes first
+    observed = days[first:last + 1].astype(np.int64)
+    begin = np.maximum(observed, lo)
+    end   = np.minimum(np.append(observed[1:], hi + 1), observed + max_gap_days + 1)
+    weights = np.maximum(end - begin, 0).astype(np.float64)   # 0 for all but a date's last row
+    covered = weights.sum()
+    if covered == 0:
+        return float("nan")
+    return float(np.dot(np.asarray(prices[first:last + 1], dtype=np.float64), weights) / covered)
+
+
+def window_means(days: np.ndarray, prices: np.ndarray, starts: np.ndarray, stops: np.ndarray,
+                 n_days: int, max_gap_days: int = MAX_FILL_DAYS) -> np.ndarray:
+    """window_mean() of every [start, stop) series, each ending at its own last observation."""
+    return np.array([
+        window_mean(days[a:b], prices[a:b], n_days, max_gap_days=max_gap_days)
+        for a, b in zip(np.asarray(starts).tolist(), np.asarray(stops).tolist())
+    ])
+
+
+# ── Quick check  (python -m modules.timeseries) ──────────────────────────────
+
+if __name__ == "__main__":
+    days = np.array([0, 1, 5, 5, 9], dtype=np.int32)
+    prices = np.array([10.0, 20.0, 99.0, 30.0, 40.0])
+    cal, daily, filled = resample_daily(days, prices)
+    print(list(zip(cal.tolist(), daily.tolist(), filled.tolist())))
+    for n in (1, 7, 30):
+        print(f"{n:>2}-day mean {window_mean(days, prices, n):.4f}  "
+              f"(calendar {np.nanmean(daily[-n:]):.4f})")
+    # a lone new price years after the rest: the old price is not carried into it
+    late = np.append(days, 2000).astype(np.int32)
+    print(f" 7-day mean after a gap {window_mean(late, np.append(prices, 55.0), 7):.4f}")
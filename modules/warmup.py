@@ -0,0 +1,212 @@
+"""
+AgriChain – modules/warmup.py
+Background pre-training of the busiest (crop, mandi) price models.
+
+Opt-in: set AGRICHAIN_WARMUP_PAIRS to the number of pairs to keep warm.
+ensure_started() then starts one scheduler per server process; the Home
+page only looks it up.  Its background thread does all the work off the
+Streamlit script thread: it builds the commodity partitions if needed,
+ranks the pairs by forecast traffic seen so far and then by row count, and
+submits the top ones to a single ProcessPoolExecutor that lives as long as
+the process.  Every RERANK_SECONDS it re-ranks, so pairs that became busy
+are added; when Agriculture_price_dataset.csv changes (or a delta is
+ingested) the ranking is redone and queued work for the old data dropped.
+
+Workers write compiled models to the on-disk registry (modules/model_registry),
+so the first forecast for a warmed pair loads its model instead of fitting
+it.  The parent only records each pair's outcome; nothing is loaded into
+the Streamlit caches from the scheduler's threads.
+
+status() reports every scheduled pair as queued / training / ready /
+skipped / failed for the UI.
+
+Configuration via environment:
+    AGRICHAIN_WARMUP_PAIRS=20     number of pairs to pre-train (default 0: off)
+    AGRICHAIN_WARMUP_WORKERS=2    worker processes
+"""
+
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules import price_predictor
+from modules.agri_store import data_signature, ensure_partitions, load_partition_columns
+
+DEFAULT_PAIRS   = 0
+DEFAULT_WORKERS = 2
+
+POLL_SECONDS   = 30    # how often the dataset signature is checked
+RERANK_SECONDS = 300   # how often traffic is re-read for new busy pairs
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(int(os.environ.get(name, default)), 0)
+    except ValueError:
+        return default
+
+
+# ── Ranking ───────────────────────────────────────────────────────────────────
+
+def pair_row_counts() -> dict[tuple[str, str], int]:
+    """{(commodity, market): rows} over every partition of the dataset."""
+    manifest = ensure_partitions()
+    if manifest is None:
+        return {}
+    counts = {}
+    for entry in manifest["commodities"].values():
+        loaded = load_partition_columns(entry["name"])
+        if loaded is None:
+            continue
+        _, cols = loaded
+        per_market = np.bincount(np.asarray(cols["market"]), minlength=len(entry["markets"]))
+        for market, n in zip(entry["markets"], per_market.tolist()):
+            counts[(entry["name"], market)] = n
+    return counts
+
+
+def rank_pairs(limit: int) -> list[tuple[str, str]]:
+    """Pairs to pre-train: most-requested first, then the largest series."""
+    traffic = price_predictor.request_counts()
+    rows = pair_row_counts()
+    candidates = set(rows) | set(traffic)
+    ranked = sorted(
+        candidates,
+        key=lambda p: (traffic.get(p, 0), rows.get(p, 0)),
+        reverse=True,
+    )
+    return [p for p in ranked if rows.get(p, 0) >= price_predictor.MIN_TRAIN_ROWS or p in traffic][:limit]
+
+
+# ── Worker (runs in a child process) ─────────────────────────────────────────
+
+def _pretrain(crop: str, mandi: str) -> str:
+    # One core per worker: the pool itself provides the parallelism.
+    return price_predictor.pretrain(crop, mandi, n_jobs=1)
+
+
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+
+class WarmupScheduler:
+    """Keeps the top ``limit`` pairs pre-trained on one pool of worker processes."""
+
+    def __init__(self, limit: int, workers: int):
+        self.limit   = limit
+        self.workers = max(workers, 1)
+        self.started = time.time()
+        self.pairs:    list[tuple[str, str]] = []
+        self._futures: dict[tuple[str, str], Future] = {}
+        self._state:   dict[tuple[str, str], str] = {}
+        self._lock     = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._signature: tuple[int, ...] | None = None
+        self._ranked_at = 0.0
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "WarmupScheduler":
+        """Start the background thread (once); a no-op when warm-up is off."""
+        if self.limit and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="agrichain-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                pass   # dataset unreadable right now; try again on the next poll
+            time.sleep(POLL_SECONDS)
+
+    def refresh(self) -> None:
+        """Re-rank and submit if the dataset changed or RERANK_SECONDS passed."""
+        signature = data_signature()
+        changed = signature != self._signature
+        if not changed and time.time() - self._ranked_at < RERANK_SECONDS:
+            return
+        pairs = rank_pairs(self.limit) if signature is not None else []
+        self._ranked_at = time.time()
+        with self._lock:
+            if changed:
+                # New data: drop work queued for the old version, retrain everything
+                for future in self._futures.values():
+                    future.cancel()
+                self._signature = signature
+                self.pairs, self._futures, self._state = [], {}, {}
+            for pair in pairs:
+                if pair in self._state:
+                    continue
+                future = self._executor().submit(_pretrain, *pair)
+                future.add_done_callback(lambda f, pair=pair, sig=signature: self._finished(pair, sig, f))
+                self.pairs.append(pair)
+                self._futures[pair] = future
+                self._state[pair] = "queued"
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _finished(self, pair: tuple[str, str], signature, future: Future) -> None:
+        if future.cancelled():
+            return
+        try:
+            state = future.result()
+        except Exception:
+            state = "failed"
+        with self._lock:
+            if signature == self._signature and pair in self._state:
+                self._state[pair] = state
+
+    def status(self) -> pd.DataFrame:
+        """One row per scheduled pair: Crop, Mandi, State."""
+        rows = []
+        with self._lock:
+            for pair in self.pairs:
+                state = self._state[pair]
+                if state == "queued" and self._futures[pair].running():
+                    state = "training"
+                rows.append({"Crop": pair[0], "Mandi": pair[1], "State": state})
+        return pd.DataFrame(rows, columns=["Crop", "Mandi", "State"])
+
+    def counts(self) -> dict[str, int]:
+        states = self.status()["State"]
+        return {s: int((states == s).sum()) for s in ("queued", "training", "ready", "skipped", "failed")}
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_started() -> WarmupScheduler:
+    """
+    The process-wide scheduler, started on first call.  Cheap on the script
+    thread: ranking, partition builds and training all happen in the background.
+    """
+    limit = _env_int("AGRICHAIN_WARMUP_PAIRS", DEFAULT_PAIRS)
+    workers = _env_int("AGRICHAIN_WARMUP_WORKERS", DEFAULT_WORKERS)
+    return WarmupScheduler(limit, workers).start()
+
+
+def status() -> pd.DataFrame:
+    return ensure_started().status()
+
+
+# ── Run warm-up in the foreground  (python -m modules.warmup) ────────────────
+
+if __name__ == "__main__":
+    sched = WarmupScheduler(_env_int("AGRICHAIN_WARMUP_PAIRS", 20),
+                            _env_int("AGRICHAIN_WARMUP_WORKERS", DEFAULT_WORKERS))
+    sched.refresh()
+    print(f"Pre-training {len(sched.pairs)} pairs on {sched.workers} workers")
+    while sched.counts()["queued"] + sched.counts()["training"]:
+        time.sleep(1)
+    print(sched.status().to_string(index=False))
+    print(f"done in {time.time() - sched.started:.1f}s")
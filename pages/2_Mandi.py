@@ -1,12 +1,13 @@
 """AgriChain – pages/2_Mandi.py  |  Page 3: Mandi Ranker + Map"""
 
+import numpy as np
 import streamlit as st
-import pandas as pd
 from streamlit_folium import st_folium
 
 from modules.sidebar import render_page
 from modules.map_utils import build_map, MANDIS
 from modules.translations import t, CROP_EMOJI
+from modules.price_analysis import analyse_all_prices
 
 st.set_page_config(page_title="AgriChain – Mandi", page_icon="🏪", layout="wide")
 
@@ -39,42 +40,23 @@ st_folium(m, width="100%", height=380, key="mandi_map", returned_objects=[])
 st.divider()
 
 # ── Mandi price table ─────────────────────────────────────────────────────────
-CSV_PATH = "data/mandi_prices.csv"
-
-@st.cache_data(ttl=600)
-def load_csv():
-    df = pd.read_csv(CSV_PATH)
-    df.columns = [c.strip() for c in df.columns]
-    df["Crop"]  = df["Crop"].str.strip()
-    df["Mandi"] = df["Mandi"].str.strip()
-    df["Date"]  = pd.to_datetime(df["Date"], dayfirst=True)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    return df.dropna(subset=["Price"])
-
 try:
-    df  = load_csv()
-    cdf = df[df["Crop"].str.lower() == crop.lower()].copy()
+    table = analyse_all_prices()
+    cdf   = table[table["Crop"].str.lower() == crop.lower()]
 
     if cdf.empty:
         st.info(f"No price data found for **{crop}**. Available crops: "
-                f"{', '.join(sorted(df['Crop'].unique()))}")
+                f"{', '.join(sorted(table['Crop'].unique()))}")
     else:
-        rows = []
-        for mandi_name, mgrp in cdf.groupby("Mandi"):
-            sorted_g = mgrp.sort_values("Date", ascending=False)
-            last7    = sorted_g.head(7)["Price"].mean()
-            last30   = sorted_g.head(30)["Price"].mean()
-            trend    = round(((last7 - last30) / last30) * 100, 2) if last30 else 0.0
-            score    = 25 if trend >= 5 else (20 if trend >= 0 else (15 if trend >= -5 else 10))
-            rows.append({
-                "Mandi":         mandi_name,
-                "7‑Day Avg (₹)": round(last7, 0),
-                "30‑Day Avg (₹)":round(last30, 0),
-                "Trend %":       trend,
-                "Score":         score,
-            })
-
-        rank_df = pd.DataFrame(rows).sort_values("Score", ascending=False).reset_index(drop=True)
+        # the page's own 0-25 scale: 25 / 20 / 15 / 10 at trend ≥ +5%, ≥ 0%, ≥ -5%, below
+        trend   = cdf["trend_percent"].to_numpy()
+        rank_df = (
+            cdf.assign(Score=np.select([trend >= 5, trend >= 0, trend >= -5], [25, 20, 15], default=10))
+               .sort_values("Score", ascending=False, kind="stable")
+               .rename(columns={"last_7_avg": "7‑Day Avg (₹)", "last_30_avg": "30‑Day Avg (₹)",
+                                "trend_percent": "Trend %"})
+               .reset_index(drop=True)
+        )
 
         st.markdown(f"### Rankings for {emoji} **{crop}**")
 
@@ -106,7 +88,8 @@ try:
   </div>
 </div>""", unsafe_allow_html=True)
 
-        st.caption("🗺️ = Location shown on map. Score based on 7-day vs 30-day price trend.")
+        st.caption("🗺️ = Location shown on map. Score out of 25 from the 7-day vs 30-day "
+                   "price trend: 25 at ≥ +5%, 20 at ≥ 0%, 15 at ≥ -5%, 10 below.")
 
 except FileNotFoundError:
     st.error("❌ Price data file not found: `data/mandi_prices.csv`")
@@ -144,6 +144,11 @@ with map_col:
 sync_all(crop=crop, district=district, quantity=quantity)
 
 # ─── Results ──────────────────────────────────────────────────────────────────
+def _rupees(value):
+    """₹ amount, or — when unknown (a mandi without coordinates has no transport cost)."""
+    return "—" if value is None else f"₹{value:,.0f}"
+
+
 if run:
     with st.spinner("Fetching prices and calculating net profits..."):
         mandis = rank_mandis(crop, quantity, district, top_n=3)
@@ -177,15 +182,15 @@ if run:
                 </div>
                 <div class="mandi-metric-cell">
                   <div class="mandi-metric-label">{t('Transport Cost', lang_code)}</div>
-                  <div class="mandi-metric-value metric-red">₹{m['transport_cost_qtl']:,.0f}<span style="font-size:0.7rem;color:#888;">/qtl</span></div>
+                  <div class="mandi-metric-value metric-red">{_rupees(m['transport_cost_qtl'])}<span style="font-size:0.7rem;color:#888;">/qtl</span></div>
                 </div>
                 <div class="mandi-metric-cell">
                   <div class="mandi-metric-label">{t('Net Profit per Qtl', lang_code)}</div>
-                  <div class="mandi-metric-value metric-green">₹{m['net_profit_per_qtl']:,.0f}</div>
+                  <div class="mandi-metric-value metric-green">{_rupees(m['net_profit_per_qtl'])}</div>
                 </div>
                 <div class="mandi-metric-cell">
                   <div class="mandi-metric-label">{t('Distance', lang_code)}</div>
-                  <div class="mandi-metric-value">{m['distance_km']:.0f} <span style="font-size:0.7rem;color:#888;">km</span></div>
+                  <div class="mandi-metric-value">{"—" if m['distance_km'] is None else f"{m['distance_km']:.0f}"} <span style="font-size:0.7rem;color:#888;">km</span></div>
                 </div>
               </div>
             </div>
@@ -219,10 +224,13 @@ if run:
 
         # Total summary
         st.markdown(f"#### 💰 {t('Total Earnings', lang_code)} — {quantity:.0f} Quintals")
-        best  = mandis[0]
-        worst = mandis[-1]
-        gain  = max(0, (best["net_profit_per_qtl"] - worst["net_profit_per_qtl"]) * quantity)
+        # unmapped mandis (no distance, so no net profit) come last and are left out here
+        known = [m for m in mandis if m["net_profit_per_qtl"] is not None] or mandis[:1]
+        best  = known[0]
+        worst = known[-1]
+        gain  = max(0, (best["net_profit_per_qtl"] or 0) - (worst["net_profit_per_qtl"] or 0)) * quantity
+        best_total = None if best["net_profit_per_qtl"] is None else best["net_profit_per_qtl"] * quantity
         t1, t2, t3 = st.columns(3)
-        t1.metric(f"🥇 Best — {best['mandi'].split()[0]}", f"₹{best['net_profit_per_qtl'] * quantity:,.0f}", border=True)
-        t2.metric("🚛 Total Transport (Best)",              f"₹{best['total_transport']:,.0f}", border=True)
+        t1.metric(f"🥇 Best — {best['mandi'].split()[0]}", _rupees(best_total), border=True)
+        t2.metric("🚛 Total Transport (Best)",              _rupees(best["total_transport"]), border=True)
         t3.metric("📈 Extra vs Worst Option",               f"+₹{gain:,.0f}", border=True)
@@ -13,7 +13,9 @@ import math
 from modules.agri_data import (
     DISTRICT_CENTROIDS, MANDI_DATA, CROP_EMOJI, DEFAULT_EMOJI, CROP_DURATION, t,
 )
-from modules.data_loader import build_mandi_price_dict, get_top_mandis_for_crop, get_mandi_coords
+from modules.data_loader import (
+    build_mandi_price_dict, get_top_mandis_for_crop, get_mandi_coords, forecast_mandis_for_crop,
+)
 from modules.map_utils import (
     build_base_map, add_india_layer, add_mh_district_layer,
     add_district_marker, add_mandi_markers,
@@ -302,16 +304,24 @@ with col1:
 
 with col2:
     top_mandis = get_top_mandis_for_crop(crop, n=4)
+    # Statistical forecast 7 calendar days past each mandi's last report, in one pass
+    forecasts = forecast_mandis_for_crop(crop, days_ahead=7).set_index("Mandi")
     st.markdown('<div class="info-card">', unsafe_allow_html=True)
     st.markdown('<div class="info-card-title">&#127978; Top Mandi Prices</div>', unsafe_allow_html=True)
     if top_mandis.empty:
         st.markdown('<div style="color:#888;font-size:0.85rem">No data</div>', unsafe_allow_html=True)
     else:
         for _, row in top_mandis.iterrows():
+            fc_html = ""
+            if row["Mandi"] in forecasts.index:
+                fc = forecasts.loc[row["Mandi"]]
+                arrow = "&#9650;" if fc["Change"] > 0 else "&#9660;" if fc["Change"] < 0 else "&#9654;"
+                fc_day = (fc["LastDate"] + pd.Timedelta(days=7)).strftime("%d %b")
+                fc_html = f' <span style="color:#888;font-weight:400;font-size:0.78rem">{arrow} &#8377;{int(fc["ForecastPrice"]):,} by {fc_day}</span>'
             st.markdown(f"""
             <div class="summary-row">
                 <span class="summary-key">{row['Mandi']}</span>
-                <span class="summary-val">&#8377;{row['LatestPrice']:,}</span>
+                <span class="summary-val">&#8377;{row['LatestPrice']:,}{fc_html}</span>
             </div>
             """, unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
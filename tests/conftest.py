@@ -0,0 +1,49 @@
+"""
+Shared fixtures: every test that touches the price store gets its own
+store, segment log, rollup directory and SQLite database under tmp_path, and empty
+Streamlit caches, so nothing is read from or written to data/.cache.
+"""
+
+from __future__ import annotations
+import sys
+from pathlib import Path
+
+import pytest
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules import price_db, price_store, rollup   # noqa: E402
+
+
+def _clear_caches() -> None:
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    price_store._read_segments.cache_clear()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Redirect the price store, segment log, rollup and price database into tmp_path."""
+    store_dir = tmp_path / "price_store"
+    segments  = price_store.SegmentLog("mandi_prices", root=tmp_path / "segments")
+    monkeypatch.setattr(price_store, "STORE_DIR", store_dir)
+    monkeypatch.setattr(price_store, "MANIFEST", store_dir / "manifest.json")
+    monkeypatch.setattr(price_store, "SEGMENTS", segments)
+    monkeypatch.setattr(rollup, "SEGMENTS", segments)
+    monkeypatch.setattr(rollup, "ROLLUP_DIR", tmp_path / "rollup")
+    monkeypatch.setattr(rollup, "ROLLUP_FILE", tmp_path / "rollup" / "rollup.json")
+    monkeypatch.setattr(price_db, "SEGMENTS", segments)
+    monkeypatch.setattr(price_db, "DB_PATH", tmp_path / "prices.sqlite")
+    monkeypatch.setattr(price_db, "_synced", {})
+    monkeypatch.delenv("AGRICHAIN_PRICE_BACKEND", raising=False)
+    _clear_caches()
+    yield tmp_path
+    _clear_caches()
+
+
+def write_csv(path: Path, rows: list[tuple[str, str, float, str]]) -> Path:
+    """A mandi_prices.csv-layout file (Crop, Mandi, Price, Date as dd-mm-yyyy)."""
+    lines = ["Crop,Mandi,Price,Date"] + [f"{c},{m},{p},{d}" for c, m, p, d in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,52 @@
+"""A direct-only PriceModel (backtest's direct backend) saves, loads and forecasts."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+from modules import price_predictor   # noqa: E402
+from modules.price_predictor import DIRECT_HORIZON, PriceModel, _fit_model   # noqa: E402
+
+
+def _series(n: int = 160) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    price = 1500 + 3 * np.arange(n) + rng.normal(0, 30, n)
+    return pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "Price": price, "Min_Price": price - 50, "Max_Price": price + 50,
+    })
+
+
+@pytest.fixture(scope="module")
+def direct_only():
+    model = _fit_model(_series(), n_jobs=1, params={"n_estimators": 10, "max_depth": 6},
+                       iterative=False)
+    assert model.forest is None and model.direct is not None
+    return model
+
+
+def test_save_and_load_without_a_one_step_forest(direct_only, tmp_path):
+    direct_only.save(tmp_path)
+    assert not (tmp_path / "forest").exists()
+    loaded = PriceModel.load(tmp_path)
+    assert loaded.forest is None
+    x = direct_only.last_data[price_predictor.FEATURE_COLS].values
+    np.testing.assert_array_equal(loaded.direct.predict(x), direct_only.direct.predict(x))
+
+
+@pytest.mark.parametrize("mode", ["iterative", "direct"])
+def test_forecast_uses_the_direct_forest(direct_only, monkeypatch, mode):
+    monkeypatch.setattr(price_predictor, "_train_model", lambda crop, mandi: direct_only)
+    result = price_predictor._forecast("Onion", "Pune", 7, mode, pooled=False)
+    assert result["mode"] == "direct" and len(result["predictions"]) == 7
+
+
+def test_too_long_horizon_falls_back_to_statistics(direct_only, monkeypatch):
+    monkeypatch.setattr(price_predictor, "_train_model", lambda crop, mandi: direct_only)
+    fallback = {"mode": "statistical"}
+    monkeypatch.setattr(price_predictor, "_statistical_forecast", lambda c, m, d: fallback)
+    assert price_predictor._forecast("Onion", "Pune", DIRECT_HORIZON + 1, "iterative", False) is fallback
@@ -0,0 +1,63 @@
+"""Ring-buffer feature rows against shifted pandas rolling statistics."""
+
+from __future__ import annotations
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from modules.features import FEATURE_COLS, HISTORY, FeatureEngine, build_feature_matrix
+
+
+def _series(n: int = 120):
+    rng = np.random.default_rng(0)
+    dates = [datetime.date(2024, 1, 1) + datetime.timedelta(days=int(d))
+             for d in np.cumsum(rng.integers(1, 4, n))]
+    prices = rng.uniform(800, 2500, n).round(2)
+    spreads = rng.uniform(0, 200, n)
+    spreads[[40, 41, 75]] = np.nan   # a missing spread keeps the previous one
+    return dates, prices, spreads
+
+
+def test_feature_matrix_matches_shifted_pandas_rolling():
+    dates, prices, spreads = _series()
+    n = len(prices)
+    X = pd.DataFrame(build_feature_matrix(dates, prices, spreads), columns=FEATURE_COLS)
+
+    p = pd.Series(prices)
+    past = p.shift(1)   # a row only sees earlier observations
+    ts = pd.to_datetime(pd.Series(dates))
+    expected = pd.DataFrame({
+        "day_of_year":  ts.dt.dayofyear,
+        "month":        ts.dt.month,
+        "day_of_week":  ts.dt.dayofweek,
+        "week_of_year": ts.dt.isocalendar().week.astype(int),
+        "trend":        np.arange(n),
+        "lag_7":        p.shift(7),
+        "lag_14":       p.shift(14),
+        "lag_30":       p.shift(30),
+        "roll_mean_7":  past.rolling(7).mean(),
+        "roll_std_7":   past.rolling(7).std(),
+        "roll_mean_14": past.rolling(14).mean(),
+        "roll_mean_30": past.rolling(30).mean(),
+        "momentum_7":   past - past.rolling(7).mean(),
+        "momentum_14":  past - past.rolling(14).mean(),
+        "price_spread": pd.Series(spreads).ffill().shift(1),
+    }).iloc[HISTORY:].reset_index(drop=True).astype(np.float64)
+
+    pd.testing.assert_frame_equal(X, expected, check_exact=False, rtol=1e-9)
+
+
+def test_engine_state_round_trip_continues_identically():
+    dates, prices, spreads = _series()
+    a = FeatureEngine()
+    for p, s in zip(prices[:80], spreads[:80]):
+        a.push(p, s)
+    b = FeatureEngine.from_state(a.state())
+    for p, s in zip(prices[80:], spreads[80:]):
+        a.push(p, s)
+        b.push(p, s)
+    row_a, row_b = np.empty(len(FEATURE_COLS)), np.empty(len(FEATURE_COLS))
+    a.write_row(row_a, dates[-1], len(prices))
+    b.write_row(row_b, dates[-1], len(prices))
+    np.testing.assert_array_equal(row_a, row_b)
@@ -0,0 +1,51 @@
+"""ForecastCache hits, misses and invalidation by key."""
+
+from __future__ import annotations
+
+from modules import model_registry, price_predictor
+from modules.forecast_cache import ForecastCache
+
+
+def test_hit_miss_and_private_copies():
+    cache, calls = ForecastCache(max_entries=2), []
+
+    def compute():
+        calls.append(1)
+        return {"predictions": [1.0, 2.0]}
+
+    first = cache.get_or_compute(("Onion", "Pune", 7), compute)
+    first["predictions"].append(99.0)   # callers may mutate their copy
+    second = cache.get_or_compute(("Onion", "Pune", 7), compute)
+    assert second == {"predictions": [1.0, 2.0]}
+    assert len(calls) == 1 and cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_new_key_recomputes_and_lru_is_bounded():
+    cache = ForecastCache(max_entries=2)
+    for version in (1, 2, 3):
+        cache.get_or_compute(("Onion", "Pune", 7, version), lambda v=version: v)
+    assert cache.stats()["entries"] == 2
+    assert cache.get_or_compute(("Onion", "Pune", 7, 1), lambda: "recomputed") == "recomputed"
+
+
+def test_disk_layer_is_shared_between_instances(tmp_path):
+    ForecastCache(disk_dir=tmp_path).get_or_compute("k", lambda: {"a": 1})
+    other = ForecastCache(disk_dir=tmp_path)
+    assert other.get_or_compute("k", lambda: {"a": 2}) == {"a": 1}
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_version_moves_when_a_model_is_saved(monkeypatch, tmp_path):
+    monkeypatch.setattr(price_predictor, "data_signature", lambda: (1, 2, 0, 0))
+    monkeypatch.setattr(model_registry, "config_mtime", lambda crop, name: None)
+    latest = {"path": None}
+    monkeypatch.setattr(model_registry, "latest_path", lambda crop, mandi, schema: latest["path"])
+
+    before = price_predictor._forecast_version("Onion", "Pune", pooled=False)
+    assert before == price_predictor._forecast_version("Onion", "Pune", pooled=False)
+    latest["path"] = tmp_path / "v3-abc"
+    after = price_predictor._forecast_version("Onion", "Pune", pooled=False)
+    assert before != after and after[-1] == "v3-abc"
+
+    monkeypatch.setattr(price_predictor, "data_signature", lambda: (1, 3, 0, 0))
+    assert price_predictor._forecast_version("Onion", "Pune", pooled=False) != after
@@ -0,0 +1,40 @@
+"""FlatForest against scikit-learn's RandomForestRegressor."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.ensemble import RandomForestRegressor   # noqa: E402
+from sklearn.preprocessing import StandardScaler     # noqa: E402
+
+from modules.forest import FlatForest                 # noqa: E402
+
+
+def _fitted(scaled: bool, n_outputs: int):
+    rng = np.random.default_rng(0)
+    X = rng.normal(1000, 300, (300, 6))
+    Y = X[:, :n_outputs] * 0.5 + rng.normal(0, 20, (300, n_outputs))
+    scaler = StandardScaler().fit(X) if scaled else None
+    model = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0)
+    model.fit(scaler.transform(X) if scaled else X, Y[:, 0] if n_outputs == 1 else Y)
+    return model, scaler, rng.normal(1000, 300, (200, 6))
+
+
+@pytest.mark.parametrize("scaled", [False, True])
+@pytest.mark.parametrize("n_outputs", [1, 3])
+def test_flat_forest_matches_sklearn(scaled, n_outputs):
+    model, scaler, X_new = _fitted(scaled, n_outputs)
+    expected = model.predict(scaler.transform(X_new) if scaled else X_new)
+    flat = FlatForest.from_sklearn(model, scaler)
+    np.testing.assert_allclose(flat.predict(X_new), expected, rtol=1e-12)
+
+
+def test_saved_forest_predicts_the_same(tmp_path):
+    model, scaler, X_new = _fitted(True, 1)
+    flat = FlatForest.from_sklearn(model, scaler)
+    flat.save(tmp_path / "forest")
+    np.testing.assert_array_equal(FlatForest.load(tmp_path / "forest").predict(X_new),
+                                  flat.predict(X_new))
@@ -0,0 +1,19 @@
+"""Target encoding of the pooled model only sees earlier prices."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from modules.global_model import expanding_encode, target_encode
+
+
+def test_expanding_encoding_uses_only_earlier_prices():
+    prices = np.random.default_rng(0).uniform(500, 3000, 50)
+    encoded = expanding_encode(prices, prior=1500.0)
+    for t in range(len(prices)):
+        assert encoded[t] == pytest.approx(target_encode(prices[:t], 1500.0), rel=1e-12)
+
+    changed = prices.copy()
+    changed[20] = 1e6   # a row's own target doesn't move its encoding
+    np.testing.assert_array_equal(expanding_encode(changed, 1500.0)[:21], encoded[:21])
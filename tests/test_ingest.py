@@ -0,0 +1,63 @@
+"""Delta segments: last-row-wins merging and idempotent ingestion."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from conftest import write_csv
+from modules import ingest, price_store
+from modules.price_store import PriceTable, last_wins
+
+BASE = [
+    ("Onion", "Lasalgaon", 1800.0, "01-01-2024"),
+    ("Onion", "Lasalgaon", 1850.5, "02-01-2024"),
+    ("Onion", "Pune",      1900.0, "01-01-2024"),
+    ("Wheat", "Sangli",    2300.0, "15-03-2024"),
+    ("Wheat", "Sangli",    2310.0, "15-03-2024"),   # same day twice
+]
+
+
+def test_last_wins_matches_drop_duplicates():
+    rng = np.random.default_rng(0)
+    n, first_new = 400, 300
+    keys = [rng.integers(0, 3, n), rng.integers(0, 4, n), rng.integers(0, 20, n)]
+    keep = last_wins(keys, first_new)
+
+    frame = pd.DataFrame({"a": keys[0], "b": keys[1], "c": keys[2]})
+    delta_keys = set(map(tuple, frame.iloc[first_new:].to_numpy().tolist()))
+    touched = np.array([k in delta_keys for k in map(tuple, frame.to_numpy().tolist())])
+    last = ~frame.duplicated(keep="last").to_numpy()
+    np.testing.assert_array_equal(keep, ~touched | last)
+
+
+def test_extend_replaces_rows_on_crop_mandi_date(store):
+    csv = write_csv(store / "prices.csv", BASE)
+    table = PriceTable(*price_store.load_columns(csv))
+    delta = pd.DataFrame({
+        "Crop":  ["Onion", "Potato"],
+        "Mandi": ["Pune", "Pune"],
+        "Price": [2000.0, 1200.0],
+        "Date":  pd.to_datetime(["2024-01-01", "2024-01-01"]),
+    })
+    frame = table.extend(delta).to_frame()
+
+    assert len(frame) == 6   # Onion/Pune replaced, Potato/Pune added
+    onion_pune = frame[(frame["Crop"] == "Onion") & (frame["Mandi"] == "Pune")]
+    assert onion_pune["Price"].tolist() == [2000.0]
+    sangli = frame[frame["Mandi"] == "Sangli"]["Price"].tolist()
+    assert sangli == [2300.0, 2310.0]   # rows no delta touches are kept as they are
+
+
+def test_ingest_is_idempotent(store):
+    delta = write_csv(store / "delta.csv", [
+        ("Onion", "Lasalgaon", 1999.0, "01-01-2030"),
+        ("Onion", "Lasalgaon", 2001.0, "01-01-2030"),
+    ])
+    assert ingest.ingest_file(delta) == ("mandi_prices", 1)
+    version = price_store.data_version()
+
+    assert ingest.ingest_file(delta) == ("mandi_prices", 0)
+    assert price_store.data_version() == version
+    assert len(price_store.SEGMENTS.segments()) == 1
+    assert price_store.SEGMENTS.frame()["Price"].tolist() == [2001.0]
@@ -0,0 +1,57 @@
+"""rank_mandis() against a plain scalar sort over every mandi of the crop."""
+
+from __future__ import annotations
+import math
+
+import pytest
+
+from modules.data_loader import MANDI_COORDINATES, get_rollup
+from modules.mandi_ranker import TRANSPORT_RATE_PER_KM_QTL, rank_mandis
+from utils.geo import DISTRICT_COORDS
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def _scalar_ranking(crop: str, district: str) -> list[tuple]:
+    """(mandi, price, transport, net profit) for every mapped mandi, best first."""
+    origin = DISTRICT_COORDS[district]
+    table, rows = get_rollup().for_crop(crop), []
+    for mandi, price in zip(table["Mandi"], table["latest_price"]):
+        if mandi not in MANDI_COORDINATES:
+            continue
+        price = float(round(price))
+        dist = _haversine(*origin, *MANDI_COORDINATES[mandi])
+        transport = round(dist * TRANSPORT_RATE_PER_KM_QTL, 2)
+        rows.append((mandi, price, transport, round(price - transport, 2)))
+    return sorted(rows, key=lambda r: (-r[3], -r[1], r[0]))
+
+
+@pytest.mark.parametrize("crop", ["Onion", "Tomato", "Wheat"])
+@pytest.mark.parametrize("district", ["Nashik", "Pune", "Nagpur"])
+def test_matches_the_scalar_sort(store, crop, district):
+    expected = _scalar_ranking(crop, district)
+    for top_n in (1, 3, 10):
+        got = rank_mandis(crop, 50.0, district, top_n=top_n)
+        assert [(m["mandi"], m["expected_price"], m["transport_cost_qtl"], m["net_profit_per_qtl"])
+                for m in got] == expected[:top_n]
+        assert all(m["total_transport"] == round(m["transport_cost_qtl"] * 50.0, 2) for m in got)
+
+
+def test_unmapped_mandis_are_kept_after_the_mapped_ones(store):
+    rows = get_rollup().for_crop("Onion")
+    assert not rows["Mandi"].isin(MANDI_COORDINATES).all()
+
+    ranked = rank_mandis("Onion", 10.0, "Pune", top_n=len(rows))
+    assert sorted(m["mandi"] for m in ranked) == sorted(rows["Mandi"])
+
+    unknown = [m for m in ranked if m["distance_km"] is None]
+    assert ranked[-len(unknown):] == unknown
+    assert all(m["mandi"] not in MANDI_COORDINATES for m in unknown)
+    assert all(m["net_profit_per_qtl"] is None and m["total_transport"] is None for m in unknown)
+    prices = [m["expected_price"] for m in unknown]
+    assert prices == sorted(prices, reverse=True)
@@ -0,0 +1,51 @@
+"""MarketIndex resolution rules and confidences."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from modules.market_index import MarketIndex, base_name, normalize
+
+NAMES = ["Lasalgaon(Niphad)", "Lasalgaon(Vinchur)", "Pune", "Pune(Manjri)",
+         "Solapur", "Mumbai", "Pimpalgaon Baswant(Saykheda)"]
+# rows per market: Lasalgaon(Niphad) 3, Lasalgaon(Vinchur) 2, Pune 4, …
+CODES = np.array([0, 1, 2, 2, 0, 3, 4, 2, 5, 6, 1, 0, 2], dtype=np.int32)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return MarketIndex(NAMES, CODES)
+
+
+def test_normalisation():
+    assert normalize("Lasalgaon (Niphad) APMC") == "lasalgaon niphad"
+    assert base_name("Lasalgaon(Niphad)") == "lasalgaon"
+
+
+@pytest.mark.parametrize("query, markets, method, confidence", [
+    ("Lasalgaon(Niphad)",   ["Lasalgaon(Niphad)"], "exact", 1.0),
+    ("pune",                ["Pune"], "exact", 1.0),
+    ("Lasalgaon - Niphad",  ["Lasalgaon(Niphad)"], "normalised", 0.95),
+    ("Sholapur",            ["Solapur"], "alias", 0.9),
+    ("Vashi",               ["Mumbai"], "alias", 0.9),
+    ("Lasalgaon",           ["Lasalgaon(Niphad)", "Lasalgaon(Vinchur)"], "alias", 0.9),
+])
+def test_resolve_rules(index, query, markets, method, confidence):
+    match = index.resolve(query)
+    assert (sorted(match.markets), match.method, match.confidence) == (markets, method, confidence)
+    expected_rows = np.flatnonzero(np.isin(CODES, [NAMES.index(m) for m in markets]))
+    np.testing.assert_array_equal(match.rows, expected_rows)
+
+
+def test_small_match_is_widened_to_the_town(index):
+    match = index.resolve("Pune(Manjri)", min_rows=3)
+    assert sorted(match.markets) == ["Pune", "Pune(Manjri)"] and match.method == "tokens"
+    assert index.resolve("Pune(Manjri)").markets == ["Pune(Manjri)"]
+
+
+def test_trigram_guess_is_low_confidence(index):
+    match = index.resolve("Solapurr")
+    assert match.method == "trigram" and match.markets == ["Solapur"]
+    assert 0 < match.confidence <= 0.7
+    assert index.resolve("Kolhapur Xyz Qwerty") is None
@@ -0,0 +1,76 @@
+"""ModelCache eviction under its byte budget."""
+
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from modules.model_cache import ModelCache
+
+
+@dataclass
+class Blob:
+    name:   str
+    nbytes: int
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = ModelCache(max_bytes=300, policy="lru")
+    for name in "abc":
+        cache.put(name, Blob(name, 100))
+    cache.get("a")                      # b is now the least recent
+    cache.put("d", Blob("d", 100))
+    assert [k for k in "abcd" if k in cache] == ["a", "c", "d"]
+    assert cache.nbytes == 300 and cache.evictions == 1
+
+
+def test_lfu_evicts_the_least_frequently_used():
+    cache = ModelCache(max_bytes=300, policy="lfu")
+    for name in "abc":
+        cache.put(name, Blob(name, 100))
+    for _ in range(3):
+        cache.get("a")
+    cache.get("b")
+    cache.put("d", Blob("d", 100))     # c has the fewest uses
+    assert [k for k in "abcd" if k in cache] == ["a", "b", "d"]
+
+
+def test_budget_counts_bytes_not_entries():
+    cache = ModelCache(max_bytes=220)
+    cache.put("small1", Blob("s", 50))
+    cache.put("small2", Blob("s", 50))
+    cache.put("big", Blob("b", 200))    # both small ones must go
+    assert len(cache) == 1 and cache.nbytes == 200
+    cache.put("huge", Blob("h", 1000))  # larger than the budget: kept on its own
+    assert len(cache) == 1 and "huge" in cache
+
+
+def test_replacing_a_key_recharges_its_size():
+    cache = ModelCache(max_bytes=1000)
+    cache.put("a", Blob("a", 100))
+    cache.put("a", Blob("a", 300))
+    assert cache.nbytes == 300 and len(cache) == 1
+
+
+def test_concurrent_misses_load_once():
+    cache, calls = ModelCache(max_bytes=1000), []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return Blob("x", 10)
+
+    threads = [threading.Thread(target=cache.get_or_load, args=("k", loader)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 7
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ModelCache(100, policy="fifo")
@@ -0,0 +1,35 @@
+"""analyse_all_prices() against analyse_prices(), pair by pair."""
+
+from __future__ import annotations
+from dataclasses import asdict
+
+import pytest
+
+from modules.price_analysis import _compute_price_score, analyse_all_prices, analyse_prices
+
+
+def test_table_matches_single_pair_analysis(store):
+    table = analyse_all_prices()
+    assert len(table) > 100
+
+    for row in table.itertuples(index=False):
+        single = asdict(analyse_prices(row.Crop, row.Mandi))
+        assert single == {
+            "last_7_avg":    row.last_7_avg,
+            "last_30_avg":   row.last_30_avg,
+            "trend_percent": row.trend_percent,
+            "price_score":   row.price_score,
+        }, (row.Crop, row.Mandi)
+
+
+@pytest.mark.parametrize("trend, score", [
+    (12.0, 30.0), (10.0, 30.0), (5.0, 25.0), (0.0, 20.0), (-0.01, 15.0),
+    (-5.0, 15.0), (-10.0, 10.0), (-10.01, 5.0),
+])
+def test_score_tiers(trend, score):
+    assert _compute_price_score(trend) == score
+
+
+def test_unknown_pair_raises(store):
+    with pytest.raises(ValueError):
+        analyse_prices("Onion", "Nowhere")
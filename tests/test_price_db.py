@@ -0,0 +1,71 @@
+"""SQLite backend: the lookups answer exactly what the NumPy index and rollup do."""
+
+from __future__ import annotations
+from dataclasses import asdict
+
+import pytest
+import streamlit as st
+
+from conftest import write_csv
+from modules import data_loader, ingest
+from modules.price_analysis import analyse_prices
+
+CROPS = ["Onion", "Tomato", "Wheat"]
+
+
+def _lookups() -> dict:
+    out = {}
+    for crop in CROPS:
+        mandis = data_loader.get_mandis_for_crop(crop)
+        out[crop] = {
+            "mandis":  mandis,
+            "busiest": data_loader.get_busiest_mandi(crop),
+            "top":     data_loader.get_top_mandis_for_crop(crop).to_dict("list"),
+            "prices":  data_loader.build_mandi_price_dict(crop),
+        }
+        for mandi in mandis:
+            out[crop, mandi] = {
+                "latest":   data_loader.get_latest_price(crop, mandi),
+                "avg":      [data_loader.get_avg_price(crop, mandi, d) for d in (7, 14, 30, 90)],
+                "analysis": asdict(analyse_prices(crop, mandi)),
+            }
+    return out
+
+
+def _both_backends(monkeypatch) -> tuple[dict, dict]:
+    numpy = _lookups()
+    st.cache_data.clear()
+    monkeypatch.setenv("AGRICHAIN_PRICE_BACKEND", "sqlite")
+    sqlite = _lookups()
+    monkeypatch.delenv("AGRICHAIN_PRICE_BACKEND")
+    st.cache_data.clear()
+    return numpy, sqlite
+
+
+def test_lookups_match_the_numpy_backend(store, monkeypatch):
+    numpy, sqlite = _both_backends(monkeypatch)
+    assert len(numpy) > len(CROPS)
+    assert sqlite == numpy
+
+
+def test_lookups_match_after_an_ingested_delta(store, monkeypatch):
+    _both_backends(monkeypatch)   # database synced before the delta
+    delta = write_csv(store / "delta.csv", [
+        ("Onion",  "Lasalgaon", 2999.0, "01-01-2030"),
+        ("Onion",  "Lasalgaon", 3001.0, "01-01-2030"),   # last row wins
+        ("Tomato", "Nowhere",   1500.0, "02-01-2030"),
+    ])
+    ingest.ingest_file(delta)
+
+    numpy, sqlite = _both_backends(monkeypatch)
+    assert numpy["Onion", "Lasalgaon"]["latest"] == 3001.0
+    assert "Nowhere" in numpy["Tomato"]["mandis"]
+    assert sqlite == numpy
+
+
+def test_unknown_pair(store, monkeypatch):
+    monkeypatch.setenv("AGRICHAIN_PRICE_BACKEND", "sqlite")
+    assert data_loader.get_latest_price("Onion", "Nowhere") == 0.0
+    assert data_loader.get_busiest_mandi("Nowhere") is None
+    with pytest.raises(ValueError):
+        analyse_prices("Onion", "Nowhere")
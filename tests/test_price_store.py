@@ -0,0 +1,57 @@
+"""Columnar .npy price store."""
+
+from __future__ import annotations
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from conftest import write_csv
+from modules import price_store
+
+
+ROWS = [
+    ("Onion",  "Lasalgaon", 1800.0,  "01-01-2024"),
+    ("Onion",  "Lasalgaon", 1850.5,  "02-01-2024"),
+    ("Onion",  "Pune",      1900.25, "01-01-2024"),
+    ("Wheat",  "Sangli",    2300.0,  "15-03-2024"),
+    ("Wheat",  "Sangli",    2310.0,  "15-03-2024"),   # same day twice
+    ("Tomato", "Nashik",    "n/a",   "05-05-2024"),
+]
+
+
+def test_store_round_trips_the_csv(store):
+    csv = write_csv(store / "prices.csv", ROWS)
+    manifest, cols = price_store.load_columns(csv)
+    expected = price_store._parse_csv(csv)
+
+    assert manifest["rows"] == len(expected) == len(ROWS) - 1   # unparseable price dropped
+    assert [manifest["crops"][c] for c in cols["crop"]] == expected["Crop"].tolist()
+    assert [manifest["mandis"][m] for m in cols["mandi"]] == expected["Mandi"].tolist()
+    np.testing.assert_array_equal(cols["price"], expected["Price"].to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(
+        pd.to_datetime(price_store.from_day_numbers(cols["day"])), expected["Date"],
+    )
+    assert price_store.ensure_store(csv)["dir"] == manifest["dir"]   # no rebuild
+
+
+def test_rebuild_replaces_older_builds_only(store):
+    csv = write_csv(store / "prices.csv", ROWS[:2])
+    first = price_store.ensure_store(csv)["dir"]
+    write_csv(csv, ROWS[:4])
+    second = price_store.ensure_store(csv)["dir"]
+
+    assert first != second
+    builds = sorted(p.name for p in price_store.STORE_DIR.iterdir() if p.is_dir())
+    assert builds == [second]
+    assert not list(price_store.STORE_DIR.glob("*.tmp"))
+
+    # a build committed after this one (another worker) is not pruned
+    newer = price_store.STORE_DIR / "ffffffffffffffff-v2"
+    newer.mkdir()
+    later = time.time() + 3600
+    os.utime(newer, (later, later))
+    write_csv(csv, ROWS[:3])
+    price_store.ensure_store(csv)
+    assert newer.is_dir()
@@ -0,0 +1,26 @@
+"""Incremental rollup refreshes against a full rebuild."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from conftest import write_csv
+from modules import price_store, rollup
+
+
+def test_incremental_rollup_equals_full_rebuild(store):
+    rollup.refresh()   # full build of the shipped CSV
+    delta = write_csv(store / "delta.csv", [
+        ("Onion",  "Lasalgaon(Niphad)", 2100.0, "01-07-2025"),
+        ("Onion",  "Lasalgaon(Niphad)", 2150.0, "02-07-2025"),
+        ("Wheat",  "Sangli",            2400.0, "11-06-2025"),
+        ("Garlic", "Pune",              5000.0, "01-07-2025"),
+    ])
+    price_store.ingest_delta(delta)
+    incremental = rollup.refresh().table
+
+    rollup.ROLLUP_FILE.unlink()
+    full = rollup.refresh().table
+    pd.testing.assert_frame_equal(incremental, full)
+    assert rollup.Rollup(full).row("garlic", "pune")["latest_price"] == 5000.0
+    assert rollup.Rollup(full).row("onion", "lasalgaon(niphad)")["latest_price"] == 2150.0
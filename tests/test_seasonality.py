@@ -0,0 +1,58 @@
+"""Seasonal indices recovered from synthetic seasonal series with a trend."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.seasonality import compute_indices
+
+PATTERN = {m: 1 + 0.2 * np.sin(2 * np.pi * (m - 1) / 12) for m in range(1, 13)}
+
+
+def _series(crop: str, mandi: str, start: str, days: int, growth: float, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq="D")
+    t = np.arange(days)
+    season = dates.month.map(PATTERN).to_numpy()
+    price = 1500 * np.exp(growth * t) * season * rng.normal(1, 0.02, days)
+    return pd.DataFrame({"Crop": crop, "Mandi": mandi, "Price": price, "Date": dates})
+
+
+def test_recovers_the_monthly_pattern_despite_a_trend():
+    df = pd.concat([
+        _series("Onion", "Pune",      "2021-01-01", 3 * 365, 0.0008, 0),
+        _series("Onion", "Lasalgaon", "2021-01-01", 3 * 365, -0.0004, 1),
+    ])
+    crop, pair = compute_indices(df)
+
+    expected = pd.Series(PATTERN) / np.mean(list(PATTERN.values()))
+    got = crop.loc["onion"]
+    assert list(got.index) == list(range(1, 13))
+    # the log-linear fit absorbs a little of the sine over three years
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), atol=0.03)
+    assert got.mean() == pytest.approx(1.0, abs=1e-3)
+    assert (got.idxmax(), got.idxmin()) == (4, 10)
+    for mandi in ("pune", "lasalgaon"):
+        np.testing.assert_allclose(pair.loc["onion", mandi].to_numpy(), expected.to_numpy(), atol=0.03)
+
+
+def test_short_and_sparse_series_are_left_out():
+    df = pd.concat([
+        _series("Onion",  "Pune",   "2021-01-01", 3 * 365, 0.0, 0),
+        _series("Onion",  "Nashik", "2023-01-01", 200, 0.0, 1),    # under a year
+        _series("Tomato", "Pune",   "2021-01-01", 2 * 365, 0.0, 2).iloc[::10],   # ~3 prices a month
+    ])
+    crop, pair = compute_indices(df)
+
+    assert set(pair.index.droplevel("period")) == {("onion", "pune")}
+    assert set(crop.index.get_level_values("crop")) == {"onion"}
+
+
+def test_weekly_indices():
+    df = _series("Onion", "Pune", "2021-01-04", 3 * 364, 0.0005, 0)
+    crop, _ = compute_indices(df, freq="week")
+    weeks = crop.loc["onion"]
+    assert len(weeks) >= 48 and weeks.mean() == pytest.approx(1.0, abs=1e-3)
+    assert weeks.idxmax() in range(13, 19)   # the sine peaks in April
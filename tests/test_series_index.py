@@ -0,0 +1,32 @@
+"""SeriesIndex spans against a pandas groupby."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from modules.data_loader import SeriesIndex
+
+
+def test_series_index_spans_match_groupby():
+    rng = np.random.default_rng(1)
+    n = 500
+    crops, mandis = ["Onion", "onion ", "Wheat"], ["Pune", "PUNE", "Sangli", "Nashik"]
+    crop_codes  = rng.integers(0, len(crops), n).astype(np.int16)
+    mandi_codes = rng.integers(0, len(mandis), n).astype(np.int16)
+    days   = rng.integers(19000, 19100, n).astype(np.int32)
+    prices = rng.uniform(500, 3000, n).astype(np.float32)
+    idx = SeriesIndex(crop_codes, mandi_codes, prices, days, crops, mandis)
+
+    frame = pd.DataFrame({
+        "crop":  [crops[c].strip().lower() for c in crop_codes],
+        "mandi": [mandis[m].strip().lower() for m in mandi_codes],
+        "day": days, "price": prices,
+    })
+    for (crop, mandi), group in frame.groupby(["crop", "mandi"]):
+        expected = group.sort_values("day", kind="stable")
+        np.testing.assert_array_equal(idx.days(crop, mandi), expected["day"].to_numpy())
+        np.testing.assert_array_equal(idx.price[slice(*idx.span(crop, mandi))],
+                                      expected["price"].to_numpy())
+    assert [m for m, _, _ in idx.mandis("Onion")] == ["Nashik", "Pune", "Sangli"]
+    assert idx.span("Potato", "Pune") == (0, 0)
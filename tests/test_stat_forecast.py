@@ -0,0 +1,89 @@
+"""Vectorised statistical forecasts against scalar one-series references."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import stat_forecast as sf
+from modules.timeseries import recent_daily
+
+
+def _holt_winters(y, horizon, season=sf.SEASON, alpha=sf.ALPHA, beta=sf.BETA, gamma=sf.GAMMA):
+    y = [float(v) for v in y]
+    level = sum(y[:season]) / season
+    trend = (sum(y[season:2 * season]) / season - level) / season
+    seas = [v - level for v in y[:season]]
+    for t in range(season, len(y)):
+        s = seas[t % season]
+        new_level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seas[t % season] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+    return [level + h * trend + seas[(len(y) + h - 1) % season] for h in range(1, horizon + 1)]
+
+
+def _damped_trend(y, horizon, alpha=sf.ALPHA, beta=sf.BETA, phi=sf.PHI):
+    y = [float(v) for v in y]
+    level, trend = y[0], y[1] - y[0]
+    for t in range(1, len(y)):
+        new_level = alpha * y[t] + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+    out, damp = [], 0.0
+    for h in range(1, horizon + 1):
+        damp += phi ** h
+        out.append(level + damp * trend)
+    return out
+
+
+def _seasonal_naive(y, horizon, season=sf.SEASON):
+    return [float(y[len(y) - season + (h % season)]) for h in range(horizon)]
+
+
+def _series():
+    rng = np.random.default_rng(0)
+    t = np.arange(200)
+    return [
+        1500 + 2 * t + 80 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 20, len(t)),
+        2000 + rng.normal(0, 50, 60),
+        np.full(30, 2400.0),
+        900 + 5 * np.arange(150.0),
+    ]
+
+
+@pytest.mark.parametrize("method, reference", [
+    ("holt_winters", _holt_winters),
+    ("damped_trend", _damped_trend),
+    ("seasonal_naive", _seasonal_naive),
+])
+def test_each_method_matches_its_scalar_reference(method, reference):
+    series = _series()
+    Y = sf.to_matrix(series)
+    got = sf.forecast(Y, 14, method).mean
+    for i in range(len(series)):
+        expected = np.maximum(reference(Y[i], 14), 0.0)
+        np.testing.assert_allclose(got[i], expected, rtol=1e-10)
+
+
+def test_ensemble_is_the_mean_of_the_methods():
+    Y = sf.to_matrix(_series())
+    parts = [sf.forecast(Y, 7, m).mean for m in ("seasonal_naive", "holt_winters", "damped_trend")]
+    np.testing.assert_allclose(sf.forecast(Y, 7).mean, np.mean(parts, axis=0), rtol=1e-12)
+
+
+def test_short_series_are_padded_with_their_first_value():
+    Y = sf.to_matrix([np.array([5.0, 6.0]), np.array([])], window=4)
+    np.testing.assert_array_equal(Y[0], [5.0, 5.0, 5.0, 6.0])
+    assert np.isnan(Y[1]).all()
+
+
+def test_recent_daily_is_the_calendar_since_the_last_long_gap():
+    days = np.array([0, 1, 1, 4, 60, 62, 70], dtype=np.int32)
+    prices = np.array([10.0, 11.0, 12.0, 13.0, 20.0, 21.0, 22.0])
+    reference = (pd.Series(prices, index=pd.to_datetime(days.astype("datetime64[D]")))
+                 .groupby(level=0).last().resample("D").last().ffill(limit=30))
+    # the 4 → 60 gap is longer than 30 days: the forecast starts after it
+    np.testing.assert_array_equal(recent_daily(days, prices), reference.iloc[60:].to_numpy())
+    assert len(recent_daily(days, prices)) == 70 - 60 + 1
@@ -0,0 +1,61 @@
+"""Calendar-day resampling and window means against a pandas reference."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.timeseries import resample_daily, window_mean, window_means
+
+
+def _random_series(seed: int, n: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted day numbers with repeats and gaps of up to 80 days, plus prices."""
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([0, 1, 1, 2, 3, 7, 20, 45, 80], size=n)
+    days = (19000 + np.cumsum(gaps)).astype(np.int32)
+    return days, rng.uniform(500, 3000, n).round(2)
+
+
+def _calendar_reference(days, prices, max_gap_days) -> pd.Series:
+    """Daily prices by pandas: a date's last row, forward-filled for max_gap_days."""
+    s = pd.Series(prices, index=pd.to_datetime(days.astype("datetime64[D]")))
+    return s.groupby(level=0).last().resample("D").last().ffill(limit=max_gap_days)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_gap_days", [1, 30])
+def test_calendar_windows_match_pandas(seed, max_gap_days):
+    days, prices = _random_series(seed)
+    reference = _calendar_reference(days, prices, max_gap_days)
+
+    calendar, daily, _ = resample_daily(days, prices, max_gap_days)
+    np.testing.assert_allclose(daily, reference.to_numpy())
+    assert calendar[-1] == days[-1] and len(calendar) == len(reference)
+
+    for n_days in (1, 7, 30, 90):
+        expected = reference.iloc[-n_days:].mean()
+        got = window_mean(days, prices, n_days, max_gap_days=max_gap_days)
+        if np.isnan(expected):
+            assert np.isnan(got)
+        else:
+            assert got == pytest.approx(expected, rel=1e-12)
+
+
+def test_window_mean_as_of_a_past_day():
+    days, prices = _random_series(7)
+    reference = _calendar_reference(days, prices, 30)
+    as_of = int(days[len(days) // 2])
+    upto = reference[: pd.Timestamp(np.datetime64(as_of, "D"))]
+    assert window_mean(days, prices, 30, as_of=as_of) == pytest.approx(upto.iloc[-30:].mean())
+
+
+def test_window_means_per_series():
+    parts = [_random_series(seed, n) for seed, n in ((1, 40), (2, 1), (3, 25))]
+    days   = np.concatenate([d for d, _ in parts])
+    prices = np.concatenate([p for _, p in parts])
+    stops  = np.cumsum([len(d) for d, _ in parts])
+    starts = stops - [len(d) for d, _ in parts]
+
+    got = window_means(days, prices, starts, stops, 30)
+    np.testing.assert_array_equal(got, [window_mean(d, p, 30) for d, p in parts])